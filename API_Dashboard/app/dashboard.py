@@ -2,18 +2,22 @@ import sys
 import os
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.data_loader import fetch_data
-from src.visualization import plot_all_relevant_charts, plot_correlation_heatmap, plot_latency_boxplot, plot_request_boxplot, plot_latency_histogram, plot_request_histogram, plot_latency_vs_requests
-from src.llm_analysis import get_llm_response
-from src.config import TABLE_NAMES
+from src.data_loader import fetch_data, get_table_cache, init_supabase
+from src.figure_cache import cached, get_figure_cache
+from src.rendering import box_figure, chart_stats, histogram_figure, scatter_figure, show_chart
+from src.visualization import filter_sidebar, plot_all_relevant_charts, plot_live, plot_performance, plot_time_series, plot_correlation_heatmap, plot_latency_boxplot, plot_request_boxplot, plot_latency_histogram, plot_request_histogram, plot_latency_vs_requests
+from src.llm_analysis import get_llm_response, stream_answer
+from src.config import TABLE_NAMES, DATA_SOURCE
+from src.warmup import start_warm_up
 
 st.set_page_config(layout="wide", page_title="API Monitoring Dashboard")
 
+# Import plotly and load the default table in the background while this first run renders the page
+start_warm_up()
+
 # Initialize session state variables
 if 'llm_plot' not in st.session_state:
     st.session_state.llm_plot = None
@@ -30,6 +34,24 @@ selected_table_display_name = st.sidebar.selectbox(
     list(TABLE_NAMES.keys())
 )
 
+view = st.sidebar.radio("View", ["Reports", "Time series", "Live"], horizontal=True)
+
+refresh_data = st.sidebar.button("Refresh data")
+if refresh_data and DATA_SOURCE == "local":
+    from src.sync import sync_table
+    with st.sidebar:
+        with st.spinner("Syncing changes into the local copy..."):
+            sync_table(init_supabase(), selected_table_display_name)
+cache_stats = get_table_cache().stats()
+st.sidebar.caption(f"Table cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                   f"{cache_stats['bytes'] / 1024 ** 2:.0f} / {cache_stats['max_bytes'] / 1024 ** 2:.0f} MB")
+figure_stats = get_figure_cache().stats()
+st.sidebar.caption(f"Figure cache: {figure_stats['hits']} hits, {figure_stats['misses']} misses, "
+                   f"{figure_stats['entries']} figures")
+
+# Filters for the loaded table are filled in once it has been fetched below
+filter_container = st.sidebar.container()
+
 st.sidebar.markdown("---")
 
 # Visualization Options
@@ -45,25 +67,30 @@ if st.sidebar.button("Generate Visualization") and viz_option != "None":
         df_viz = st.session_state.current_df
         
         if viz_option == "Boxplot of Latency" and 'avg_latency' in df_viz.columns:
-            fig = px.box(df_viz, y='avg_latency', title="Boxplot of Latency (ms)")
+            fig = cached(df_viz, ('box', 'avg_latency'), lambda: box_figure(
+                df_viz['avg_latency'], title="Boxplot of Latency (ms)", y_label='avg_latency'))
             st.session_state.llm_plot = fig
         elif viz_option == "Boxplot of Requests" and 'request_count' in df_viz.columns:
-            fig = px.box(df_viz, y='request_count', title="Boxplot of Request Count")
+            fig = cached(df_viz, ('box', 'request_count'), lambda: box_figure(
+                df_viz['request_count'], title="Boxplot of Request Count", y_label='request_count'))
             st.session_state.llm_plot = fig
         elif viz_option == "Correlation Heatmap":
-            numeric_df = df_viz.select_dtypes(include=['number'])
-            if not numeric_df.empty:
-                corr_matrix = numeric_df.corr()
-                fig = px.imshow(corr_matrix, text_auto=True, aspect="auto", title="Correlation Heatmap")
+            if not df_viz.select_dtypes(include=['number']).empty:
+                import plotly.express as px
+                fig = cached(df_viz, ('correlation_heatmap',), lambda: px.imshow(
+                    df_viz.select_dtypes(include=['number']).corr(), text_auto=True, aspect="auto", title="Correlation Heatmap"))
                 st.session_state.llm_plot = fig
         elif viz_option == "Latency Histogram" and 'avg_latency' in df_viz.columns:
-            fig = px.histogram(df_viz, x='avg_latency', title="Histogram of Latency (ms)")
+            fig = cached(df_viz, ('histogram', 'avg_latency'), lambda: histogram_figure(
+                df_viz['avg_latency'], title="Histogram of Latency (ms)", x_label='avg_latency'))
             st.session_state.llm_plot = fig
         elif viz_option == "Request Histogram" and 'request_count' in df_viz.columns:
-            fig = px.histogram(df_viz, x='request_count', title="Histogram of Request Count")
+            fig = cached(df_viz, ('histogram', 'request_count'), lambda: histogram_figure(
+                df_viz['request_count'], title="Histogram of Request Count", x_label='request_count'))
             st.session_state.llm_plot = fig
         elif viz_option == "Latency vs Requests Scatter" and 'avg_latency' in df_viz.columns and 'request_count' in df_viz.columns:
-            fig = px.scatter(df_viz, x='request_count', y='avg_latency', title="Latency vs Request Count")
+            fig = cached(df_viz, ('scatter', 'request_count', 'avg_latency'), lambda: scatter_figure(
+                df_viz, x='request_count', y='avg_latency', title="Latency vs Request Count"))
             st.session_state.llm_plot = fig
         
         st.rerun()  # Fixed: Changed from st.experimental_rerun()
@@ -87,17 +114,21 @@ if st.sidebar.button("Get Insight"):
             st.sidebar.markdown(llm_question)
         st.session_state.messages.append({"role": "user", "content": llm_question})
 
-        # Fetch data for LLM
+        # Fetch data for LLM; questions are answered over the filtered rows the charts show
+        report_name = selected_table_display_name
         if 'current_df' in st.session_state and st.session_state.current_table_display_name == selected_table_display_name:
              df_for_llm = st.session_state.current_df
+             if st.session_state.get('current_filters'):
+                 report_name += f" (filtered to {st.session_state.current_filters})"
         else:
              df_for_llm = fetch_data(selected_table_display_name)
         
         with st.spinner("Getting insight from LLM..."):
-            llm_response = get_llm_response(llm_question, df_for_llm, selected_table_display_name)
-            
+            llm_response = get_llm_response(llm_question, df_for_llm, report_name)
+
         with st.sidebar.chat_message("assistant"):
-            st.sidebar.markdown(llm_response)
+            # LLM answers are streamed into the chat as tokens arrive
+            llm_response = stream_answer(llm_response, st.sidebar.empty())
         st.session_state.messages.append({"role": "assistant", "content": llm_response})
     else:
         st.sidebar.warning("Please enter a question for the LLM.")
@@ -113,25 +144,53 @@ st.title("API Usage & Performance Dashboard")
 st.markdown(f"Currently displaying data for: **{selected_table_display_name}**")
 st.markdown("---")
 
+if view == "Time series":
+    # Time-series mode reads rollups or pushes aggregation down; no report table is loaded
+    plot_time_series()
+    plot_performance()
+    st.stop()
+if view == "Live":
+    # Live mode keeps its own incrementally updated reports and refreshes on a timer
+    plot_live(selected_table_display_name)
+    plot_performance()
+    st.stop()
+
 # Fetch data based on selected table
-with st.spinner(f"Loading data from {selected_table_display_name} (Supabase)..."):
-    df = fetch_data(selected_table_display_name)
-    st.session_state.current_df = df
-    st.session_state.current_table_display_name = selected_table_display_name
+data_source = "local Parquet copy" if DATA_SOURCE == "local" else "Supabase"
+with st.spinner(f"Loading data from {selected_table_display_name} ({data_source})..."):
+    progress_bar = st.progress(0.0)
+    df = fetch_data(selected_table_display_name, refresh=refresh_data,
+                    on_progress=lambda loaded, total: progress_bar.progress(
+                        min(loaded / total, 1.0), text=f"Loaded {loaded:,} of {total:,} rows"))
+    progress_bar.empty()
+
+# Sidebar filters and chart drill-downs select rows through the table's index
+df_view, filter_description = filter_sidebar(df, selected_table_display_name, filter_container) if not df.empty else (df, "")
+st.session_state.current_df = df_view
+st.session_state.current_filters = filter_description
+st.session_state.current_table_display_name = selected_table_display_name
 
 # Display visualizations
 if not df.empty:
-    plot_all_relevant_charts(df, selected_table_display_name)
+    if filter_description:
+        st.caption(f"Filtered to {filter_description}")
+    plot_all_relevant_charts(df_view, selected_table_display_name)
     
     # Display LLM-generated plot if available
     if st.session_state.llm_plot is not None:
         st.header("LLM-Generated Visualization")
-        st.plotly_chart(st.session_state.llm_plot, use_container_width=True)
+        show_chart(st.session_state.llm_plot)
         
         # Add a button to clear the plot
         if st.button("Clear LLM Visualization"):
             st.session_state.llm_plot = None
             st.rerun()  # Fixed: Changed from st.experimental_rerun()
+    if chart_stats():
+        with st.expander("Chart payloads"):
+            st.dataframe(pd.DataFrame.from_dict(chart_stats(), orient='index'))
 else:
     st.info(f"No data available for {selected_table_display_name} or an error occurred during fetching. "
-            f"Please ensure the table '{TABLE_NAMES[selected_table_display_name]}' exists in your Supabase project and has data.")
\ No newline at end of file
+            f"Please ensure the table '{TABLE_NAMES[selected_table_display_name]}' exists in your Supabase project and has data.")
+
+# Per-stage timings of this and earlier runs
+plot_performance()
@@ -0,0 +1,50 @@
+"""
+Compares the per-function analytics path with the single-pass aggregation engine.
+
+    python -m benchmarks.bench_aggregation --rows 1000000 10000000
+"""
+import argparse
+import time
+from benchmarks.synthetic import request_logs
+from src import analytics
+from src.aggregation import ALL_METRICS, METRIC_DIMENSIONS, aggregate
+
+DIMENSION_COLUMNS = ['api_name', 'app_name', 'api_version', 'uri_path', 'client_id']
+# How the dimension columns are stored: Python objects (list-of-dicts loaders),
+# pandas' default string dtype, or categoricals
+LAYOUTS = {'object': object, 'string': 'str', 'category': 'category'}
+
+def _time(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def run(rows: int, layout: str = 'object', repeat: int = 3) -> dict:
+    df = request_logs(rows).astype({column: LAYOUTS[layout] for column in DIMENSION_COLUMNS})
+
+    def separate():
+        for metric in METRIC_DIMENSIONS:
+            getattr(analytics, metric)(df)
+        df.describe(include='all')
+
+    baseline = _time(separate, repeat)
+    engine = _time(lambda: aggregate(df, ALL_METRICS), repeat)
+    return {'rows': rows, 'layout': layout, 'separate_s': baseline, 'engine_s': engine, 'speedup': baseline / engine}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--layout', choices=list(LAYOUTS), nargs='+', default=list(LAYOUTS))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    for rows in args.rows:
+        for layout in args.layout:
+            result = run(rows, layout, args.repeat)
+            print(f"{result['rows']:>12,} rows  {layout:<8}  separate {result['separate_s']:.3f}s  "
+                  f"engine {result['engine_s']:.3f}s  speedup {result['speedup']:.1f}x")
+
+if __name__ == '__main__':
+    main()
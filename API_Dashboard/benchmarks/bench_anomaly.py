@@ -0,0 +1,84 @@
+"""
+Cost and accuracy of the streaming anomaly engine behind predictive_maintenance_report.
+
+Replays synthetic 5-minute rollup partials for many endpoints, with a daily latency
+cycle and Poisson request and error counts, through AnomalyEngine.update_partials
+and reports the time per window. The last window has latency spikes or error bursts
+injected into a sample of endpoints; the report's Medium/High priorities are then
+compared against them. Finally one window of raw requests is timed through update(),
+which also aggregates the rows into partials.
+
+    python -m benchmarks.bench_anomaly --endpoints 5000 --windows 576
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.bench_live import synthetic_records
+from src.anomaly import AnomalyEngine
+from src.upload_to_supabase import parse_requests
+
+STEP = pd.Timedelta('5min')
+
+def synthetic_window(window: int, base_latency, base_rate, rng, spikes=None, bursts=None) -> pd.DataFrame:
+    """Partials indexed by (window_start, uri_path) for one window of every endpoint."""
+    endpoints = len(base_latency)
+    start = pd.Timestamp('2024-05-01', tz='UTC') + window * STEP
+    hour = (window * STEP / pd.Timedelta('1h')) % 24
+    count = rng.poisson(base_rate) + 1
+    daily = 1 + 0.3 * np.sin(2 * np.pi * hour / 24)
+    mean = base_latency * daily * np.exp(rng.normal(0, 0.5 / np.sqrt(count)))
+    error_rate = np.full(endpoints, 0.02)
+    if spikes is not None:
+        mean[spikes] *= 3
+    if bursts is not None:
+        error_rate[bursts] = 0.25
+    errors = rng.binomial(count, error_rate)
+    index = pd.MultiIndex.from_arrays([pd.DatetimeIndex([start] * endpoints), [f"/api/v1/resource/{i}" for i in range(endpoints)]],
+                                      names=['window_start', 'uri_path'])
+    return pd.DataFrame({'count': count, 'latency_count': count, 'latency_sum': mean * count,
+                         'latency_min': mean / 4, 'latency_max': mean * 4, 'error_count': errors,
+                         'first_seen': start, 'last_seen': start + STEP}, index=index)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the streaming anomaly engine.")
+    parser.add_argument('--endpoints', type=int, default=5000)
+    parser.add_argument('--windows', type=int, default=576, help="5-minute windows replayed (576 = 2 days)")
+    parser.add_argument('--anomalous', type=float, default=0.01, help="Fraction of endpoints given an anomaly")
+    parser.add_argument('--raw-rows', type=int, default=200_000, help="Rows in the raw request window timed at the end")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    base_latency = rng.lognormal(4.5, 0.8, args.endpoints)
+    base_rate = rng.uniform(20, 400, args.endpoints)
+    engine = AnomalyEngine('5m')
+    timings = []
+    for window in range(args.windows):
+        partials = synthetic_window(window, base_latency, base_rate, rng)
+        started = time.perf_counter()
+        engine.update_partials(partials)
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    print(f"{args.endpoints:,} endpoints x {args.windows} windows: "
+          f"{timings.mean():.1f} ms/window mean, {np.percentile(timings, 99):.1f} ms p99, {timings.sum() / 1000:.1f}s total")
+
+    # Inject anomalies into the final window and score it
+    anomalous = rng.choice(args.endpoints, max(2, int(args.endpoints * args.anomalous)), replace=False)
+    spikes, bursts = np.array_split(anomalous, 2)
+    engine.update_partials(synthetic_window(args.windows, base_latency, base_rate, rng, spikes, bursts))
+    engine.close()
+    report = engine.report().set_index('uri_path')
+    flagged = set(report.index[report['maintenance_priority'].isin(['Medium', 'High'])])
+    truth = {f"/api/v1/resource/{i}" for i in anomalous}
+    hits = len(flagged & truth)
+    print(f"injected {len(truth)} anomalies: {hits} flagged (recall {hits / len(truth):.0%}), "
+          f"{len(flagged) - hits} false positives out of {args.endpoints - len(truth):,} normal endpoints")
+
+    # One window of raw requests, including the aggregation into partials
+    requests = parse_requests(synthetic_records(args.raw_rows, rng))
+    started = time.perf_counter()
+    engine.update(requests)
+    print(f"raw window of {args.raw_rows:,} rows: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Indexed filtering against boolean-mask scans.
+
+Builds the filter index of a synthetic request log once per dimension, then times
+typical sidebar and drill-down selections: through TableIndex.select and as the
+equivalent pandas mask over the whole frame. Also times building the filtered
+frame and serving a repeated filter combination from the memo.
+
+    python -m benchmarks.bench_filters --rows 1000000 5000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import request_logs
+from src.figure_cache import frame_fingerprint
+from src.filters import table_index
+
+# (label, dimension filters, start, end); status_class is matched on the status code column
+SELECTIONS = [
+    ("one heavy client", {'client_id': ['client-0']}, None, None),
+    ("one light client", {'client_id': ['client-4321']}, None, None),
+    ("2 clients, API v2", {'client_id': ['client-5', 'client-9'], 'api_version': ['v2']}, None, None),
+    ("endpoint, 5xx, 6 hours", {'uri_path': ['/api/v1/resource/3'], 'status_class': ['5xx']},
+     '2024-05-01 06:00', '2024-05-01 12:00'),
+    ("last hour", {}, '2024-05-01 23:00', None),
+    ("4xx on v1/v3, first hour", {'status_class': ['4xx'], 'api_version': ['v1', 'v3']}, None, '2024-05-01 01:00'),
+]
+
+def _timed(fn, repeat: int) -> tuple:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+def _mask(df: pd.DataFrame, filters: dict, start, end) -> np.ndarray:
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in filters.items():
+        if column == 'status_class':
+            mask &= np.isin(df['status_code_cleaned'].to_numpy() // 100, [int(v[0]) for v in values])
+        else:
+            mask &= df[column].isin(values).to_numpy(dtype=bool, na_value=False)
+    if start is not None:
+        mask &= (df['timestamp'] >= pd.Timestamp(start, tz='UTC')).to_numpy()
+    if end is not None:
+        mask &= (df['timestamp'] < pd.Timestamp(end, tz='UTC')).to_numpy()
+    return np.flatnonzero(mask)
+
+def run(rows: int, repeat: int):
+    df = request_logs(rows)
+    for column in ('client_id', 'uri_path', 'api_version'):
+        df[column] = df[column].astype('category')
+    index = table_index(df)
+    print(f"\n{rows:,} rows")
+    for dimension in ('client_id', 'uri_path', 'api_version', 'status_class'):
+        _, seconds = _timed(lambda: index.dimension(dimension), 1)
+        print(f"  index {dimension:<14}{seconds * 1000:10.1f} ms")
+    _, seconds = _timed(lambda: index.time_bounds(), 1)
+    print(f"  index {'time':<14}{seconds * 1000:10.1f} ms")
+    # Filtered frames derive their fingerprint from the table's, hashed once per table
+    _, seconds = _timed(lambda: frame_fingerprint(df), 1)
+    print(f"  {'table fingerprint':<20}{seconds * 1000:10.1f} ms")
+
+    print(f"  {'selection':<28}{'matches':>10}{'index ms':>10}{'scan ms':>10}{'frame ms':>10}{'memo ms':>10}")
+    for label, filters, start, end in SELECTIONS:
+        positions, indexed = _timed(lambda: index.select(filters, start, end), repeat)
+        expected, scanned = _timed(lambda: _mask(df, filters, start, end), repeat)
+        assert np.array_equal(positions, expected), label
+        _, frame = _timed(lambda: index.filtered(filters, start, end), 1)
+        _, memo = _timed(lambda: index.filtered(filters, start, end), repeat)
+        print(f"  {label:<28}{len(positions):>10,}{indexed * 1000:>10.2f}{scanned * 1000:>10.1f}"
+              f"{frame * 1000:>10.1f}{memo * 1000:>10.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark indexed filter selection against mask scans.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    for rows in args.rows:
+        run(rows, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Sustained throughput of live tail mode through the local socket source.
+
+Starts a SocketSource and LiveAggregator in-process, streams synthetic request
+records to the socket at a target rate (0 = as fast as possible) and reports the
+rows/sec received and folded and the time each fold took. With --port pointing at
+a running dashboard (LIVE_SOURCE=socket) it only sends, which doubles as a feed
+for trying the Live view:
+
+    python -m benchmarks.bench_live --rate 5000 --seconds 20
+    python -m benchmarks.bench_live --rate 2000 --seconds 600 --send-only --port 8765
+"""
+import argparse
+import json
+import socket
+import time
+import numpy as np
+import pandas as pd
+from src.live import LiveAggregator, SocketSource
+
+def synthetic_records(rows: int, rng: np.random.Generator) -> list:
+    """Raw log records stamped with the current time, like the ingested JSONL files."""
+    now = pd.Timestamp.now(tz='UTC')
+    timestamps = (now - pd.to_timedelta(rng.uniform(0, 1, rows), unit='s')).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    clients = rng.zipf(1.2, rows) % 2000
+    endpoints = rng.zipf(1.3, rows) % 200
+    status = rng.choice([200, 201, 404, 500], rows, p=[.9, .04, .04, .02])
+    latency = rng.lognormal(4.5, 1.0, rows)
+    return [{'timestamp': ts, 'api_name': f"api-{e % 20}", 'app_name': 'bench', 'api_version': 'v1',
+             'uri_path': f"/api/v1/resource/{e}", 'client_id': f"client-{c}", 'status_code': int(s),
+             'latency_ms': round(float(l), 2)}
+            for ts, c, e, s, l in zip(timestamps, clients, endpoints, status, latency)]
+
+def send(port: int, rate: int, seconds: float, chunk: int = 500, seed: int = 0) -> int:
+    """Streams records to the socket for `seconds`; returns the number sent."""
+    rng = np.random.default_rng(seed)
+    sent = 0
+    started = time.perf_counter()
+    with socket.create_connection(('127.0.0.1', port)) as conn:
+        while time.perf_counter() - started < seconds:
+            payload = "".join(json.dumps(record) + "\n" for record in synthetic_records(chunk, rng))
+            conn.sendall(payload.encode())
+            sent += chunk
+            if rate:
+                # Pace to the target rate
+                ahead = sent / rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+    return sent
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure live tail ingestion throughput.")
+    parser.add_argument('--rate', type=int, default=0, help="Target rows/sec; 0 sends as fast as possible")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--send-only', action='store_true', help="Only feed an already running live source")
+    args = parser.parse_args(argv)
+
+    if args.send_only:
+        sent = send(args.port, args.rate, args.seconds)
+        print(f"sent {sent:,} rows ({sent / args.seconds:,.0f}/s)")
+        return
+
+    aggregator = LiveAggregator()
+    source = SocketSource(port=args.port)
+    source.start(aggregator.push)
+    aggregator.start_flusher()
+    started = time.perf_counter()
+    sent = send(args.port, args.rate, args.seconds)
+    time.sleep(0.5)
+    while aggregator.stats()['pending']:
+        time.sleep(0.1)
+    elapsed = time.perf_counter() - started
+    stats = aggregator.stats()
+    aggregator.stop()
+    source.stop()
+    print(f"sent {sent:,}  received {stats['received']:,}  in {elapsed:.1f}s "
+          f"-> {stats['received'] / elapsed:,.0f} rows/s sustained")
+    print(f"folds: {stats['version']}, last fold {stats['last_flush_ms']:.0f} ms")
+    started = time.perf_counter()
+    reports = aggregator.reports()
+    print(f"reports rebuilt in {(time.perf_counter() - started) * 1000:.0f} ms: "
+          + ", ".join(f"{name} {len(df)} rows" for name, df in reports.items()))
+
+if __name__ == '__main__':
+    main()
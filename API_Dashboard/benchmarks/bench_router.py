@@ -0,0 +1,71 @@
+"""
+Routing and answer latency of the compiled question router.
+
+Measures how long matching a question against the intent registry takes, then
+the time to answer each question the first time (column roles and group-bys
+computed) and again (served from the memoized results).
+
+    python -m benchmarks.bench_router --rows 100000 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src import question_router
+
+QUESTIONS = [
+    "Which client has the highest average latency?",
+    "Which client has the highest error rate?",
+    "Show the top 10 clients by request count",
+    "top 5 by latency",
+    "What is the p99 latency?",
+    "How many clients were active in the last 6 hours?",
+    "What is the total rows count?",
+    "Show me a boxplot of latency",
+    "Why did errors spike yesterday?",  # No intent: falls through to the LLM
+]
+
+def synthetic_report(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Consumer behavior report with one row per client."""
+    rng = np.random.default_rng(seed)
+    latency = rng.lognormal(4.5, 1.0, rows)
+    return pd.DataFrame({
+        'client_id': pd.array([f"client-{i}" for i in range(rows)], dtype='string'),
+        'request_count': rng.zipf(1.5, rows).clip(max=10 ** 6),
+        'avg_latency': latency,
+        'error_rate_pct': rng.beta(1, 30, rows) * 100,
+        'p50_latency': latency * 0.8,
+        'p99_latency': latency * rng.uniform(2, 6, rows),
+        'last_seen': pd.Timestamp.now(tz='UTC') - pd.to_timedelta(rng.integers(0, 7 * 86400, rows), unit='s'),
+    })
+
+def run(rows: int, repeat: int = 1000):
+    df = synthetic_report(rows)
+    route_us = {}
+    for question in QUESTIONS:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            list(question_router.route(question))
+        route_us[question] = (time.perf_counter() - started) / repeat * 1e6
+
+    print(f"\n{rows:,} rows")
+    print(f"{'question':<52}{'route µs':>10}{'first ms':>10}{'repeat ms':>11}")
+    for question in QUESTIONS:
+        started = time.perf_counter()
+        question_router.answer(question, df, "Consumer Behavior")
+        first = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        question_router.answer(question, df, "Consumer Behavior")
+        again = (time.perf_counter() - started) * 1000
+        print(f"{question[:50]:<52}{route_us[question]:>10.1f}{first:>10.2f}{again:>11.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark question routing and memoized answers.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000])
+    parser.add_argument('--repeat', type=int, default=1000, help="Routing iterations per question")
+    args = parser.parse_args(argv)
+    for rows in args.rows:
+        run(rows, args.repeat)
+
+if __name__ == '__main__':
+    main()
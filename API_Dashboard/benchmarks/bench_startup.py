@@ -0,0 +1,112 @@
+"""
+Cold-start cost of the dashboard: import time and time to the first full page.
+
+Every measurement runs in a fresh interpreter. The import stage executes the
+top-level imports of app/dashboard.py (read from the file, so it follows the
+app), reports the slowest modules from -X importtime, and fails when a backend
+that should load lazily (plotly.express, supabase, ollama) was imported eagerly
+or when the imports take longer than --max-import-seconds. With --page, the whole
+first page is rendered through Streamlit's AppTest, against the fake PostgREST
+server with synthetic report tables, once with the background warm-up and once
+without it.
+
+    python -m benchmarks.bench_startup --repeat 5 --max-import-seconds 2
+    python -m benchmarks.bench_startup --page --rows 100000
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, 'app', 'dashboard.py')
+
+# Modules the dashboard must not import before they are first used
+DEFERRED = ('plotly.express', 'supabase', 'ollama', 'realtime')
+
+def dashboard_imports() -> str:
+    """The module-level import statements of app/dashboard.py as source code."""
+    with open(DASHBOARD) as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def _run(code: str, env: dict = None, importtime: bool = False) -> tuple:
+    """Runs code in a fresh interpreter from the project root; returns (last stdout line as JSON, stderr)."""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    result = subprocess.run(command, cwd=ROOT, env={**os.environ, 'PYTHONPATH': ROOT, **(env or {})},
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def import_run(importtime: bool = False) -> tuple:
+    code = ("import time\nstarted = time.perf_counter()\n" + dashboard_imports() +
+            "\nimport json, sys\nprint(json.dumps({'seconds': time.perf_counter() - started, "
+            f"'eager': [m for m in {DEFERRED!r} if m in sys.modules]}}))")
+    return _run(code, importtime=importtime)
+
+def slowest_imports(stderr: str, top: int) -> list:
+    """(cumulative seconds, module) of the slowest top-level imports in -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative) / 1e6, name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+def page_run(port: int, warm_up: bool) -> float:
+    code = ("import time\nstarted = time.perf_counter()\nfrom streamlit.testing.v1 import AppTest\n"
+            f"app = AppTest.from_file({DASHBOARD!r}, default_timeout=600).run()\n"
+            "import json\nprint(json.dumps({'seconds': time.perf_counter() - started, 'errors': len(app.exception)}))")
+    env = {'SUPABASE_URL': f"http://127.0.0.1:{port}", 'SUPABASE_KEY': 'benchmark', 'DATA_SOURCE': 'supabase',
+           'WARMUP_ENABLED': '1' if warm_up else '0'}
+    result, _ = _run(code, env)
+    if result['errors']:
+        raise RuntimeError("the dashboard raised an exception while rendering")
+    return result['seconds']
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dashboard import time and first-page time.")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per measurement; the median is kept")
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list")
+    parser.add_argument('--max-import-seconds', type=float, help="Fail when the median import time exceeds this")
+    parser.add_argument('--page', action='store_true', help="Also time the first full page render")
+    parser.add_argument('--rows', type=int, default=100_000, help="Rows per report table for --page")
+    parser.add_argument('--port', type=int, default=54334)
+    args = parser.parse_args(argv)
+
+    runs = [import_run() for _ in range(args.repeat)]
+    seconds = statistics.median(run['seconds'] for run, _ in runs)
+    _, stderr = import_run(importtime=True)
+    print(f"dashboard imports: {seconds:.3f}s median of {args.repeat} fresh interpreters")
+    for cumulative, name in slowest_imports(stderr, args.top):
+        print(f"  {cumulative:7.3f}s  {name}")
+
+    failed = False
+    eager = runs[0][0]['eager']
+    if eager:
+        print(f"FAIL imported at startup instead of on first use: {', '.join(eager)}")
+        failed = True
+    if args.max_import_seconds is not None and seconds > args.max_import_seconds:
+        print(f"FAIL import time {seconds:.3f}s exceeds {args.max_import_seconds}s")
+        failed = True
+
+    if args.page:
+        from benchmarks.fake_postgrest import serve
+        from benchmarks.synthetic import report_tables
+        server = serve(report_tables(args.rows), args.port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            for warm_up in (False, True):
+                page = statistics.median(page_run(args.port, warm_up) for _ in range(args.repeat))
+                print(f"first page, warm-up {'on' if warm_up else 'off'}: {page:.2f}s median ({args.rows:,} rows per table)")
+        finally:
+            server.shutdown()
+            server.server_close()
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Local stand-in for the Supabase REST API (PostgREST), for benchmarking the loaders
+without a network or a database.
+
+Tables are in-memory DataFrames. GET /rest/v1/<table> supports what
+src/data_loader.py and src/sync.py send: select, order (one or more columns),
+eq/gt/gte/lt/lte filters, limit/offset, Prefer: count=exact (answered in
+Content-Range) and Accept: text/csv. Filters on a single ordered column are answered
+by binary search over a cached sort order, so keyset pages cost the same at the end
+of a 10M-row table as at the start.
+POST /rest/v1/rpc/dashboard_aggregate evaluates sql/dashboard_aggregate.sql with
+pandas. Run it standalone and point the dashboard at it with
+
+    python -m benchmarks.fake_postgrest --rows 1000000 --port 54321
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=fake streamlit run app/dashboard.py
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+import numpy as np
+import pandas as pd
+
+_OPERATORS = {'eq', 'neq', 'gt', 'gte', 'lt', 'lte'}
+_AGGREGATES = {'avg': 'mean', 'sum': 'sum', 'min': 'min', 'max': 'max', 'stddev': 'std'}
+# Arguments of the dashboard_aggregate signature in sql/dashboard_aggregate.sql
+_RPC_ARGUMENTS = {'p_table', 'p_func', 'p_metric', 'p_group_by', 'p_bucket', 'p_time_column', 'p_order',
+                  'p_limit', 'p_quantile', 'p_start', 'p_end', 'p_keys'}
+
+class FakePostgrest:
+    """In-memory tables and the query semantics the dashboard relies on."""
+
+    def __init__(self, tables: dict):
+        self.tables = tables
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def _sorted(self, table: str, column: str):
+        """(row order, sorted values) of a column, computed once per table and column."""
+        with self._lock:
+            if (table, column) not in self._orders:
+                values = self.tables[table][column].to_numpy()
+                order = np.argsort(values, kind='stable')
+                self._orders[(table, column)] = (order, values[order])
+            return self._orders[(table, column)]
+
+    @staticmethod
+    def _literal(series: pd.Series, text: str):
+        """Converts a filter value to the column's type."""
+        if pd.api.types.is_numeric_dtype(series):
+            return float(text)
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return pd.Timestamp(text)
+        return text
+
+    def select(self, table: str, params: list) -> tuple:
+        """Returns (rows, total matching rows) for the query string parameters."""
+        df = self.tables[table]
+        columns, orders, limit, offset, filters = None, [], None, 0, []
+        for name, value in params:
+            if name == 'select':
+                columns = None if value == '*' else value.split(',')
+            elif name == 'order':
+                # column[.asc|.desc][.nullsfirst|.nullslast]; the frames hold no nulls to place
+                orders = [(term.split('.')[0], '.desc' in term) for term in value.split(',')]
+            elif name == 'limit':
+                limit = int(value)
+            elif name == 'offset':
+                offset = int(value)
+            elif '.' in value and value.split('.', 1)[0] in _OPERATORS:
+                operator, literal = value.split('.', 1)
+                filters.append((name, operator, self._literal(df[name], literal)))
+        for column in (columns or []) + [column for column, _ in orders]:
+            if column not in df.columns:
+                raise KeyError(column)
+
+        if len(orders) == 1 and not orders[0][1] and all(column == orders[0][0] and operator != 'neq'
+                                                         for column, operator, _ in filters):
+            # Range filters on the ordered column become a slice of its sort order
+            positions, values = self._sorted(table, orders[0][0])
+            lo, hi = 0, len(values)
+            for _, operator, literal in filters:
+                if operator in ('gt', 'eq'):
+                    lo = max(lo, np.searchsorted(values, literal, 'right' if operator == 'gt' else 'left'))
+                if operator == 'gte':
+                    lo = max(lo, np.searchsorted(values, literal, 'left'))
+                if operator in ('lt', 'eq'):
+                    hi = min(hi, np.searchsorted(values, literal, 'left' if operator == 'lt' else 'right'))
+                if operator == 'lte':
+                    hi = min(hi, np.searchsorted(values, literal, 'right'))
+            rows = positions[lo:max(lo, hi)]
+        else:
+            mask = np.ones(len(df), dtype=bool)
+            for column, operator, literal in filters:
+                values = df[column]
+                mask &= {'eq': values == literal, 'neq': values != literal, 'gt': values > literal,
+                         'gte': values >= literal, 'lt': values < literal, 'lte': values <= literal}[operator].to_numpy()
+            rows = np.flatnonzero(mask)
+            if orders:
+                names = [column for column, _ in orders]
+                matched = df.iloc[rows][names].reset_index(drop=True)
+                order = matched.sort_values(names, ascending=[not desc for _, desc in orders], kind='stable').index
+                rows = rows[order.to_numpy()]
+        total = len(rows)
+        rows = rows[offset:offset + limit] if limit is not None else rows[offset:]
+        page = df.iloc[rows]
+        return (page[columns] if columns else page), total
+
+    def aggregate(self, params: dict) -> list:
+        """dashboard_aggregate: (key, bucket, value) rows for one aggregation."""
+        df = self.tables[params['p_table']]
+        time_column = params.get('p_time_column') or 'timestamp'
+        if params.get('p_start'):
+            df = df[df[time_column] >= pd.Timestamp(params['p_start'])]
+        if params.get('p_end'):
+            df = df[df[time_column] < pd.Timestamp(params['p_end'])]
+        if params.get('p_keys') is not None:
+            df = df[df[params['p_group_by']].astype(str).isin(params['p_keys'])]
+        by = {}
+        if params.get('p_group_by'):
+            by['key'] = df[params['p_group_by']].astype(str).rename('key')
+        if params.get('p_bucket'):
+            by['bucket'] = df[time_column].dt.floor(pd.Timedelta(params['p_bucket'].replace(' seconds', 's'))).rename('bucket')
+        func, metric = params['p_func'], params.get('p_metric')
+        values = df[metric] if metric else pd.Series(1, index=df.index)
+        grouped = values.groupby(list(by.values())) if by else None
+        if func == 'count' or not metric:
+            result = grouped.size() if grouped is not None else pd.Series([len(df)])
+        elif func == 'percentile_cont':
+            result = grouped.quantile(params['p_quantile']) if grouped is not None else pd.Series([values.quantile(params['p_quantile'])])
+        elif func == 'error_rate':
+            errors = (values >= 400).astype(float) * 100
+            result = errors.groupby(list(by.values())).mean() if by else pd.Series([errors.mean()])
+        else:
+            result = getattr(grouped, _AGGREGATES[func])() if grouped is not None else pd.Series([getattr(values, _AGGREGATES[func])()])
+        frame = result.rename('value').reset_index() if by else pd.DataFrame({'value': result})
+        frame = frame.reindex(columns=['key', 'bucket', 'value'])
+        order = params.get('p_order') or 'value_desc'
+        if order == 'key_asc':
+            frame = frame.sort_values(['key', 'bucket'])
+        else:
+            frame = frame.sort_values('value', ascending=order == 'value_asc')
+        if params.get('p_limit'):
+            frame = frame.head(int(params['p_limit']))
+        frame['bucket'] = frame['bucket'].map(lambda ts: ts.isoformat() if isinstance(ts, pd.Timestamp) else None)
+        return json.loads(frame.to_json(orient='records'))
+
+def make_handler(api: FakePostgrest):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out as separate writes; without this each response waits on delayed ACKs
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            table = url.path.rsplit('/', 1)[-1]
+            if not url.path.startswith('/rest/v1/') or table not in api.tables:
+                self._send(404, 'application/json', json.dumps({'message': f'relation "{table}" does not exist'}))
+                return
+            try:
+                page, total = api.select(table, parse_qsl(url.query))
+            except KeyError as e:
+                # PostgREST answers unknown columns with 400 and Postgres error 42703
+                self._send(400, 'application/json',
+                           json.dumps({'code': '42703', 'message': f'column {table}.{e.args[0]} does not exist'}))
+                return
+            if 'text/csv' in self.headers.get('Accept', ''):
+                body, content_type = page.to_csv(index=False, date_format='%Y-%m-%dT%H:%M:%S.%f%z'), 'text/csv'
+            else:
+                body, content_type = page.to_json(orient='records', date_format='iso'), 'application/json'
+            # PostgREST reports the returned range and, with count=exact, the total
+            count = str(total) if 'count=exact' in self.headers.get('Prefer', '') else '*'
+            content_range = f"0-{len(page) - 1}/{count}" if len(page) else f"*/{count}"
+            self._send(200, content_type, body, {'Content-Range': content_range})
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path != '/rest/v1/rpc/dashboard_aggregate':
+                self._send(404, 'application/json', '{}')
+                return
+            params = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if not params.keys() <= _RPC_ARGUMENTS:
+                # PostgREST finds no function for arguments outside the signature
+                self._send(404, 'application/json',
+                           json.dumps({'code': 'PGRST202', 'message': f'no dashboard_aggregate({", ".join(sorted(params))})'}))
+                return
+            self._send(200, 'application/json', json.dumps(api.aggregate(params)))
+
+        def _send(self, status: int, content_type: str, body: str, headers: dict = None):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def serve(tables: dict, port: int = 54321) -> ThreadingHTTPServer:
+    """Creates the fake server; call serve_forever() on it (in a thread for in-process use)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(FakePostgrest(tables)))
+    server.daemon_threads = True
+    return server
+
+def main(argv=None):
+    from benchmarks.synthetic import report_tables, request_logs
+    from src.config import REQUEST_LOG_TABLE
+
+    parser = argparse.ArgumentParser(description="Serve synthetic report tables over a fake PostgREST API.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows per report table and in the request log")
+    parser.add_argument("--port", type=int, default=54321)
+    args = parser.parse_args(argv)
+    tables = report_tables(args.rows)
+    tables[REQUEST_LOG_TABLE] = request_logs(args.rows)
+    server = serve(tables, args.port)
+    print(f"Fake PostgREST with {args.rows:,} rows per table on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Stand-in for an Ollama server, for exercising src/llm_service.py without a model.
+
+POST /api/generate streams a canned answer as NDJSON chunks, one word per chunk
+with a fixed delay, the way Ollama does with "stream": true. Run it and point the
+dashboard at it with
+
+    python -m benchmarks.mock_ollama --port 11435 --token-delay 0.02
+    OLLAMA_HOST=http://localhost:11435 streamlit run app/dashboard.py
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = ("Based on the precomputed statistics, the slowest endpoints also carry the highest error "
+          "rates, so they are the first candidates for investigation.")
+
+def make_handler(token_delay: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if self.path != "/api/generate":
+                self.send_error(404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = request.get("model", "mock")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            words = ANSWER.split(" ")
+            for i, word in enumerate(words):
+                time.sleep(token_delay)
+                self._chunk({"model": model, "response": word if i == 0 else " " + word, "done": False})
+            self._chunk({"model": model, "response": "", "done": True,
+                         "prompt_eval_count": len(request.get("prompt", "")) // 4, "eval_count": len(words)})
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _chunk(self, payload: dict):
+            data = json.dumps(payload).encode() + b"\n"
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def serve(port: int = 11435, token_delay: float = 0.02) -> ThreadingHTTPServer:
+    """Creates the mock server; call serve_forever() on it (in a thread for in-process use)."""
+    return ThreadingHTTPServer(("127.0.0.1", port), make_handler(token_delay))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a mock Ollama /api/generate endpoint.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between streamed tokens")
+    args = parser.parse_args(argv)
+    server = serve(args.port, args.token_delay)
+    print(f"Mock Ollama listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+End-to-end benchmark of the dashboard pipeline, with regression checks against a baseline.
+
+For each size, synthetic report tables are served by the fake PostgREST server
+(benchmarks/fake_postgrest.py) and the stages are timed one after another:
+
+    load       load_table() for the three reports over HTTP, as fetch_data does on a cache miss
+    aggregate  all analytics metrics over a synthetic request log of the same size
+    figures    every chart and the overview of the three report dashboards, built uncached
+               (the plot_all_relevant_charts path without Streamlit), plus their JSON payload size
+
+Times are the best of --repeat runs. Peak memory per stage is the tracemalloc peak
+of one extra run (NumPy and pandas report their buffers to it). Results are compared
+against a stored baseline: a stage is flagged when its time, peak memory or payload
+grows by more than --tolerance and by more than a small absolute amount. The exit status is 1 when anything regressed.
+
+    python -m benchmarks.suite --sizes 10k 1m --save-baseline
+    python -m benchmarks.suite --sizes 10k 1m            # compare with benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+import pandas as pd
+from supabase import create_client
+from benchmarks.fake_postgrest import serve
+from benchmarks.synthetic import SIZES, report_tables, request_logs
+from src import charts
+from src.aggregation import ALL_METRICS, aggregate
+from src.config import TABLE_NAMES
+from src.data_loader import load_table
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Metric -> smallest absolute increase that counts as a regression, so noise on tiny numbers is ignored
+MIN_INCREASE = {'seconds': 0.05, 'peak_mb': 5.0, 'payload_bytes': 10_000}
+
+def _measure(fn, memory: bool = True, repeat: int = 1):
+    """
+    Runs fn and returns (result, {'seconds', 'peak_mb'}) with the best time of `repeat`
+    runs. Tracing allocations slows Python-heavy stages several times over, so the
+    peak comes from one more, traced run.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    metrics = {'seconds': round(best, 4)}
+    if memory:
+        del result
+        tracemalloc.start()
+        result = fn()
+        metrics['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+        tracemalloc.stop()
+    return result, metrics
+
+def _load(supabase) -> dict:
+    return {display_name: load_table(display_name, supabase=supabase) for display_name in TABLE_NAMES}
+
+def _figures(frames: dict) -> list:
+    built = []
+    for display_name, df in frames.items():
+        specs = [charts.overview(df)] + [spec for section in charts.report_sections(df, display_name)
+                                         for spec in section.charts]
+        built.extend(charts.build_charts(df, specs))
+    return built
+
+def run_size(rows: int, port: int, memory: bool = True, repeat: int = 1) -> dict:
+    """Times every stage at one size."""
+    tables, generate = _measure(lambda: report_tables(rows), memory)
+    server = serve(tables, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        supabase = create_client(f"http://127.0.0.1:{port}", "benchmark")
+        frames, load = _measure(lambda: _load(supabase), memory, repeat)
+    finally:
+        server.shutdown()
+        server.server_close()
+    del tables
+    load['rows_per_sec'] = round(sum(len(df) for df in frames.values()) / load['seconds'])
+
+    logs = request_logs(rows)
+    _, aggregation = _measure(lambda: aggregate(logs, ALL_METRICS), memory, repeat)
+    del logs
+
+    built, figures = _measure(lambda: _figures(frames), memory, repeat)
+    figures['payload_bytes'] = sum(len(fig.to_json()) for fig in built if hasattr(fig, 'to_json'))
+    figures['charts'] = sum(hasattr(fig, 'to_json') for fig in built)
+    return {'generate': generate, 'load': load, 'aggregate': aggregation, 'figures': figures}
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns (size, stage, metric, baseline, current) for every regression."""
+    regressions = []
+    for size, stages in results.items():
+        for stage, metrics in stages.items():
+            if stage == 'generate':
+                continue
+            for metric, threshold in MIN_INCREASE.items():
+                old = baseline.get(size, {}).get(stage, {}).get(metric)
+                new = metrics.get(metric)
+                if old is None or new is None:
+                    continue
+                if new > old * (1 + tolerance) and new - old > threshold:
+                    regressions.append((size, stage, metric, old, new))
+    return regressions
+
+def _print(results: dict, baseline: dict):
+    print(f"{'size':<6}{'stage':<11}{'seconds':>10}{'peak MB':>10}{'payload KB':>12}{'vs baseline':>14}")
+    for size, stages in results.items():
+        for stage, metrics in stages.items():
+            old = baseline.get(size, {}).get(stage, {}).get('seconds')
+            change = f"{(metrics['seconds'] / old - 1) * 100:+.0f}%" if old else ""
+            payload = f"{metrics['payload_bytes'] / 1024:,.0f}" if 'payload_bytes' in metrics else ""
+            print(f"{size:<6}{stage:<11}{metrics['seconds']:>10.3f}{metrics.get('peak_mb', float('nan')):>10.1f}{payload:>12}{change:>14}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark load, aggregation and figure building at several sizes.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['10k', '1m'])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative increase before flagging")
+    parser.add_argument('--port', type=int, default=54329)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage; the best is kept")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced runs that measure peak memory")
+    args = parser.parse_args(argv)
+
+    results = {size: run_size(SIZES[size], args.port, not args.no_memory, args.repeat) for size in args.sizes}
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+    baseline = stored.get('results', {})
+    _print(results, baseline)
+
+    document = {'machine': {'python': platform.python_version(), 'pandas': pd.__version__,
+                            'cpus': os.cpu_count(), 'platform': platform.platform()},
+                'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"no baseline at {args.baseline}; run with --save-baseline to store one")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for size, stage, metric, old, new in regressions:
+        print(f"REGRESSION {size} {stage} {metric}: {old:,} -> {new:,}")
+    if stored.get('machine', {}).get('cpus') != os.cpu_count():
+        print("note: the baseline was recorded on a machine with a different CPU count")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Synthetic request logs and report tables for benchmarks.
+
+Clients and endpoints are Zipf-distributed (a few keys get most of the traffic)
+and latencies are log-normal with a Pareto tail, so group-bys, top-N selections and
+percentiles see the skew of production data. Report tables follow the schemas in
+src/config.py TABLE_SCHEMAS and have an `id` key column like the Supabase tables.
+"""
+import numpy as np
+import pandas as pd
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+def _labels(prefix: str, count: int) -> np.ndarray:
+    return np.array([f"{prefix}{i}" for i in range(count)], dtype=object)
+
+def _latencies(rng: np.random.Generator, rows: int) -> np.ndarray:
+    """Log-normal latencies (median ~90 ms) with 1% of requests stretched by a Pareto factor."""
+    latency = rng.lognormal(4.5, 1.0, rows)
+    tail = rng.random(rows) < 0.01
+    latency[tail] *= 1 + rng.pareto(1.5, tail.sum())
+    return latency
+
+def request_logs(rows: int, seed: int = 0, clients: int = 5000, endpoints: int = 500) -> pd.DataFrame:
+    """Raw request log with Zipf-skewed clients/endpoints and heavy-tailed latencies."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp('2024-05-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 86400, rows), unit='s'),
+        'api_name': _labels('api-', 50)[rng.integers(0, 50, rows)],
+        'app_name': _labels('app-', 20)[rng.integers(0, 20, rows)],
+        'api_version': np.array(['v1', 'v2', 'v3'], dtype=object)[rng.integers(0, 3, rows)],
+        'uri_path': _labels('/api/v1/resource/', endpoints)[(rng.zipf(1.3, rows) - 1) % endpoints],
+        'client_id': _labels('client-', clients)[(rng.zipf(1.2, rows) - 1) % clients],
+        'status_code_cleaned': rng.choice([200, 201, 204, 400, 404, 500, 503], rows, p=[.8, .05, .05, .03, .04, .02, .01]),
+        'latency_ms': _latencies(rng, rows),
+    })
+
+def _latency_columns(rng: np.random.Generator, rows: int) -> dict:
+    """avg/min/max and percentile latency columns that are consistent with each other."""
+    p50 = _latencies(rng, rows)
+    p90 = p50 * rng.uniform(1.5, 3, rows)
+    p99 = p90 * rng.uniform(1.2, 3, rows)
+    return {
+        'avg_latency': p50 * rng.uniform(1, 1.5, rows),
+        'min_latency': p50 * rng.uniform(0.05, 0.5, rows),
+        'max_latency': p99 * rng.uniform(1, 4, rows),
+        'p50_latency': p50,
+        'p90_latency': p90,
+        'p99_latency': p99,
+        'p99.9_latency': p99 * rng.uniform(1, 2, rows),
+    }
+
+def report_tables(rows: int, seed: int = 0) -> dict:
+    """The three report tables by table name, `rows` rows each."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, rows + 1)
+    # Request counts per key are Zipf-like: a few heavy clients/endpoints, a long tail of light ones
+    requests = lambda: np.minimum(rng.zipf(1.5, rows), 10 ** 7)
+    error_rate = lambda: np.round(rng.beta(1, 30, rows) * 100, 2)
+    first_seen = pd.Timestamp('2024-04-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 30 * 86400, rows), unit='s')
+
+    consumer = pd.DataFrame({
+        'id': ids,
+        'client_id': _labels('client-', rows),
+        'request_count': requests(),
+        **_latency_columns(rng, rows),
+        'error_rate_pct': error_rate(),
+        'api_diversity': np.minimum(rng.zipf(2.0, rows), 500),
+        'first_seen': first_seen,
+        'last_seen': first_seen + pd.to_timedelta(rng.integers(0, 7 * 86400, rows), unit='s'),
+    })
+    consumer.loc[rng.random(rows) < 0.001, 'client_id'] = '(empty)'
+
+    resource = pd.DataFrame({'id': ids, 'uri_path': _labels('/api/v1/resource/', rows), 'request_count': requests(),
+                             **_latency_columns(rng, rows), 'error_rate_pct': error_rate()})
+    resource['utilization'] = pd.cut(resource['request_count'].rank(pct=True), [0, 1 / 3, 2 / 3, 1],
+                                     labels=['Low', 'Medium', 'High']).astype(str)
+    resource['efficiency_score'] = (100 - resource['error_rate_pct']) * (500 / resource['avg_latency']).clip(upper=1)
+
+    score = rng.beta(1.2, 6, rows)
+    maintenance = pd.DataFrame({
+        'id': ids,
+        'uri_path': _labels('/api/v1/resource/', rows),
+        'request_count': requests(),
+        'avg_error_rate': error_rate(),
+        'max_error_rate': np.minimum(error_rate() * rng.uniform(1, 5, rows), 100),
+        'avg_latency': _latencies(rng, rows),
+        'prediction_score': score,
+        'maintenance_priority': pd.cut(score, [-np.inf, 0.4, 0.7, np.inf], labels=['Low', 'Medium', 'High']).astype(str),
+    })
+    return {'consumer_behavior': consumer, 'resource_optimization': resource,
+            'predictive_maintenance_report': maintenance}
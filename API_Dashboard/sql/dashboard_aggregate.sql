@@ -0,0 +1,86 @@
+-- Server-side aggregation used by src/query_builder.py.
+-- Identifiers are quoted with %I and the aggregate function is whitelisted,
+-- so only the shape of the query (not arbitrary SQL) comes from the client.
+-- p_start/p_end restrict the rows to a time range, so time-series windows only
+-- scan the visible range, and p_keys restricts them to some values of p_group_by, so
+-- series for a few APIs do not aggregate every other one. Every earlier signature is
+-- dropped so no overload remains; PostgREST rejects calls that match several
+-- overloads as ambiguous.
+drop function if exists dashboard_aggregate(text, text, text, text, interval, text, text, integer);
+drop function if exists dashboard_aggregate(text, text, text, text, interval, text, text, integer, double precision);
+drop function if exists dashboard_aggregate(text, text, text, text, interval, text, text, integer, double precision,
+                                            timestamptz, timestamptz);
+
+create or replace function dashboard_aggregate(
+    p_table text,
+    p_func text,
+    p_metric text default null,
+    p_group_by text default null,
+    p_bucket interval default null,
+    p_time_column text default 'timestamp',
+    p_order text default 'value_desc',
+    p_limit integer default null,
+    p_quantile double precision default null,
+    p_start timestamptz default null,
+    p_end timestamptz default null,
+    p_keys text[] default null
+)
+returns table (key text, bucket timestamptz, value double precision)
+language plpgsql
+stable
+as $$
+declare
+    agg_expr text;
+    key_expr text;
+    bucket_expr text;
+    order_expr text;
+    where_expr text;
+    query text;
+begin
+    if p_func not in ('count', 'avg', 'sum', 'min', 'max', 'stddev', 'percentile_cont', 'error_rate') then
+        raise exception 'unsupported aggregate function: %', p_func;
+    end if;
+    if p_order not in ('value_desc', 'value_asc', 'key_asc') then
+        raise exception 'unsupported ordering: %', p_order;
+    end if;
+    if p_keys is not null and p_group_by is null then
+        raise exception 'p_keys needs p_group_by';
+    end if;
+    if p_func = 'percentile_cont' and (p_quantile is null or p_quantile < 0 or p_quantile > 1) then
+        raise exception 'percentile_cont needs p_quantile between 0 and 1, got %', coalesce(p_quantile::text, 'null');
+    end if;
+
+    agg_expr := case
+        when p_metric is null then 'count(*)'
+        when p_func = 'percentile_cont' then format('percentile_cont(%s) within group (order by %I)', p_quantile, p_metric)
+        -- Percentage of rows whose status code metric is 400 or above
+        when p_func = 'error_rate' then format('100.0 * count(*) filter (where %I >= 400) / count(*)', p_metric)
+        else format('%s(%I)', p_func, p_metric)
+    end;
+    key_expr := case
+        when p_group_by is null then 'null::text'
+        else format('%I::text', p_group_by)
+    end;
+    bucket_expr := case
+        when p_bucket is null then 'null::timestamptz'
+        else format('date_bin(%L::interval, %I, timestamptz %L)', p_bucket, p_time_column, '2000-01-01')
+    end;
+    where_expr := concat_ws(' and ', 'true',
+        case when p_start is not null then format('%I >= %L', p_time_column, p_start) end,
+        case when p_end is not null then format('%I < %L', p_time_column, p_end) end,
+        case when p_keys is not null then format('%I::text = any(%L::text[])', p_group_by, p_keys) end);
+    order_expr := case p_order
+        when 'value_desc' then '3 desc'
+        when 'value_asc' then '3 asc'
+        else '1 asc, 2 asc'
+    end;
+
+    query := format('select %s, %s, (%s)::double precision from %I where %s group by 1, 2 order by %s',
+                    key_expr, bucket_expr, agg_expr, p_table, where_expr, order_expr);
+    if p_limit is not null then
+        query := query || format(' limit %s', p_limit);
+    end if;
+
+    return query execute query;
+end;
+$$;
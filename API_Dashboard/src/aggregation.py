@@ -0,0 +1,144 @@
+"""
+Single-pass, vectorised computation of the src/analytics.py metrics.
+
+Each dimension column is encoded to integer codes once (categoricals reuse their
+codes), and every metric is a NumPy bincount over those codes, so asking for all
+metrics costs one encode per column instead of a groupby/value_counts each.
+The results match the shapes returned by the analytics functions.
+"""
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+# Metric name -> dimension column it is computed over
+METRIC_DIMENSIONS = {
+    'avg_latency_per_api': 'api_name',
+    'avg_latency_per_app': 'app_name',
+    'top_clients': 'client_id',
+    'top_endpoints': 'uri_path',
+    'status_code_distribution': 'status_code_cleaned',
+    'version_usage': 'api_version',
+}
+ALL_METRICS = tuple(METRIC_DIMENSIONS) + ('summary',)
+
+_SUMMARY_ROWS = ['count', 'unique', 'top', 'freq', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+@dataclass
+class AggregationResult:
+    """Bundle of metric results; metrics that were not requested stay None."""
+    row_count: int
+    avg_latency_per_api: Optional[pd.Series] = None
+    avg_latency_per_app: Optional[pd.Series] = None
+    top_clients: Optional[pd.Series] = None
+    top_endpoints: Optional[pd.Series] = None
+    status_code_distribution: Optional[pd.Series] = None
+    version_usage: Optional[pd.Series] = None
+    summary: Optional[pd.DataFrame] = None
+    computed: tuple = field(default_factory=tuple)
+
+class _Encoder:
+    """Encodes each column to (codes, uniques) and counts each code at most once per aggregation."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._encoded = {}
+        self._counts = {}
+
+    def counts(self, column: str) -> np.ndarray:
+        if column not in self._counts:
+            codes, uniques = self(column)
+            self._counts[column] = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        return self._counts[column]
+
+    def __call__(self, column: str):
+        if column not in self._encoded:
+            values = self.df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, uniques = pd.factorize(values)
+            self._encoded[column] = (codes, uniques)
+        return self._encoded[column]
+
+def _value_counts(encode: _Encoder, column: str, n: int = None) -> pd.Series:
+    codes, uniques = encode(column)
+    counts = encode.counts(column)
+    order = np.argsort(-counts, kind='stable')
+    order = order[counts[order] > 0][:n]
+    return pd.Series(counts[order], index=pd.Index(np.asarray(uniques)[order], name=column), name='count')
+
+def _mean_per_key(encode: _Encoder, column: str, values: np.ndarray, name: str) -> pd.Series:
+    codes, uniques = encode(column)
+    valid = (codes >= 0) & ~np.isnan(values)
+    sums = np.bincount(codes[valid], weights=values[valid], minlength=len(uniques))
+    counts = np.bincount(codes[valid], minlength=len(uniques))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    keep = encode.counts(column) > 0
+    result = pd.Series(means[keep], index=pd.Index(np.asarray(uniques)[keep], name=column), name=name)
+    return result.sort_values(ascending=False)
+
+def fast_summary(df: pd.DataFrame, encode: _Encoder = None) -> pd.DataFrame:
+    """
+    Equivalent of df.describe(include='all') that encodes object columns once and
+    uses bincounts for unique/top/freq instead of hashing each column repeatedly.
+    """
+    encode = encode or _Encoder(df)
+    stats = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_bool_dtype(values.dtype) or not (
+                pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_datetime64_any_dtype(values.dtype)):
+            codes, uniques = encode(column)
+            counts = encode.counts(column)
+            top = int(np.argmax(counts)) if len(counts) else None
+            stats[column] = {'count': int(counts.sum()), 'unique': len(uniques),
+                             'top': uniques[top] if top is not None else np.nan,
+                             'freq': int(counts[top]) if top is not None else np.nan}
+        elif pd.api.types.is_datetime64_any_dtype(values.dtype):
+            valid = values.dropna()
+            if valid.empty:
+                stats[column] = {'count': 0}
+                continue
+            quartiles = valid.quantile([0, 0.25, 0.5, 0.75, 1]).tolist()
+            stats[column] = {'count': len(valid), 'mean': valid.mean(),
+                             **dict(zip(['min', '25%', '50%', '75%', 'max'], quartiles))}
+        else:
+            numbers = values.to_numpy(dtype='float64', na_value=np.nan)
+            numbers = numbers[~np.isnan(numbers)]
+            if not len(numbers):
+                stats[column] = {'count': 0}
+                continue
+            quartiles = np.quantile(numbers, [0, 0.25, 0.5, 0.75, 1])
+            stats[column] = {'count': float(len(numbers)), 'mean': numbers.mean(),
+                             'std': numbers.std(ddof=1) if len(numbers) > 1 else np.nan,
+                             **dict(zip(['min', '25%', '50%', '75%', 'max'], quartiles))}
+    summary = pd.DataFrame(stats, index=_SUMMARY_ROWS, columns=df.columns)
+    return summary.dropna(how='all')
+
+def aggregate(df: pd.DataFrame, metrics=ALL_METRICS, n: int = 10) -> AggregationResult:
+    """Computes the requested metrics over a raw request frame in one pass per column."""
+    encode = _Encoder(df)
+    result = AggregationResult(row_count=len(df))
+    computed = []
+    latency = None
+    for metric in metrics:
+        column = METRIC_DIMENSIONS.get(metric)
+        if metric == 'summary':
+            result.summary = fast_summary(df, encode)
+        elif column not in df.columns:
+            continue
+        elif metric.startswith('avg_latency'):
+            if 'latency_ms' not in df.columns:
+                continue
+            if latency is None:
+                latency = df['latency_ms'].to_numpy(dtype='float64', na_value=np.nan)
+            setattr(result, metric, _mean_per_key(encode, column, latency, 'latency_ms'))
+        elif metric.startswith('top_'):
+            setattr(result, metric, _value_counts(encode, column, n))
+        else:
+            setattr(result, metric, _value_counts(encode, column))
+        computed.append(metric)
+    result.computed = tuple(computed)
+    return result
@@ -1,26 +1,78 @@
 # src/analytics.py
+# Every function accepts either a pandas DataFrame of raw requests or a
+# query_builder.RemoteTable, in which case the aggregation runs in Postgres.
+# The latency percentile functions also accept a rollups.RollupEngine and merge
+# its per-window sketches instead of scanning raw rows: per API and per app from the
+# engine's sketch_dimensions, which rollups.main and the live view keep for both.
 import pandas as pd
+from src.aggregation import ALL_METRICS, aggregate, fast_summary
+from src.query_builder import RemoteTable
+from src.rollups import RollupEngine
+from src.sketches import DEFAULT_QUANTILES, quantile_label
+
+_SUMMARY_STATS = {'count': 'count', 'mean': 'avg', 'std': 'stddev', 'min': 'min', 'max': 'max'}
 
 def get_summary(df):
-    return df.describe(include='all')
+    if isinstance(df, RemoteTable):
+        return pd.DataFrame({'latency_ms': {stat: df.aggregate(func, 'latency_ms').iloc[0]
+                                            for stat, func in _SUMMARY_STATS.items()}})
+    return fast_summary(df)
+
+def compute_metrics(df, metrics=None, n=10):
+    # All requested metrics in one vectorised pass; see src/aggregation.py
+    return aggregate(df, metrics or ALL_METRICS, n)
 
 def requests_over_time(df, freq='5min'):
+    if isinstance(df, RemoteTable):
+        return df.aggregate('count', freq=freq, order='key_asc')
     return df.groupby(pd.Grouper(key='timestamp', freq=freq)).size()
 
 def avg_latency_per_api(df):
+    if isinstance(df, RemoteTable):
+        return df.aggregate('avg', 'latency_ms', group_by='api_name')
     return df.groupby('api_name')['latency_ms'].mean().sort_values(ascending=False)
 
 def avg_latency_per_app(df):
+    if isinstance(df, RemoteTable):
+        return df.aggregate('avg', 'latency_ms', group_by='app_name')
     return df.groupby('app_name')['latency_ms'].mean().sort_values(ascending=False)
 
 def top_clients(df, n=10):
+    if isinstance(df, RemoteTable):
+        return df.aggregate('count', group_by='client_id', limit=n)
     return df['client_id'].value_counts().head(n)
 
 def top_endpoints(df, n=10):
+    if isinstance(df, RemoteTable):
+        return df.aggregate('count', group_by='uri_path', limit=n)
     return df['uri_path'].value_counts().head(n)
 
 def status_code_distribution(df):
+    if isinstance(df, RemoteTable):
+        return df.aggregate('count', group_by='status_code_cleaned')
     return df['status_code_cleaned'].value_counts()
 
 def version_usage(df):
+    if isinstance(df, RemoteTable):
+        return df.aggregate('count', group_by='api_version')
     return df['api_version'].value_counts()
+
+def latency_percentiles(df, by, quantiles=DEFAULT_QUANTILES, resolution='1h', start=None, end=None):
+    if isinstance(df, RollupEngine):
+        result = df.percentiles([by], quantiles, resolution, start, end)
+    elif isinstance(df, RemoteTable):
+        result = pd.DataFrame({quantile_label(q): df.aggregate('percentile_cont', 'latency_ms', group_by=by, quantile=q)
+                               for q in quantiles})
+    else:
+        result = df.groupby(by)['latency_ms'].quantile(list(quantiles)).unstack()
+        result.columns = [quantile_label(q) for q in quantiles]
+    return result.sort_values(result.columns[-1], ascending=False)
+
+def latency_percentiles_per_api(df, **kwargs):
+    return latency_percentiles(df, 'api_name', **kwargs)
+
+def latency_percentiles_per_app(df, **kwargs):
+    return latency_percentiles(df, 'app_name', **kwargs)
+
+def latency_percentiles_per_client(df, **kwargs):
+    return latency_percentiles(df, 'client_id', **kwargs)
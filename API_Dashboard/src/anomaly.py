@@ -0,0 +1,255 @@
+"""
+Streaming anomaly scores for predictive_maintenance_report.
+
+Raw requests are folded into fixed windows per endpoint (uri_path). Once a window
+closes (a later window has been seen) every endpoint active in it is scored against
+its own baseline and the baseline is updated. State per endpoint is a fixed set of
+numbers: EWMA level and variance of log average latency, an hour-of-day seasonal
+offset, an EWMA error rate, the decayed score and the report totals. Endpoints are
+positions in NumPy arrays, so a window is scored for thousands of endpoints with a
+handful of vectorised operations and history is never re-read.
+
+The score of a window is driven by the larger of the latency z-score (against
+level + seasonal offset) and the error-count z-score (on a square-root scale,
+against the EWMA error rate). prediction_score is the latest window score, decaying with
+ANOMALY_SCORE_HALF_LIFE once the anomaly passes.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from src.config import (ANOMALY_ALPHA, ANOMALY_MIN_REQUESTS, ANOMALY_RESOLUTION, ANOMALY_SCORE_HALF_LIFE,
+                        ANOMALY_SEASON_GAMMA, ANOMALY_WARMUP_WINDOWS)
+from src.rollups import RESOLUTIONS, _partials, maintenance_priority, merge_partials
+
+SEASON_SLOTS = 24
+# Floors that keep z-scores finite for very stable endpoints
+MIN_LATENCY_SIGMA = 0.05
+MIN_ERROR_RATE = 0.01
+# Residuals are clipped to this many sigmas before updating a baseline, so an anomaly
+# does not become the new normal within a few windows
+UPDATE_CLIP_SIGMAS = 3.0
+
+# Baseline (level, var, error_level, baseline_windows), score (score, last_window) and
+# report totals (the rest) per endpoint; the seasonal offsets are kept in a separate matrix
+_STATE_COLUMNS = ['level', 'var', 'error_level', 'baseline_windows', 'score', 'last_window',
+                  'window_count', 'request_count', 'latency_sum', 'latency_count', 'error_count',
+                  'max_error_rate']
+REPORT_COLUMNS = ['uri_path', 'request_count', 'avg_error_rate', 'max_error_rate', 'avg_latency',
+                  'prediction_score', 'maintenance_priority']
+
+def window_score(z: np.ndarray) -> np.ndarray:
+    """Maps a z-score to [0, 1): z <= 2.3 scores 0, z = 3.5 reaches Medium (0.4) and z = 5 High (0.7)."""
+    return 1 - np.exp(-np.maximum(z - 2.3, 0) / 2.2)
+
+def _add_totals(state: dict, idx: np.ndarray, count, latency_sum, latency_count, errors):
+    """Adds windows to the report totals of the endpoints at `idx`."""
+    error_rate = 100 * errors / count
+    np.add.at(state['window_count'], idx, 1)
+    np.add.at(state['request_count'], idx, count)
+    np.add.at(state['latency_sum'], idx, latency_sum)
+    np.add.at(state['latency_count'], idx, latency_count)
+    np.add.at(state['error_count'], idx, errors)
+    np.maximum.at(state['max_error_rate'], idx, error_rate)
+
+def _with_keys(known: pd.Index, state: dict, keys: pd.Index) -> tuple:
+    """
+    (keys, state, positions of `keys`, number added) with unseen endpoints appended;
+    the given index and state arrays are left unchanged.
+    """
+    positions = known.get_indexer(keys)
+    new = positions < 0
+    if not new.any():
+        return known, state, positions, 0
+    added = pd.Index(keys[new]).unique()
+    known = known.append(added.astype(object)).rename('uri_path')
+    state = {column: np.concatenate([values, np.full(len(added), -1 if column == 'last_window' else 0, dtype=float)])
+             for column, values in state.items()}
+    return known, state, known.get_indexer(keys), len(added)
+
+class AnomalyEngine:
+    """Per-endpoint baselines and scores, updated one closed window at a time."""
+
+    def __init__(self, resolution: str = ANOMALY_RESOLUTION, alpha: float = ANOMALY_ALPHA,
+                 season_gamma: float = ANOMALY_SEASON_GAMMA, warmup: int = ANOMALY_WARMUP_WINDOWS,
+                 min_requests: int = ANOMALY_MIN_REQUESTS, half_life: float = ANOMALY_SCORE_HALF_LIFE):
+        self.resolution = resolution
+        self.freq = RESOLUTIONS[resolution]
+        self.step = pd.Timedelta(self.freq).value
+        self.alpha = alpha
+        self.season_gamma = season_gamma
+        self.warmup = warmup
+        self.min_requests = min_requests
+        self.decay = 0.5 ** (1 / half_life)
+        self.keys = pd.Index([], dtype=object, name='uri_path')
+        self.state = {column: np.zeros(0) for column in _STATE_COLUMNS}
+        self.season = np.zeros((0, SEASON_SLOTS))
+        # Last window scored; rows for it or earlier windows arrive too late and are dropped
+        self.closed_until = None
+        self.late_rows = 0
+        self._open = None
+
+    def _positions(self, keys: pd.Index) -> np.ndarray:
+        """Array positions of endpoint keys, growing the state for unseen endpoints."""
+        self.keys, self.state, positions, added = _with_keys(self.keys, self.state, keys)
+        if added:
+            self.season = np.vstack([self.season, np.zeros((added, SEASON_SLOTS))])
+        return positions
+
+    def update(self, requests: pd.DataFrame) -> int:
+        """
+        Adds a batch of parsed requests (src.upload_to_supabase.parse_requests) and
+        scores every window closed by it. Returns the number of windows scored.
+        """
+        requests = requests.dropna(subset=['timestamp'])
+        if requests.empty:
+            return 0
+        return self.update_partials(_partials(requests, self.freq, ['uri_path']))
+
+    def update_partials(self, batch: pd.DataFrame) -> int:
+        """Like update(), for rollup partials already indexed by (window_start, uri_path)."""
+        if self.closed_until is not None:
+            late = batch.index.get_level_values('window_start') <= self.closed_until
+            self.late_rows += int(batch.loc[late, 'count'].sum())
+            batch = batch[~late]
+        if batch.empty:
+            return 0
+        pending = batch if self._open is None else pd.concat([self._open, batch])
+        pending = merge_partials(pending, ['window_start', 'uri_path'])
+        windows = pending.index.get_level_values('window_start')
+        # The latest window may still be receiving rows
+        closed = windows < windows.max()
+        self._open = pending[~closed]
+        return self._score(pending[closed])
+
+    def close(self) -> int:
+        """Scores the open windows too, e.g. at the end of a log replay."""
+        pending, self._open = self._open, None
+        return 0 if pending is None else self._score(pending)
+
+    def _score(self, partials: pd.DataFrame) -> int:
+        if partials.empty:
+            return 0
+        partials = partials.sort_index(level='window_start')
+        windows = partials.index.get_level_values('window_start')
+        nanos = windows.as_unit('ns').asi8
+        numbers = nanos // self.step
+        positions = self._positions(partials.index.get_level_values('uri_path'))
+        count = partials['count'].to_numpy(dtype=float)
+        latency_sum = partials['latency_sum'].to_numpy(dtype=float)
+        latency_count = partials['latency_count'].to_numpy(dtype=float)
+        errors = partials['error_count'].to_numpy(dtype=float)
+        slots = (nanos // pd.Timedelta('1h').value) % SEASON_SLOTS
+        bounds = np.flatnonzero(np.diff(numbers)) + 1
+        for part in np.split(np.arange(len(partials)), bounds):
+            self._fold(int(numbers[part[0]]), int(slots[part[0]]), positions[part],
+                       count[part], latency_sum[part], latency_count[part], errors[part])
+        self.closed_until = windows[-1]
+        return len(bounds) + 1
+
+    def _fold(self, window: int, slot: int, idx: np.ndarray, count, latency_sum, latency_count, errors):
+        """Scores one window for the endpoints at `idx`, then updates their baselines."""
+        s = self.state
+        _add_totals(s, idx, count, latency_sum, latency_count, errors)
+
+        # Windows with too few requests only count towards the totals
+        usable = (count >= self.min_requests) & (latency_count > 0)
+        idx, count, errors = idx[usable], count[usable], errors[usable]
+        x = np.log(np.maximum(latency_sum[usable] / latency_count[usable], 1e-3))
+        seen = s['baseline_windows'][idx]
+        first = seen == 0
+        level = np.where(first, x, s['level'][idx])
+        error_level = np.where(first, errors / count, s['error_level'][idx])
+        season = self.season[idx, slot]
+
+        # Score against the baseline as it was before this window
+        sigma = np.sqrt(np.maximum(s['var'][idx], MIN_LATENCY_SIGMA ** 2))
+        residual = x - level - season
+        # Error counts are compared on a square-root scale, where Poisson counts have unit
+        # variance, so a few errors on a quiet endpoint do not look like an outage
+        expected = np.maximum(error_level, MIN_ERROR_RATE) * count
+        z = np.maximum(residual / sigma, 2 * (np.sqrt(errors) - np.sqrt(expected)))
+        scored = np.where(seen >= self.warmup, window_score(z), 0.0)
+        last = s['last_window'][idx]
+        decayed = np.where(last >= 0, s['score'][idx] * self.decay ** (window - last), 0.0)
+        s['score'][idx] = np.maximum(scored, decayed)
+        s['last_window'][idx] = window
+
+        # Update the baselines; early windows use a running mean until alpha takes over
+        alpha = np.maximum(self.alpha, 1 / (seen + 1))
+        residual = np.clip(residual, -UPDATE_CLIP_SIGMAS * sigma, UPDATE_CLIP_SIGMAS * sigma)
+        level = level + alpha * residual
+        s['level'][idx] = level
+        s['var'][idx] = np.where(first, 0.0, (1 - alpha) * s['var'][idx] + alpha * residual ** 2)
+        # Holt-Winters seasonal update: the part of the residual the level did not absorb
+        self.season[idx, slot] = season + self.season_gamma * (1 - alpha) * residual
+        errors = np.minimum(errors, (np.sqrt(expected) + UPDATE_CLIP_SIGMAS / 2) ** 2)
+        s['error_level'][idx] = error_level + alpha * (errors / count - error_level)
+        s['baseline_windows'][idx] = seen + 1
+
+    def report(self) -> pd.DataFrame:
+        """
+        predictive_maintenance_report rows, with scores decayed to the last closed window.
+        Endpoints that never had a window busy enough to score have a score of 0.
+        """
+        keys = self.keys
+        s = {column: values.copy() for column, values in self.state.items()}
+        if self._open is not None:
+            # Totals include the windows still open; their scores come once they close. Endpoints
+            # only seen in open windows are added to this copy, not to the engine's state
+            keys, s, positions, _ = _with_keys(keys, s, self._open.index.get_level_values('uri_path'))
+            _add_totals(s, positions, *(self._open[column].to_numpy(dtype=float)
+                        for column in ['count', 'latency_sum', 'latency_count', 'error_count']))
+        if keys.empty:
+            return pd.DataFrame(columns=REPORT_COLUMNS)
+        scored = s['last_window'] >= 0
+        now = self.closed_until.value // self.step if self.closed_until is not None else 0
+        score = np.where(scored, s['score'] * self.decay ** np.maximum(now - s['last_window'], 0), 0.0)
+        report = pd.DataFrame({
+            'uri_path': keys.to_numpy(),
+            'request_count': s['request_count'].astype('int64'),
+            # Weighted by requests: total errors over total requests, not a mean of window rates
+            'avg_error_rate': 100 * s['error_count'] / np.maximum(s['request_count'], 1),
+            'max_error_rate': s['max_error_rate'],
+            'avg_latency': s['latency_sum'] / np.where(s['latency_count'] > 0, s['latency_count'], np.nan),
+            'prediction_score': score,
+        })
+        report['maintenance_priority'] = maintenance_priority(report['prediction_score'])
+        return report
+
+    def save(self, directory: str):
+        """
+        Persists the endpoint state and the still-open windows as Parquet files, and the
+        last closed window with the late-row count as JSON.
+        """
+        os.makedirs(directory, exist_ok=True)
+        # Saved as is: endpoint state only records windows that reached min_requests
+        closed_until = None if self.closed_until is None else self.closed_until.isoformat()
+        with open(os.path.join(directory, f"anomaly_windows_{self.resolution}.json"), 'w') as f:
+            json.dump({'closed_until': closed_until, 'late_rows': self.late_rows}, f)
+        state = pd.DataFrame(self.state, index=self.keys)
+        for slot in range(SEASON_SLOTS):
+            state[f"season_{slot}"] = self.season[:, slot]
+        state.to_parquet(os.path.join(directory, f"anomaly_state_{self.resolution}.parquet"))
+        if self._open is not None:
+            self._open.to_parquet(os.path.join(directory, f"anomaly_open_{self.resolution}.parquet"))
+
+    @classmethod
+    def load(cls, directory: str, resolution: str = ANOMALY_RESOLUTION, **kwargs):
+        """Restores an engine saved with save(), or a fresh one when nothing was saved."""
+        engine = cls(resolution, **kwargs)
+        path = os.path.join(directory, f"anomaly_state_{resolution}.parquet")
+        if not os.path.exists(path):
+            return engine
+        state = pd.read_parquet(path)
+        engine.keys = state.index.astype(object).rename('uri_path')
+        engine.state = {column: state[column].to_numpy(dtype=float) for column in _STATE_COLUMNS}
+        engine.season = state[[f"season_{slot}" for slot in range(SEASON_SLOTS)]].to_numpy(dtype=float)
+        with open(os.path.join(directory, f"anomaly_windows_{resolution}.json")) as f:
+            windows = json.load(f)
+        engine.closed_until = None if windows['closed_until'] is None else pd.Timestamp(windows['closed_until'])
+        engine.late_rows = windows['late_rows']
+        path = os.path.join(directory, f"anomaly_open_{resolution}.parquet")
+        if os.path.exists(path):
+            engine._open = pd.read_parquet(path)
+        return engine
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+
+class TableCache:
+    """
+    Process-wide LRU cache for loaded tables, shared by every Streamlit session.
+
+    Entries are keyed by (table name, query parameters), expire after a per-table TTL
+    and are evicted least-recently-used first once the memory budget is exceeded.
+    Concurrent misses on the same key wait for a single load instead of each
+    hitting the backend.
+    """
+
+    def __init__(self, max_bytes: int, default_ttl: float, table_ttls: dict = None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.table_ttls = table_ttls or {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, nbytes, df)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> Lock held while the key is being loaded
+
+    def get_or_load(self, table_name: str, params: tuple, loader) -> pd.DataFrame:
+        """Returns the cached frame for (table_name, params), calling loader() on a miss."""
+        key = (table_name, params)
+        df = self._get(key)
+        if df is not None:
+            return df
+
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        try:
+            with load_lock:
+                # Another session may have finished loading while we waited
+                df = self._get(key)
+                if df is not None:
+                    return df
+                with self._lock:
+                    self.misses += 1
+                df = loader()
+                if not df.empty:
+                    self._put(key, df)
+                return df
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+
+    def invalidate(self, table_name: str = None):
+        """Drops all cached entries for a table, or everything when no table is given."""
+        with self._lock:
+            for key in [k for k in self._entries if table_name is None or k[0] == table_name]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and current memory use."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, nbytes, df = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._bytes -= nbytes
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return df
+
+    def _put(self, key, df: pd.DataFrame):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        ttl = self.table_ttls.get(key[0], self.default_ttl)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (time.monotonic() + ttl, nbytes, df)
+            self._bytes += nbytes
+            # Evict least recently used entries, but always keep the newest one
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, old_bytes, _) = self._entries.popitem(last=False)
+                self._bytes -= old_bytes
+                self.evictions += 1
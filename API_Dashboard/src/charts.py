@@ -0,0 +1,292 @@
+"""
+Figure building for the report dashboards, separate from rendering.
+
+Each report is described as an ordered list of sections holding ChartSpecs. The
+specs of a report are built together in a thread pool and share their
+intermediate results (one nlargest per metric, one value_counts per column, one
+correlation matrix) through SharedFrames; src/visualization.py then renders the
+finished figures in order. Nothing here calls Streamlit.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+import pandas as pd
+from src.aggregation import fast_summary
+from src.config import CHART_WORKERS
+from src.data_loader import memory_report
+from src.figure_cache import frame_fingerprint
+from src.filters import find_index
+from src.lazy import lazy_import
+from src.rendering import box_figure, histogram_figure, scatter_figure
+from src.tracing import span
+
+px = lazy_import('plotly.express')
+
+class SharedFrames:
+    """Intermediate results shared by the charts of one frame, each computed at most once."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._results = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _once(self, key: tuple, compute):
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._results:
+                self._results[key] = compute()
+            return self._results[key]
+
+    def rows_in(self, column: str, values: tuple, exclude: bool = False) -> pd.DataFrame:
+        """
+        Rows whose column value is one of values (or, with exclude, is not). Uses the
+        table's filter index when it has one instead of comparing every row.
+        """
+        def select():
+            index = find_index(self.df)
+            if index is None:
+                mask = self.df[column].isin(values).to_numpy(dtype=bool, na_value=False)
+                return self.df[~mask if exclude else mask]
+            dimension = index.dimension(column)
+            codes = dimension.codes_of(values)
+            if not exclude:
+                return self.df.take(dimension.positions(codes))
+            return self.df[~dimension.allowed(codes)[dimension.codes]]
+        return self._once(('rows_in', column, values, exclude), select)
+
+    def client_rows(self) -> pd.DataFrame:
+        """Rows with a real client id."""
+        return self.rows_in('client_id', ('No Client ID',), exclude=True)
+
+    def top(self, metric: str, n: int, clients_only: bool = False) -> pd.DataFrame:
+        """The n rows with the highest metric."""
+        return self._once(('top', metric, n, clients_only),
+                          lambda: (self.client_rows() if clients_only else self.df).nlargest(n, metric))
+
+    def value_counts(self, column: str) -> pd.Series:
+        return self._once(('value_counts', column), lambda: self.df[column].value_counts())
+
+    def numeric_corr(self) -> pd.DataFrame:
+        return self._once(('numeric_corr',), lambda: self.df.select_dtypes(include=['number']).corr())
+
+@dataclass(frozen=True)
+class ChartSpec:
+    """
+    One chart of a report. build(shared) returns the figure, or None when there is
+    nothing to plot; specs without a build only show their message. drill_down names
+    the filter dimension on the chart's x axis, so clicking a bar filters to it.
+    """
+    key: tuple
+    subheader: Optional[str]
+    build: Optional[Callable] = None
+    message: Optional[str] = None
+    drill_down: Optional[str] = None
+
+@dataclass(frozen=True)
+class Section:
+    """A group of charts that is switched on and off together on the dashboard."""
+    label: str
+    key: str
+    charts: tuple
+
+def _has(df: pd.DataFrame, *columns) -> bool:
+    return all(column in df.columns for column in columns)
+
+def _bar(plot_df: pd.DataFrame, x: str, y: str, title: str):
+    return None if plot_df.empty else px.bar(plot_df, x=x, y=y, title=title)
+
+def _pie(counts: pd.Series, names: str, title: str):
+    counts = counts.reset_index()
+    counts.columns = [names, 'Count']
+    return px.pie(counts, names=names, values='Count', title=title)
+
+def _top_clients_chart(metric: str, n: int, title: str, subheader: str, message: str) -> ChartSpec:
+    return ChartSpec(('top_clients', metric, n), subheader,
+                     lambda shared: _bar(shared.top(metric, n, clients_only=True), 'client_id', metric, title), message,
+                     drill_down='client_id')
+
+def _top_uri_chart(metric: str, title: str, subheader: str, message: str = None) -> ChartSpec:
+    return ChartSpec(('top', 'uri_path', metric, 15), subheader,
+                     lambda shared: _bar(shared.top(metric, 15), 'uri_path', metric, title), message,
+                     drill_down='uri_path')
+
+def _overview(df: pd.DataFrame) -> dict:
+    with span("describe", rows=len(df)):
+        return {'memory': memory_report(df), 'summary': fast_summary(df)}
+
+def overview(df: pd.DataFrame) -> ChartSpec:
+    """Memory report and descriptive statistics for the data overview."""
+    return ChartSpec(('overview',), None, lambda shared: _overview(df))
+
+def client_request_counts(df: pd.DataFrame) -> ChartSpec:
+    if not _has(df, 'client_id', 'request_count'):
+        return ChartSpec(('missing',), None, message="Client request counts cannot be plotted. Missing 'client_id' or 'request_count' column.")
+    return _top_clients_chart('request_count', 10, 'Top 10 Clients by Total Request Count',
+                              "Top Clients by Request Count", "No client-specific data to plot request counts.")
+
+def consumer_avg_latency(df: pd.DataFrame) -> ChartSpec:
+    if not _has(df, 'client_id', 'avg_latency'):
+        return ChartSpec(('missing',), None, message="Average latency by client cannot be plotted. Missing 'client_id' or 'avg_latency' column.")
+    return _top_clients_chart('avg_latency', 15, 'Top 15 Clients by Average Latency (ms)',
+                              "Client Average Latency Distribution", "No client-specific data to plot average latency.")
+
+def error_rate_distribution(df: pd.DataFrame) -> ChartSpec:
+    if _has(df, 'error_rate_pct'):
+        return _top_clients_chart('error_rate_pct', 15, 'Top 15 Clients by Error Rate (%)',
+                                  "Client Error Rate Distribution", "No client-specific data to plot error rates.")
+    if _has(df, 'avg_error_rate', 'uri_path'):
+        return _top_uri_chart('avg_error_rate', 'Top 15 URIs by Average Error Rate (%)',
+                              "API Average Error Rate Distribution", "No API-specific data to plot average error rates.")
+    return ChartSpec(('missing',), None, message="Error rate distribution cannot be plotted. Missing relevant error rate column.")
+
+def api_diversity(df: pd.DataFrame) -> ChartSpec:
+    return _top_clients_chart('api_diversity', 15, 'Top 15 Clients by API Diversity',
+                              "Client API Diversity", "No client-specific data to plot API diversity.")
+
+def api_latency_and_requests(df: pd.DataFrame) -> list:
+    if not _has(df, 'uri_path', 'avg_latency', 'request_count'):
+        return [ChartSpec(('missing',), None, message="API latency/request plots cannot be generated. Missing 'uri_path', 'avg_latency', or 'request_count'.")]
+    return [
+        ChartSpec(('scatter', 'avg_latency', 'request_count', 'uri_path'), "API Latency vs. Request Count",
+                  lambda shared: scatter_figure(df, x='avg_latency', y='request_count', color='uri_path',
+                                                size='request_count', hover_name='uri_path',
+                                                title='API Average Latency vs. Request Count')),
+        _top_uri_chart('avg_latency', 'Top 15 APIs by Average Latency (ms)', "Top APIs by Average Latency"),
+        _top_uri_chart('request_count', 'Top 15 APIs by Request Count', "Top APIs by Request Count"),
+    ]
+
+def resource_utilization(df: pd.DataFrame) -> ChartSpec:
+    if not _has(df, 'utilization', 'uri_path'):
+        return ChartSpec(('missing',), None, message="Resource utilization cannot be plotted. Missing 'utilization' or 'uri_path'.")
+    return ChartSpec(('pie', 'utilization'), "API Utilization Distribution",
+                     lambda shared: _pie(shared.value_counts('utilization'), 'Utilization Level',
+                                         'Distribution of API Utilization Levels'))
+
+def _priority_bar(shared: SharedFrames):
+    high_priority_apis = shared.rows_in('maintenance_priority', ('High', 'Medium')).sort_values('maintenance_priority').head(20)
+    if high_priority_apis.empty:
+        return None
+    return px.bar(high_priority_apis, x='uri_path', y='avg_error_rate' if 'avg_error_rate' in high_priority_apis.columns else None,
+                  color='maintenance_priority', title='APIs with High/Medium Maintenance Priority',
+                  hover_data=['avg_error_rate', 'max_error_rate'])
+
+def maintenance_priority(df: pd.DataFrame) -> list:
+    if not _has(df, 'maintenance_priority', 'uri_path'):
+        return [ChartSpec(('missing',), None, message="Maintenance priority cannot be plotted. Missing 'maintenance_priority' or 'uri_path'.")]
+    return [
+        ChartSpec(('pie', 'maintenance_priority'), "Maintenance Priority Distribution",
+                  lambda shared: _pie(shared.value_counts('maintenance_priority'), 'Priority Level',
+                                      'Distribution of API Maintenance Priorities')),
+        ChartSpec(('priority_bar',), "APIs by Maintenance Priority", _priority_bar,
+                  "No high/medium priority APIs to display.", drill_down='uri_path'),
+    ]
+
+def latency_percentiles(df: pd.DataFrame, key_col: str) -> list:
+    """p50/p90/p99/p99.9 latency for the keys with the worst p99 latency."""
+    if not _has(df, key_col, 'p99_latency'):
+        return []
+    percentile_cols = [col for col in ['p50_latency', 'p90_latency', 'p99_latency', 'p99.9_latency'] if col in df.columns]
+
+    def build(shared):
+        plot_df = shared.top('p99_latency', 15).melt(id_vars=key_col, value_vars=percentile_cols,
+                                                     var_name='Percentile', value_name='Latency (ms)')
+        return px.bar(plot_df, x=key_col, y='Latency (ms)', color='Percentile', barmode='group',
+                      title=f'Latency Percentiles for the 15 Slowest ({key_col}, by p99)')
+    return [ChartSpec(('percentiles', key_col), "Latency Percentiles", build, drill_down=key_col)]
+
+def correlation_heatmap(df: pd.DataFrame) -> ChartSpec:
+    if df.select_dtypes(include=['number']).empty:
+        return ChartSpec(('missing',), "Correlation Heatmap", message="No numeric columns available for correlation heatmap.")
+    return ChartSpec(('correlation_heatmap',), "Correlation Heatmap",
+                     lambda shared: px.imshow(shared.numeric_corr(), text_auto=True, aspect="auto", title="Correlation Heatmap"))
+
+def latency_boxplot(df: pd.DataFrame) -> ChartSpec:
+    if 'avg_latency' not in df.columns:
+        return ChartSpec(('missing',), "Latency Boxplot", message="No latency data available for boxplot.")
+    return ChartSpec(('box', 'avg_latency'), "Latency Boxplot",
+                     lambda shared: box_figure(df['avg_latency'], title="Boxplot of Latency (ms)", y_label='avg_latency'))
+
+def request_boxplot(df: pd.DataFrame) -> ChartSpec:
+    if 'request_count' not in df.columns:
+        return ChartSpec(('missing',), "Request Count Boxplot", message="No request count data available for boxplot.")
+    return ChartSpec(('box', 'request_count'), "Request Count Boxplot",
+                     lambda shared: box_figure(df['request_count'], title="Boxplot of Request Count", y_label='request_count'))
+
+def latency_histogram(df: pd.DataFrame) -> ChartSpec:
+    if 'avg_latency' not in df.columns:
+        return ChartSpec(('missing',), "Latency Histogram", message="No latency data available for histogram.")
+    return ChartSpec(('histogram', 'avg_latency'), "Latency Histogram",
+                     lambda shared: histogram_figure(df['avg_latency'], title="Histogram of Latency (ms)", x_label='avg_latency'))
+
+def request_histogram(df: pd.DataFrame) -> ChartSpec:
+    if 'request_count' not in df.columns:
+        return ChartSpec(('missing',), "Request Count Histogram", message="No request count data available for histogram.")
+    return ChartSpec(('histogram', 'request_count'), "Request Count Histogram",
+                     lambda shared: histogram_figure(df['request_count'], title="Histogram of Request Count", x_label='request_count'))
+
+def latency_vs_requests(df: pd.DataFrame) -> ChartSpec:
+    if not _has(df, 'avg_latency', 'request_count'):
+        return ChartSpec(('missing',), "Latency vs Request Count", message="Both latency and request count data are required for this plot.")
+    return ChartSpec(('scatter', 'request_count', 'avg_latency'), "Latency vs Request Count",
+                     lambda shared: scatter_figure(df, x='request_count', y='avg_latency', title="Latency vs Request Count"))
+
+def report_sections(df: pd.DataFrame, display_name: str) -> list:
+    """The chart sections of a report in the order they are rendered."""
+    if "Consumer Behavior" in display_name:
+        sections = [
+            Section("Client requests and latency", "clients", (client_request_counts(df), consumer_avg_latency(df))),
+            Section("Error rates", "errors", (error_rate_distribution(df),)),
+            Section("Latency percentiles", "percentiles", tuple(latency_percentiles(df, 'client_id'))),
+        ]
+        if _has(df, 'api_diversity', 'client_id'):
+            sections.append(Section("API diversity", "diversity", (api_diversity(df),)))
+    elif "Resource Optimization" in display_name:
+        sections = [
+            Section("API latency and load", "latency", tuple(api_latency_and_requests(df))),
+            Section("Utilization", "utilization", (resource_utilization(df),)),
+            Section("Latency percentiles", "percentiles", tuple(latency_percentiles(df, 'uri_path'))),
+        ]
+        if _has(df, 'efficiency_score', 'uri_path'):
+            sections.append(Section("Efficiency", "efficiency", (
+                _top_uri_chart('efficiency_score', 'Top 15 APIs by Efficiency Score', "API Efficiency Score"),)))
+    elif "Predictive Maintenance" in display_name:
+        sections = [
+            Section("Error rates", "errors", (error_rate_distribution(df),)),
+            Section("Maintenance priority", "priority", tuple(maintenance_priority(df))),
+        ]
+        if _has(df, 'prediction_score', 'uri_path'):
+            sections.append(Section("Anomaly prediction", "prediction", (
+                _top_uri_chart('prediction_score', 'Top 15 APIs by Anomaly Prediction Score', "API Anomaly Prediction Scores"),)))
+    else:
+        sections = []
+    return [section for section in sections if section.charts]
+
+def build_charts(df: pd.DataFrame, specs: list, cache=None, workers: int = CHART_WORKERS) -> list:
+    """
+    Builds the specs concurrently and returns their results in spec order (None for
+    specs that only carry a message). With a FigureCache, results are looked up by
+    the frame's fingerprint and spec key and only missing ones are built.
+    """
+    shared = SharedFrames(df)
+    fingerprint = frame_fingerprint(df) if cache is not None else None
+
+    def build_figure(spec):
+        with span("build_figure", rows=len(df)):
+            return spec.build(shared)
+
+    def build(spec):
+        if spec.build is None:
+            return None
+        if cache is None:
+            return build_figure(spec)
+        return cache.get_or_build((fingerprint, spec.key), lambda: build_figure(spec))
+
+    buildable = [spec for spec in specs if spec.build is not None]
+    with span("build_charts", rows=len(df)):
+        if len(buildable) <= 1 or workers <= 1:
+            return [build(spec) for spec in specs]
+        with ThreadPoolExecutor(max_workers=min(workers, len(buildable))) as executor:
+            return list(executor.map(build, specs))
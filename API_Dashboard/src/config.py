@@ -11,8 +11,129 @@ TABLE_NAMES = {
     "Predictive Maintenance": "predictive_maintenance_report"
 }
 
-# Sample size for data fetching
-SAMPLE_ROWS = 1000
+# Raw API request log table (one row per request) used by src/analytics.py
+REQUEST_LOG_TABLE = os.environ.get("REQUEST_LOG_TABLE", "api_request_logs")
+
+# JSONL ingestion (src/upload_to_supabase.py): rows per insert batch and concurrent inserters
+INGEST_BATCH_ROWS = 5000
+INGEST_WORKERS = 4
+
+# Latency (ms) at or below which an endpoint gets full efficiency credit in rollup reports
+LATENCY_TARGET_MS = 500
+
+# Paginated data fetching: rows per request (PostgREST max-rows) and concurrent page fetchers
+PAGE_SIZE = 1000
+FETCH_WORKERS = 8
+
+# Unique, indexed column used for keyset pagination of each table.
+# Tables without a usable key fall back to offset (range header) pagination.
+TABLE_KEYS = {
+    "consumer_behavior": "id",
+    "resource_optimization": "id",
+    "predictive_maintenance_report": "id"
+}
+
+# Storage types for loaded report columns: repeated labels as categoricals, identifiers as
+# Arrow-backed strings, timestamps parsed while decoding. Numeric columns are downcast
+# to the smallest type that holds them.
+TABLE_SCHEMAS = {
+    "consumer_behavior": {"client_id": "string", "first_seen": "datetime", "last_seen": "datetime"},
+    "resource_optimization": {"uri_path": "string", "utilization": "category"},
+    "predictive_maintenance_report": {"uri_path": "string", "maintenance_priority": "category"}
+}
+
+# Chart rendering limits: above these, figures are binned or downsampled server-side
+SCATTER_POINT_BUDGET = 5000
+LINE_POINT_BUDGET = 2000
+HISTOGRAM_BINS = 60
+MAX_COLOR_TRACES = 10
+
+# Shared table cache: memory budget and per-table time-to-live in seconds
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 2 * 1024 ** 3))
+CACHE_DEFAULT_TTL = 600
+TABLE_CACHE_TTLS = {
+    "consumer_behavior": 300,
+    "resource_optimization": 900,
+    "predictive_maintenance_report": 900
+}
+
+# Figures and summaries memoized per (data fingerprint, chart spec), shared across sessions
+FIGURE_CACHE_ENTRIES = 256
+
+# Threads that build the figures of a report dashboard concurrently (src/charts.py)
+CHART_WORKERS = 4
+
+# Time-series mode: most buckets drawn per series, default range and APIs plotted at once
+TIME_SERIES_MAX_POINTS = 1500
+TIME_SERIES_DEFAULT_DAYS = 30
+TIME_SERIES_MAX_KEYS = 10
+
+# Rows per Parquet row group in rollup files, so windowed reads can skip the rest
+ROLLUP_ROW_GROUP_ROWS = 100_000
+
+# Live tail mode (src/live.py): where new request-log rows come from ("supabase" realtime
+# or "socket", newline-delimited JSON on LIVE_SOCKET_PORT), how often buffered rows are
+# folded into the aggregates, how often the live charts refresh and how much history is kept
+LIVE_SOURCE = os.environ.get("LIVE_SOURCE", "supabase")
+LIVE_SOCKET_PORT = int(os.environ.get("LIVE_SOCKET_PORT", 8765))
+LIVE_FLUSH_SECONDS = 1.0
+LIVE_REFRESH_SECONDS = 2
+LIVE_RETENTION_MINUTES = 60
+
+# Anomaly scoring behind predictive_maintenance_report (src/anomaly.py): window size, EWMA
+# smoothing of the per-endpoint baselines and of the hour-of-day seasonal profile, windows an
+# endpoint needs before it is scored, fewest requests for a window to count, and the half-life
+# (in windows) of a score once the anomaly has passed
+ANOMALY_RESOLUTION = '5m'
+ANOMALY_ALPHA = 0.05
+ANOMALY_SEASON_GAMMA = 0.1
+ANOMALY_WARMUP_WINDOWS = 12
+ANOMALY_MIN_REQUESTS = 10
+ANOMALY_SCORE_HALF_LIFE = 12
+
+# Per-stage tracing (src/tracing.py): whether spans are recorded, and where the Prometheus-format
+# metrics are exported (a file rewritten after every dashboard run, and an HTTP /metrics port; 0 = off).
+# The port listens on TRACING_METRICS_HOST, loopback only unless another address is configured
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "1") == "1"
+TRACING_METRICS_FILE = os.environ.get("TRACING_METRICS_FILE")
+TRACING_METRICS_PORT = int(os.environ.get("TRACING_METRICS_PORT", 0))
+TRACING_METRICS_HOST = os.environ.get("TRACING_METRICS_HOST", "127.0.0.1")
+
+# Sidebar filters and drill-down (src/filters.py): dimension -> label, in sidebar order. "status_class"
+# (2xx, 4xx, ...) is derived from the status code column. The time filter uses the first of
+# FILTER_TIME_COLUMNS a table has. Each dimension offers its FILTER_MAX_OPTIONS most frequent values
+# (drill-down clicks can select any value), and up to FILTER_CACHE_BYTES of filtered frames are kept per table
+FILTER_DIMENSIONS = {
+    "client_id": "Client",
+    "uri_path": "Endpoint",
+    "api_version": "API version",
+    "status_class": "Status class",
+}
+FILTER_TIME_COLUMNS = ["timestamp", "last_seen", "first_seen", "window_start"]
+FILTER_MAX_OPTIONS = 1000
+FILTER_CACHE_BYTES = int(os.environ.get("FILTER_CACHE_BYTES", 256 * 1024 ** 2))
+
+# Background warm-up of a fresh dashboard process (src/warmup.py): imports the plotting backend,
+# creates the Supabase client and loads the WARMUP_TABLE report (default: the first one) into the table cache
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1") == "1"
+WARMUP_TABLE = os.environ.get("WARMUP_TABLE")
+
+# Where dashboard data is read from: "supabase" (live queries) or "local" (synced Parquet copy)
+DATA_SOURCE = os.environ.get("DATA_SOURCE", "supabase")
+LOCAL_STORE_DIR = os.environ.get("LOCAL_STORE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data"))
+
+# High-water mark column per table for incremental sync; rows at or past the mark are re-fetched
+SYNC_CURSORS = {
+    "consumer_behavior": "last_seen",
+    "resource_optimization": "id",
+    "predictive_maintenance_report": "id"
+}
 
 # LLM Configuration
-LLM_MODEL_NAME = os.environ.get("LLM_MODEL_NAME", "llama2")  # Default to llama2 if not specified
\ No newline at end of file
+LLM_MODEL_NAME = os.environ.get("LLM_MODEL_NAME", "llama2")  # Default to llama2 if not specified
+LLM_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")  # Ollama-compatible endpoint
+LLM_MAX_CONCURRENCY = 2  # Generations running at once against the endpoint
+LLM_QUEUE_SIZE = 8  # Questions waiting for a free slot before new ones are rejected
+LLM_TIMEOUT = 120  # Seconds before a generation is abandoned
+LLM_CACHE_TTL = 900  # Seconds an answer is reused for the same question, table and data
+LLM_PROMPT_MAX_CHARS = 6000  # Upper bound on the statistics sent with a question
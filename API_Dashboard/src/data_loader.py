@@ -1,7 +1,23 @@
-from supabase import create_client, Client
+from __future__ import annotations
+import io
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 import pandas as pd
 import streamlit as st
-from src.config import SUPABASE_URL, SUPABASE_KEY, SAMPLE_ROWS, TABLE_NAMES
+from src.cache import TableCache
+from src.config import (SUPABASE_URL, SUPABASE_KEY, PAGE_SIZE, FETCH_WORKERS, TABLE_NAMES, TABLE_KEYS,
+                        CACHE_MAX_BYTES, CACHE_DEFAULT_TTL, TABLE_CACHE_TTLS,
+                        DATA_SOURCE, LOCAL_STORE_DIR, TABLE_SCHEMAS)
+from src.tracing import span
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+_DONE = object()
 
 @st.cache_resource
 def init_supabase() -> Client:
@@ -9,36 +25,246 @@ def init_supabase() -> Client:
     if not SUPABASE_URL or not SUPABASE_KEY:
         st.error("Supabase URL or Key not found. Please set SUPABASE_URL and SUPABASE_KEY environment variables.")
         st.stop()
+    # Imported here so pages that never reach Supabase (local data, cached tables) skip the client
+    from supabase import create_client
     return create_client(SUPABASE_URL, SUPABASE_KEY)
 
-def fetch_data(table_display_name: str) -> pd.DataFrame:
+@st.cache_resource
+def get_table_cache() -> TableCache:
+    """Returns the table cache shared by all sessions of this dashboard process."""
+    return TableCache(CACHE_MAX_BYTES, CACHE_DEFAULT_TTL, TABLE_CACHE_TTLS)
+
+def decode_csv(text, table_name: str) -> pd.DataFrame:
+    """
+    Decodes a PostgREST CSV page straight into a DataFrame, reading identifier and
+    label columns as Arrow-backed strings instead of Python objects.
+    """
+    if not text:
+        return pd.DataFrame()
+    schema = TABLE_SCHEMAS.get(table_name, {})
+    dtype = {col: "string[pyarrow]" for col, kind in schema.items() if kind in ("string", "category")}
+    with span("decode", bytes=len(text)) as s:
+        df = pd.read_csv(io.StringIO(text), dtype=dtype)
+        s.rows = len(df)
+    return df
+
+def _fetch_csv(query) -> str:
+    """Executes a query for CSV text, timed as one Supabase request."""
+    with span("supabase_request") as s:
+        text = query.csv().execute().data
+        s.bytes = len(text) if text else 0
+    return text
+
+def apply_types(df: pd.DataFrame, table_display_name: str) -> pd.DataFrame:
+    """Applies the per-report type conversions and numeric downcasts to a chunk of rows."""
+    if "Consumer Behavior" in table_display_name:
+        if 'client_id' in df.columns:
+             df['client_id'] = df['client_id'].replace('(empty)', 'No Client ID')
+    schema = TABLE_SCHEMAS.get(TABLE_NAMES[table_display_name], {})
+    for col, kind in schema.items():
+        if col not in df.columns:
+            continue
+        if kind == "datetime":
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif df[col].dtype == object:
+            df[col] = df[col].astype("string[pyarrow]")
+    for col in df.select_dtypes(include='integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in df.select_dtypes(include='floating').columns:
+        df[col] = pd.to_numeric(df[col], downcast='float')
+    return df
+
+def compact_types(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """
+    Converts the schema's label columns to categoricals. Done once on the assembled
+    frame, since concatenating chunks with different categories falls back to objects.
+    """
+    for col, kind in TABLE_SCHEMAS.get(table_name, {}).items():
+        if kind == "category" and col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns per-column dtype and in-memory size (bytes), largest first."""
+    usage = df.memory_usage(deep=True, index=False)
+    return pd.DataFrame({"dtype": df.dtypes.astype(str), "bytes": usage}).sort_values("bytes", ascending=False)
+
+def _count_rows(supabase: Client, table_name: str, column: str) -> int:
+    """Returns the exact row count of a table without transferring its rows."""
+    with span("supabase_count"):
+        response = supabase.from_(table_name).select(column, count="exact").limit(1).execute()
+    return response.count or 0
+
+def _key_bounds(supabase: Client, table_name: str, key: str, total: int, partitions: int) -> list:
+    """
+    Splits the key space into roughly equal ranges by looking up the key at evenly
+    spaced offsets. Returns [None, k1, ..., None] where None is an open bound.
+    """
+    step = max(-(-total // partitions), PAGE_SIZE)
+    bounds = []
+    for offset in range(step, total, step):
+        rows = supabase.from_(table_name).select(key).order(key).range(offset, offset).execute().data
+        if rows and (not bounds or rows[0][key] != bounds[-1]):
+            bounds.append(rows[0][key])
+    return [None] + bounds + [None]
+
+def _keyset_pages(supabase: Client, table_name: str, key: str, lower, upper):
+    """Yields decoded pages with lower <= key < upper, seeking past the last key seen."""
+    last = None
+    while True:
+        query = supabase.from_(table_name).select("*").order(key)
+        if last is not None:
+            query = query.gt(key, last)
+        elif lower is not None:
+            query = query.gte(key, lower)
+        if upper is not None:
+            query = query.lt(key, upper)
+        page = decode_csv(_fetch_csv(query.limit(PAGE_SIZE)), table_name)
+        if page.empty:
+            return
+        yield page
+        if len(page) < PAGE_SIZE:
+            return
+        last = page[key].iloc[-1]
+        last = last.item() if hasattr(last, "item") else last
+
+def _stream_keyset(supabase: Client, table_name: str, key: str, total: int):
+    """Runs one keyset paginator per key range concurrently and yields pages as they arrive."""
+    bounds = _key_bounds(supabase, table_name, key, total, FETCH_WORKERS)
+    pages = queue.Queue(maxsize=FETCH_WORKERS * 2)
+    stop = threading.Event()
+
+    def worker(lower, upper):
+        try:
+            for page in _keyset_pages(supabase, table_name, key, lower, upper):
+                if stop.is_set():
+                    break
+                pages.put(page)
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(_DONE)
+
+    ranges = list(zip(bounds[:-1], bounds[1:]))
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        for lower, upper in ranges:
+            executor.submit(worker, lower, upper)
+        running = len(ranges)
+        try:
+            while running:
+                item = pages.get()
+                if item is _DONE:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # Unblock any worker waiting on a full queue so the pool can shut down
+            stop.set()
+            while running:
+                if pages.get() is _DONE:
+                    running -= 1
+
+def _stream_offset(supabase: Client, table_name: str, total: int):
+    """Fetches fixed-size row ranges concurrently, yielding them in table order."""
+    def fetch(start):
+        query = supabase.from_(table_name).select("*").range(start, start + PAGE_SIZE - 1)
+        return decode_csv(_fetch_csv(query), table_name)
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        for page in executor.map(fetch, range(0, total, PAGE_SIZE)):
+            if not page.empty:
+                yield page
+
+def stream_table(table_display_name: str, on_progress=None, supabase: Client = None):
+    """
+    Streams the full Supabase table as typed DataFrame chunks. Pages are requested
+    as CSV and decoded directly into typed columns, without a list of row dicts.
+
+    Pages are fetched concurrently over the shared (pooled) Supabase client using
+    keyset pagination on the table's key column from TABLE_KEYS, or range-header
+    pagination when the table has no usable key. on_progress(rows_loaded, total_rows)
+    is called after every chunk.
+    """
+    supabase = supabase or init_supabase()
+    actual_table_name = TABLE_NAMES[table_display_name]
+    key = TABLE_KEYS.get(actual_table_name)
+
+    pages = None
+    if key:
+        try:
+            total = _count_rows(supabase, actual_table_name, key)
+            pages = _stream_keyset(supabase, actual_table_name, key, total)
+            # The key bounds and first pages are only requested once the generator runs,
+            # so take the first page here for their errors to reach this fallback
+            first = next(pages, None)
+            pages = itertools.chain([] if first is None else [first], pages)
+        except Exception:
+            # Key column missing or not orderable; use offset ranges instead
+            pages = None
+    if pages is None:
+        total = _count_rows(supabase, actual_table_name, "*")
+        pages = _stream_offset(supabase, actual_table_name, total)
+
+    loaded = 0
+    for page in pages:
+        with span("apply_types", rows=len(page)):
+            chunk = apply_types(page, table_display_name)
+        loaded += len(chunk)
+        if on_progress:
+            on_progress(loaded, max(total, loaded))
+        yield chunk
+
+def local_table_path(table_name: str) -> str:
+    """Returns the path of a table's Parquet copy in the local store."""
+    return os.path.join(LOCAL_STORE_DIR, f"{table_name}.parquet")
+
+def read_local(table_display_name: str) -> pd.DataFrame:
+    """Reads the locally synced copy of a table."""
+    path = local_table_path(TABLE_NAMES[table_display_name])
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    with span("read_local", bytes=os.path.getsize(path)) as s:
+        df = pd.read_parquet(path)
+        s.rows = len(df)
+    return df
+
+def load_table(table_display_name: str, on_progress=None, supabase: Client = None) -> pd.DataFrame:
     """
-    Fetches a sample of data from the specified Supabase table.
-    Caches the data for performance within the Streamlit session.
+    Loads a whole table from DATA_SOURCE without caching: the local Parquet copy, or
+    all Supabase pages assembled into one frame with the schema's compact types.
+    """
+    if DATA_SOURCE == "local":
+        return read_local(table_display_name)
+    chunks = list(stream_table(table_display_name, on_progress=on_progress, supabase=supabase))
+    with span("assemble", rows=sum(len(chunk) for chunk in chunks)):
+        df = compact_types(pd.concat(chunks, ignore_index=True), TABLE_NAMES[table_display_name]) if chunks else pd.DataFrame()
+    return df
+
+def fetch_data(table_display_name: str, on_progress=None, refresh: bool = False) -> pd.DataFrame:
+    """
+    Fetches all rows of the specified table, from Supabase or, when DATA_SOURCE is
+    "local", from the synced Parquet copy (see src/sync.py). Results are served from
+    the process-wide table cache; refresh=True drops the cached copy first. Returned
+    frames are shared between sessions and must not be modified in place.
     """
-    supabase = init_supabase()
-    
-    # Get the actual database table name from the display name
     actual_table_name = TABLE_NAMES[table_display_name]
+    cache = get_table_cache()
+    if refresh:
+        cache.invalidate(actual_table_name)
 
     try:
-        # Fetch data
-        response = supabase.from_(actual_table_name).select("*").limit(SAMPLE_ROWS).execute()
-        
-        if response.data:
-            df = pd.DataFrame(response.data)
-            
-            # Apply type conversions based on the column structures
-            if "Consumer Behavior" in table_display_name:
-                df['first_seen'] = pd.to_datetime(df['first_seen'], errors='coerce')
-                df['last_seen'] = pd.to_datetime(df['last_seen'], errors='coerce')
-                if 'client_id' in df.columns:
-                     df['client_id'] = df['client_id'].replace('(empty)', 'No Client ID')
-            
+        with span("fetch_data") as s:
+            df = cache.get_or_load(actual_table_name, ("*",),
+                                   lambda: load_table(table_display_name, on_progress))
+            s.rows = len(df)
+
+        if not df.empty:
             return df
         else:
             st.warning(f"No data found in table: {actual_table_name}")
             return pd.DataFrame()
     except Exception as e:
         st.error(f"Error fetching data from Supabase table '{actual_table_name}': {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
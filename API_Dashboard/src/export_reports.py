@@ -0,0 +1,215 @@
+"""
+Headless rendering of the report dashboards to static HTML and JSON, for scheduled exports.
+
+A job is one report: a table, optional filters (see src/filters.py; the same
+dimensions as the dashboard sidebar, or any other column) and an output name.
+Jobs come from a JSON file, for example one report per team:
+
+    [{"name": "payments-consumers", "table": "Consumer Behavior",
+      "filters": {"client_id": ["client-17", "client-42"]}},
+     {"name": "payments-endpoints", "table": "Resource Optimization",
+      "filters": {"uri_path": ["/api/v1/pay", "/api/v1/refund"]}}]
+
+or, without a jobs file, one unfiltered report per --tables entry. Every table is
+loaded once from DATA_SOURCE, like the dashboard does, and handed to the workers
+as Parquet. Reports are then built in parallel worker processes from the same
+charts.py specs as the dashboard. Each worker reads a table at most once, and the
+charts of one report share their intermediate results.
+
+    python -m src.export_reports --jobs teams.json --format html json --workers 4
+"""
+import argparse
+import html
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import lru_cache
+import pandas as pd
+from src import charts
+from src.config import CHART_WORKERS, DATA_SOURCE, LOCAL_STORE_DIR, SUPABASE_KEY, SUPABASE_URL, TABLE_NAMES
+from src.data_loader import load_table, local_table_path
+from src.filters import apply_filters
+
+FORMATS = ('html', 'json')
+
+@dataclass(frozen=True)
+class ReportJob:
+    """One exported report: a table (display name), column -> allowed values filters and an output name."""
+    name: str
+    table: str
+    filters: dict = field(default_factory=dict)
+
+def _display_name(table: str) -> str:
+    """Accepts a report's display name or its Supabase table name."""
+    if table in TABLE_NAMES:
+        return table
+    for display_name, table_name in TABLE_NAMES.items():
+        if table_name == table:
+            return display_name
+    raise ValueError(f"Unknown table '{table}'; expected one of {', '.join(TABLE_NAMES)}")
+
+def read_jobs(path: str) -> list:
+    """Reads a JSON list of {"name", "table", "filters"} jobs."""
+    with open(path) as f:
+        entries = json.load(f)
+    jobs = []
+    for entry in entries:
+        filters = {column: values if isinstance(values, list) else [values]
+                   for column, values in (entry.get('filters') or {}).items()}
+        jobs.append(ReportJob(entry['name'], _display_name(entry['table']), filters))
+    return jobs
+
+def build_report(df: pd.DataFrame, display_name: str, workers: int = CHART_WORKERS) -> dict:
+    """Builds the overview and every chart of a report: {'overview', 'sections': [(section, [(spec, figure)])]}."""
+    sections = charts.report_sections(df, display_name)
+    specs = [charts.overview(df)] + [spec for section in sections for spec in section.charts]
+    built = iter(charts.build_charts(df, specs, workers=workers))
+    overview = next(built)
+    return {'overview': overview,
+            'sections': [(section, [(spec, next(built)) for spec in section.charts]) for section in sections]}
+
+def report_html(job: ReportJob, df: pd.DataFrame, report: dict, plotlyjs='cdn') -> str:
+    """A self-contained HTML page with the report's overview and charts."""
+    filters = "; ".join(f"{column} in {', '.join(map(str, values))}" for column, values in job.filters.items())
+    parts = [f"<h1>{html.escape(job.table)}: {html.escape(job.name)}</h1>",
+             f"<p>{len(df):,} rows{html.escape(' where ' + filters) if filters else ''}. "
+             f"Generated {pd.Timestamp.now(tz='UTC'):%Y-%m-%d %H:%M} UTC.</p>",
+             "<h2>Descriptive Statistics</h2>", report['overview']['summary'].to_html(na_rep='', float_format='{:,.2f}'.format)]
+    include_plotlyjs = plotlyjs
+    for section, built in report['sections']:
+        parts.append(f"<h2>{html.escape(section.label)}</h2>")
+        for spec, fig in built:
+            if spec.subheader:
+                parts.append(f"<h3>{html.escape(spec.subheader)}</h3>")
+            if fig is not None:
+                # plotly.js goes into the page once, with the first figure
+                parts.append(fig.to_html(full_html=False, include_plotlyjs=include_plotlyjs))
+                include_plotlyjs = False
+            elif spec.message:
+                parts.append(f"<p><em>{html.escape(spec.message)}</em></p>")
+    return (f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(job.name)}</title></head>"
+            f"<body>\n" + "\n".join(parts) + "\n</body></html>\n")
+
+def report_json(job: ReportJob, df: pd.DataFrame, report: dict) -> dict:
+    """The report's overview and Plotly figure specs as a JSON-serialisable document."""
+    summary = report['overview']['summary']
+    return {
+        'name': job.name,
+        'table': job.table,
+        'filters': job.filters,
+        'rows': len(df),
+        'generated_at': pd.Timestamp.now(tz='UTC').isoformat(),
+        'memory_bytes': int(report['overview']['memory']['bytes'].sum()),
+        'summary': json.loads(summary.to_json(date_format='iso', default_handler=str)),
+        'sections': [{'label': section.label,
+                      'charts': [{'title': spec.subheader, 'message': spec.message,
+                                  'figure': json.loads(fig.to_json()) if fig is not None else None}
+                                 for spec, fig in built]}
+                     for section, built in report['sections']],
+    }
+
+@lru_cache(maxsize=None)
+def _read_table(path: str) -> pd.DataFrame:
+    """A worker's copy of a loaded table, read once per process."""
+    return pd.read_parquet(path)
+
+def _file_name(name: str) -> str:
+    return re.sub(r'[^\w.-]+', '_', name).strip('_') or 'report'
+
+def render_job(job: ReportJob, table_path: str, out: str, formats: tuple, plotlyjs='cdn',
+               workers: int = CHART_WORKERS) -> tuple:
+    """Builds one report and writes it in each format. Returns (rows, charts, written paths, seconds)."""
+    started = time.perf_counter()
+    df = apply_filters(_read_table(table_path), job.filters)
+    report = build_report(df, job.table, workers)
+    written = []
+    base = os.path.join(out, _file_name(job.name))
+    if 'html' in formats:
+        with open(base + '.html', 'w', encoding='utf-8') as f:
+            f.write(report_html(job, df, report, plotlyjs))
+        written.append(base + '.html')
+    if 'json' in formats:
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(report_json(job, df, report), f)
+        written.append(base + '.json')
+    figures = sum(fig is not None for _, built in report['sections'] for _, fig in built)
+    return len(df), figures, written, time.perf_counter() - started
+
+def _load_tables(display_names: set, scratch: str) -> dict:
+    """Loads each table once and returns display name -> Parquet path for the workers."""
+    if DATA_SOURCE == "local":
+        return {name: local_table_path(TABLE_NAMES[name]) for name in display_names
+                if os.path.exists(local_table_path(TABLE_NAMES[name]))}
+    from supabase import create_client
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    paths = {}
+    for name in sorted(display_names):
+        started = time.perf_counter()
+        df = load_table(name, supabase=supabase)
+        print(f"loaded {name}: {len(df):,} rows in {time.perf_counter() - started:.1f}s")
+        if not df.empty:
+            paths[name] = os.path.join(scratch, f"{TABLE_NAMES[name]}.parquet")
+            df.to_parquet(paths[name], index=False)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the report dashboards to static HTML/JSON files.")
+    parser.add_argument('--jobs', help="JSON file listing {name, table, filters} reports")
+    parser.add_argument('--tables', nargs='+', default=list(TABLE_NAMES),
+                        help="Tables to export unfiltered when no jobs file is given")
+    parser.add_argument('--format', nargs='+', choices=FORMATS, default=list(FORMATS), dest='formats')
+    parser.add_argument('--out', default=os.path.join(LOCAL_STORE_DIR, 'exports'), help="Output directory")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--plotlyjs', choices=['cdn', 'inline'], default='cdn',
+                        help="Load plotly.js from its CDN or embed it in every HTML file")
+    args = parser.parse_args(argv)
+
+    if args.jobs:
+        jobs = read_jobs(args.jobs)
+    else:
+        jobs = [ReportJob(TABLE_NAMES[name], name) for name in map(_display_name, args.tables)]
+    plotlyjs = True if args.plotlyjs == 'inline' else 'cdn'
+    os.makedirs(args.out, exist_ok=True)
+
+    failed = 0
+    with tempfile.TemporaryDirectory() as scratch:
+        paths = _load_tables({job.table for job in jobs}, scratch)
+        runnable = []
+        for job in jobs:
+            if job.table in paths:
+                runnable.append(job)
+            else:
+                print(f"{job.name}: no data in {job.table}, skipped", file=sys.stderr)
+                failed += 1
+
+        def report(job, result):
+            rows, figures, written, seconds = result
+            print(f"{job.name}: {rows:,} rows, {figures} charts in {seconds:.1f}s -> {', '.join(written)}")
+
+        if args.workers <= 1 or len(runnable) <= 1:
+            for job in runnable:
+                try:
+                    report(job, render_job(job, paths[job.table], args.out, tuple(args.formats), plotlyjs))
+                except Exception as e:
+                    print(f"{job.name}: failed: {e}", file=sys.stderr)
+                    failed += 1
+        else:
+            # Processes already run reports side by side, so each builds its charts on one thread
+            with ProcessPoolExecutor(max_workers=min(args.workers, len(runnable))) as executor:
+                futures = {executor.submit(render_job, job, paths[job.table], args.out, tuple(args.formats),
+                                           plotlyjs, 1): job for job in runnable}
+                for future in as_completed(futures):
+                    try:
+                        report(futures[future], future.result())
+                    except Exception as e:
+                        print(f"{futures[future].name}: failed: {e}", file=sys.stderr)
+                        failed += 1
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
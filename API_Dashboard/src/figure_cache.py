@@ -0,0 +1,81 @@
+"""
+Memoization of figures and summaries across Streamlit reruns.
+
+Results are keyed by a content fingerprint of the DataFrame plus a chart spec, so
+a rerun that does not change the data (a chat message, a button click) reuses the
+figures built on a previous run. Frames passed here are treated as immutable, like
+the shared frames returned by fetch_data.
+"""
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+import pandas as pd
+import streamlit as st
+from src.config import FIGURE_CACHE_ENTRIES
+
+_fingerprints = {}  # id(df) -> (weakref to df, fingerprint)
+_fingerprints_lock = threading.Lock()
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Returns a content hash of a frame, computed once per frame object."""
+    with _fingerprints_lock:
+        entry = _fingerprints.get(id(df))
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+    try:
+        hashed = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    except TypeError:
+        # Unhashable cell values (lists, dicts): hash their string form instead
+        hashed = pd.util.hash_pandas_object(df.astype(str), index=True).to_numpy()
+    digest = hashlib.blake2b(hashed.tobytes(), digest_size=16)
+    digest.update(repr((list(df.columns), [str(t) for t in df.dtypes])).encode())
+    fingerprint = digest.hexdigest()
+    register_fingerprint(df, fingerprint)
+    return fingerprint
+
+def register_fingerprint(df: pd.DataFrame, fingerprint: str):
+    """
+    Records the fingerprint of a frame whose content is already identified some
+    other way (e.g. a table plus the filters applied to it), so it is never hashed.
+    """
+    key = id(df)
+    with _fingerprints_lock:
+        _fingerprints[key] = (weakref.ref(df, lambda _: _fingerprints.pop(key, None)), fingerprint)
+
+class FigureCache:
+    """Bounded LRU cache of built figures and summary frames."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: tuple, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        result = build()
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+@st.cache_resource
+def get_figure_cache() -> FigureCache:
+    """Returns the figure cache shared by all sessions of this dashboard process."""
+    return FigureCache(FIGURE_CACHE_ENTRIES)
+
+def cached(df: pd.DataFrame, spec: tuple, build):
+    """Returns build()'s result for this frame's content and chart spec, building it at most once."""
+    return get_figure_cache().get_or_build((frame_fingerprint(df), spec), build)
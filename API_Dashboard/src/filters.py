@@ -0,0 +1,246 @@
+"""
+Indexed row selection for the dashboard filters and drill-down.
+
+A TableIndex belongs to one loaded table (frames from fetch_data are shared and
+never modified) and is built once per table. For each filter dimension it keeps
+the column's integer codes and an inverted index: the row positions of every
+value, stored as one argsort grouped by value. A dimension is indexed the first
+time it is used. For the time filter it keeps the rows' order by time, and a time
+range is a binary search over it.
+
+A selection starts from the position list of its most selective filter. It then
+narrows that list by looking up the other dimensions' codes for just those
+rows. Its cost depends on how many rows the filters touch, not on the table size.
+Filtered frames are kept per (table, filters), up to FILTER_CACHE_BYTES per table.
+Each one is registered with a fingerprint derived from the table's, so charts for
+a filter combination seen before come straight from the figure cache without
+rehashing the rows. An index only holds a weak reference to its table: once the
+table cache drops a frame, its index and filtered frames go with it.
+"""
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from src.config import FILTER_CACHE_BYTES, FILTER_TIME_COLUMNS
+from src.figure_cache import frame_fingerprint, register_fingerprint
+from src.tracing import span
+
+# Columns the derived "status_class" dimension (2xx, 4xx, ...) is read from, in order of preference
+STATUS_COLUMNS = ('status_code_cleaned', 'status_code')
+
+_NAT = np.iinfo(np.int64).min
+
+class _Dimension:
+    """Codes and inverted index of one column."""
+
+    def __init__(self, codes: np.ndarray, labels: list):
+        self.codes = codes
+        self.labels = labels
+        self.lookup = {label: code for code, label in enumerate(labels)}
+        self.counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        self.ranked = np.argsort(-self.counts, kind='stable')
+        # Rows grouped by code in ascending position order; missing values (-1) sort first and are skipped
+        self.order = np.argsort(codes, kind='stable').astype(np.int32 if len(codes) < 2 ** 31 else np.int64)
+        self.offsets = int((codes < 0).sum()) + np.concatenate([[0], np.cumsum(self.counts)])
+
+    def codes_of(self, values) -> np.ndarray:
+        return np.array(sorted({self.lookup[v] for v in values if v in self.lookup}), dtype=np.int64)
+
+    def positions(self, codes: np.ndarray) -> np.ndarray:
+        parts = [self.order[self.offsets[c]:self.offsets[c + 1]] for c in codes]
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=self.order.dtype)
+
+    def allowed(self, codes: np.ndarray) -> np.ndarray:
+        """Lookup table code -> selected; the extra last slot makes code -1 (missing) unselected."""
+        table = np.zeros(len(self.labels) + 1, dtype=bool)
+        table[codes] = True
+        return table
+
+def _dimension_values(df: pd.DataFrame, dimension: str):
+    if dimension in df.columns:
+        return df[dimension]
+    if dimension == 'status_class':
+        column = next((c for c in STATUS_COLUMNS if c in df.columns), None)
+        if column is not None:
+            return pd.to_numeric(df[column], errors='coerce') // 100
+    return None
+
+def _to_ns(value) -> int:
+    """A timestamp as UTC nanoseconds, matching DatetimeIndex.asi8 for naive (UTC) and aware columns."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts.as_unit('ns').value
+
+class TableIndex:
+    """Lazily built per-dimension indexes of one table, and a memo of its filtered frames."""
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = weakref.ref(df)
+        self.time_column = next((c for c in FILTER_TIME_COLUMNS if c in df.columns
+                                 and pd.api.types.is_datetime64_any_dtype(df[c].dtype)), None)
+        self._dimensions = {}
+        self._time = None
+        self._frames = OrderedDict()  # filter key -> (nbytes, filtered frame)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def df(self) -> pd.DataFrame:
+        df = self._df()
+        if df is None:
+            raise ReferenceError("The indexed table is no longer loaded")
+        return df
+
+    def has(self, dimension: str) -> bool:
+        return _dimension_values(self.df, dimension) is not None
+
+    def dimension(self, dimension: str) -> _Dimension:
+        with self._lock:
+            if dimension not in self._dimensions:
+                values = _dimension_values(self.df, dimension)
+                if values is None:
+                    raise ValueError(f"Filter column not in the table: {dimension}")
+                with span("filter_index", rows=len(values)):
+                    if isinstance(values.dtype, pd.CategoricalDtype):
+                        codes, labels = values.cat.codes.to_numpy(), list(values.cat.categories)
+                    else:
+                        codes, labels = pd.factorize(values, sort=True)
+                        labels = list(labels)
+                    if dimension == 'status_class':
+                        labels = [f"{int(label)}xx" for label in labels]
+                    self._dimensions[dimension] = _Dimension(np.asarray(codes, dtype=np.int32), labels)
+            return self._dimensions[dimension]
+
+    def options(self, dimension: str, limit: int = None) -> list:
+        """The dimension's values, most frequent first."""
+        index = self.dimension(dimension)
+        return [index.labels[code] for code in index.ranked[:limit] if index.counts[code]]
+
+    def _time_index(self) -> tuple:
+        """(row order by time, sorted UTC nanoseconds, rows with no time, nanoseconds by row) for the time column."""
+        with self._lock:
+            if self._time is None:
+                values = pd.DatetimeIndex(self.df[self.time_column]).as_unit('ns').asi8
+                order = np.argsort(values, kind='stable')
+                # NaT is the smallest int64, so rows without a time sort first
+                self._time = (order, values[order], int((values == _NAT).sum()), values)
+            return self._time
+
+    def time_bounds(self) -> tuple:
+        """Earliest and latest time in the table, or (None, None)."""
+        if self.time_column is None:
+            return None, None
+        _, values, missing, _ = self._time_index()
+        if missing == len(values):
+            return None, None
+        return pd.Timestamp(values[missing], tz='UTC'), pd.Timestamp(values[-1], tz='UTC')
+
+    def select(self, filters: dict, start=None, end=None):
+        """Sorted positions of the rows matching every filter and start <= time < end; None selects all rows."""
+        candidates = []
+        for dimension, values in filters.items():
+            index = self.dimension(dimension)
+            codes = index.codes_of(values)
+            candidates.append((int(index.counts[codes].sum()), dimension, index, codes))
+        if (start is not None or end is not None) and self.time_column is not None:
+            order, values, missing, _ = self._time_index()
+            lo = max(missing, int(np.searchsorted(values, _to_ns(start), 'left'))) if start is not None else missing
+            hi = int(np.searchsorted(values, _to_ns(end), 'left')) if end is not None else len(values)
+            candidates.append((max(hi - lo, 0), None, (order, lo, hi), None))
+        if not candidates:
+            return None
+
+        # Start from the smallest candidate list and check the other filters only for its rows
+        candidates.sort(key=lambda candidate: candidate[0])
+        _, dimension, index, codes = candidates[0]
+        if dimension is None:
+            order, lo, hi = index
+            positions = np.sort(order[lo:max(lo, hi)])
+        else:
+            positions = index.positions(codes)
+        for _, dimension, index, codes in candidates[1:]:
+            if not len(positions):
+                break
+            if dimension is None:
+                times = self._time_index()[3][positions]
+                keep = times != _NAT
+                if start is not None:
+                    keep &= times >= _to_ns(start)
+                if end is not None:
+                    keep &= times < _to_ns(end)
+                positions = positions[keep]
+            else:
+                positions = positions[index.allowed(codes)[index.codes[positions]]]
+        return positions
+
+    def filtered(self, filters: dict, start=None, end=None) -> pd.DataFrame:
+        """The table restricted to the filters, memoised per filter combination."""
+        filters = {dimension: values for dimension, values in filters.items() if values}
+        if not filters and start is None and end is None:
+            return self.df
+        key = (tuple(sorted((dimension, tuple(sorted(map(str, values)))) for dimension, values in filters.items())),
+               str(start), str(end))
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return self._frames[key][1]
+        with span("filter", rows=len(self.df)) as s:
+            positions = self.select(filters, start, end)
+            if positions is None:
+                return self.df
+            df = self.df.take(positions).reset_index(drop=True)
+            s.rows = len(df)
+        digest = hashlib.blake2b(frame_fingerprint(self.df).encode(), digest_size=16)
+        digest.update(repr(key).encode())
+        register_fingerprint(df, digest.hexdigest())
+        nbytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._frames:
+                self._bytes -= self._frames.pop(key)[0]
+            self._frames[key] = (nbytes, df)
+            self._bytes += nbytes
+            # Evict least recently used frames, but always keep the newest one
+            while self._bytes > FILTER_CACHE_BYTES and len(self._frames) > 1:
+                self._bytes -= self._frames.popitem(last=False)[1][0]
+        return df
+
+_indexes = {}  # id(df) -> (weakref to df, TableIndex)
+_indexes_lock = threading.Lock()
+
+def find_index(df: pd.DataFrame):
+    """The TableIndex already built for this frame, or None."""
+    with _indexes_lock:
+        entry = _indexes.get(id(df))
+        return entry[1] if entry is not None and entry[0]() is df else None
+
+def table_index(df: pd.DataFrame) -> TableIndex:
+    """The TableIndex of a loaded table, created on first use and dropped with the frame."""
+    with _indexes_lock:
+        entry = _indexes.get(id(df))
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+        index = TableIndex(df)
+        key = id(df)
+        _indexes[key] = (weakref.ref(df, lambda _: _indexes.pop(key, None)), index)
+        return index
+
+def apply_filters(df: pd.DataFrame, filters: dict, start=None, end=None) -> pd.DataFrame:
+    """Keeps the rows whose value in every filtered dimension is one of the allowed values, within [start, end)."""
+    missing = [dimension for dimension, values in filters.items() if values and _dimension_values(df, dimension) is None]
+    if missing:
+        raise ValueError(f"Filter columns not in the table: {', '.join(missing)}")
+    return table_index(df).filtered(filters, start, end)
+
+def describe_filters(filters: dict, start=None, end=None) -> str:
+    """A short human-readable summary of the active filters, or an empty string."""
+    parts = [f"{dimension} in {', '.join(map(str, values))}" for dimension, values in filters.items() if values]
+    if start is not None:
+        parts.append(f"from {pd.Timestamp(start):%Y-%m-%d}")
+    if end is not None:
+        parts.append(f"before {pd.Timestamp(end):%Y-%m-%d}")
+    return "; ".join(parts)
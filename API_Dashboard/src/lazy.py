@@ -0,0 +1,29 @@
+"""
+Deferred imports of heavy optional backends (plotting, the Supabase client, the LLM client).
+
+`px = lazy_import('plotly.express')` binds a placeholder module that imports the
+real one the first time one of its attributes is used, so a page that never
+draws a chart never pays for plotly. import_module() holds the import lock, so
+several threads touching a lazy module at once still import it only once.
+warm_up() in src/warmup.py imports them ahead of use in the background.
+"""
+import importlib
+import sys
+import types
+
+class LazyModule(types.ModuleType):
+    """Placeholder that becomes a copy of the named module on first attribute access."""
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Returns the module if it is already imported, otherwise a LazyModule for it."""
+    return sys.modules.get(name) or LazyModule(name)
+
+def preload(*names: str):
+    """Imports the named modules now, e.g. from a background thread before first use."""
+    for name in names:
+        importlib.import_module(name)
@@ -0,0 +1,199 @@
+"""
+Live tail mode: request-log rows pushed to the dashboard as they are inserted.
+
+A source delivers new rows to a LiveAggregator: Supabase realtime INSERTs on the
+request log table, or, for local runs and load tests, newline-delimited JSON
+records sent to a TCP socket. The aggregator buffers rows and folds them into a
+RollupEngine and an AnomalyEngine once per LIVE_FLUSH_SECONDS, so the report
+tables, latency percentiles and maintenance scores are updated incrementally
+instead of refetched and re-aggregated.
+Windows older than LIVE_RETENTION_MINUTES are dropped. A batch that fails to parse
+or fold is logged, counted in stats() and dropped; later batches are still folded.
+"""
+import asyncio
+import json
+import logging
+import socketserver
+import threading
+import time
+import pandas as pd
+from src.config import (LIVE_FLUSH_SECONDS, LIVE_RETENTION_MINUTES, LIVE_SOCKET_PORT, REQUEST_LOG_TABLE,
+                        SUPABASE_KEY, SUPABASE_URL, TABLE_NAMES)
+from src.anomaly import AnomalyEngine
+from src.data_loader import apply_types, compact_types
+from src.rollups import RollupEngine, build_reports, merge_partials
+from src.upload_to_supabase import parse_requests
+
+LIVE_RESOLUTION = '1m'
+
+logger = logging.getLogger(__name__)
+
+class LiveAggregator:
+    """Incrementally maintained rollups of the request-log rows received so far."""
+
+    def __init__(self, retention_minutes: int = LIVE_RETENTION_MINUTES):
+        self.engine = RollupEngine(['client_id', 'uri_path'], [LIVE_RESOLUTION], ['api_name', 'app_name'])
+        self.anomalies = AnomalyEngine(LIVE_RESOLUTION)
+        self.retention = pd.Timedelta(minutes=retention_minutes)
+        self.received = 0
+        self.version = 0
+        self.last_flush_ms = 0.0
+        self.dropped = 0
+        self.last_error = None
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._engine_lock = threading.Lock()
+        self._reports = (-1, None)
+        self._stop = threading.Event()
+
+    def push(self, records: list):
+        """Buffers raw request records; called by sources from their own threads."""
+        with self._pending_lock:
+            self._pending.extend(records)
+            self.received += len(records)
+
+    def flush(self) -> int:
+        """Folds the buffered rows into the rollups. Returns the number of rows folded."""
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        started = time.perf_counter()
+        try:
+            requests = parse_requests(batch)
+            with self._engine_lock:
+                self.engine.update(requests)
+                self.anomalies.update(requests)
+                # Drop windows that fell out of the retention period
+                cutoff = pd.Timestamp.now(tz='UTC').floor('1min') - self.retention
+                self.engine.drop_before(cutoff)
+                self.version += 1
+        except Exception as e:
+            # One bad batch must not stop the flusher thread
+            logger.exception("Dropped a live batch of %d rows", len(batch))
+            self.dropped += len(batch)
+            self.last_error = f"{type(e).__name__}: {e}"
+            return 0
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+        return len(batch)
+
+    def start_flusher(self, interval: float = LIVE_FLUSH_SECONDS):
+        """Flushes on a daemon thread every `interval` seconds until stop() is called."""
+        def run():
+            while not self._stop.wait(interval):
+                self.flush()
+        threading.Thread(target=run, name="live-flusher", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reports(self) -> dict:
+        """
+        The three report tables by display name, typed like fetch_data's frames.
+        Rebuilt only when new rows were folded in since the last call.
+        """
+        with self._engine_lock:
+            version, reports = self._reports
+            if version == self.version:
+                return reports
+            if self.engine.partials[LIVE_RESOLUTION] is None:
+                return {}
+            tables = build_reports(self.engine, LIVE_RESOLUTION)
+            tables['predictive_maintenance_report'] = self.anomalies.report()
+            reports = {display_name: compact_types(apply_types(tables[table], display_name), table)
+                       for display_name, table in TABLE_NAMES.items()}
+            self._reports = (self.version, reports)
+            return reports
+
+    def request_rate(self) -> pd.DataFrame:
+        """Requests/sec and error rate per minute over the retention period."""
+        with self._engine_lock:
+            partials = self.engine.partials[LIVE_RESOLUTION]
+            if partials is None:
+                return pd.DataFrame(columns=['requests_per_sec', 'error_rate_pct'])
+            merged = merge_partials(partials, ['window_start']).sort_index()
+        return pd.DataFrame({'requests_per_sec': merged['count'] / 60,
+                             'error_rate_pct': 100 * merged['error_count'] / merged['count']})
+
+    def stats(self) -> dict:
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {'received': self.received, 'pending': pending, 'version': self.version,
+                'last_flush_ms': self.last_flush_ms, 'dropped': self.dropped, 'last_error': self.last_error}
+
+class SocketSource:
+    """
+    Local stand-in for realtime: a TCP server that accepts newline-delimited JSON
+    request records (the same format as the ingested log files).
+    """
+
+    def __init__(self, port: int = LIVE_SOCKET_PORT, host: str = '127.0.0.1', batch_rows: int = 500):
+        self.address = (host, port)
+        self.batch_rows = batch_rows
+        self._server = None
+
+    def start(self, push):
+        batch_rows = self.batch_rows
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                records = []
+                for line in self.rfile:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if not isinstance(record, dict):
+                        continue
+                    records.append(record)
+                    if len(records) >= batch_rows:
+                        push(records)
+                        records = []
+                if records:
+                    push(records)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer(self.address, Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="live-socket", daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+class RealtimeSource:
+    """Supabase realtime subscription to INSERTs on the request log table."""
+
+    def __init__(self, table: str = REQUEST_LOG_TABLE, url: str = SUPABASE_URL, key: str = SUPABASE_KEY):
+        self.table = table
+        self.url = url.replace('http', 'ws', 1).rstrip('/') + '/realtime/v1'
+        self.key = key
+        self._loop = None
+
+    def start(self, push):
+        from realtime import AsyncRealtimeClient
+
+        async def subscribe():
+            client = AsyncRealtimeClient(self.url, self.key)
+            await client.connect()
+            channel = client.channel(f"live-{self.table}")
+            channel.on_postgres_changes('INSERT', schema='public', table=self.table,
+                                        callback=lambda payload: push([payload['data']['record']]))
+            await channel.subscribe()
+
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="live-realtime", daemon=True).start()
+        asyncio.run_coroutine_threadsafe(subscribe(), self._loop).result(timeout=30)
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+def start_live(source_name: str) -> tuple:
+    """Creates an aggregator fed by the named source ("supabase" or "socket") and starts both."""
+    aggregator = LiveAggregator()
+    source = SocketSource() if source_name == "socket" else RealtimeSource()
+    source.start(aggregator.push)
+    aggregator.start_flusher()
+    return aggregator, source
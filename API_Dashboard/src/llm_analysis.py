@@ -1,118 +1,93 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from langchain_community.llms import Ollama
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-from src.config import LLM_MODEL_NAME
+from src import charts, question_router
+from src.config import LLM_PROMPT_MAX_CHARS
+from src.figure_cache import frame_fingerprint, get_figure_cache
+from src.llm_service import LLMBusyError, LLMService
+from src.tracing import span
+
+# Metrics whose top rows are included in the LLM prompt, and the key columns that identify a row
+_PROMPT_METRICS = ['request_count', 'avg_latency', 'p99_latency', 'error_rate_pct', 'avg_error_rate',
+                   'prediction_score', 'efficiency_score', 'api_diversity']
+_PROMPT_KEYS = ['client_id', 'uri_path']
+
+@st.cache_resource
+def get_llm_service() -> LLMService:
+    """Returns the LLM service shared by all sessions of this dashboard process."""
+    return LLMService()
+
+def compact_statistics(df: pd.DataFrame, max_chars: int = LLM_PROMPT_MAX_CHARS) -> str:
+    """
+    Summarises a report for the LLM prompt: shape, column types, descriptive
+    statistics and the top 5 rows per key metric, capped at max_chars.
+    """
+    summary = charts.build_charts(df, [charts.overview(df)], cache=get_figure_cache())[0]['summary']
+    lines = [f"Rows: {len(df)}",
+             "Columns: " + ", ".join(f"{col} ({dtype})" for col, dtype in df.dtypes.astype(str).items()),
+             "Descriptive statistics:",
+             summary.apply(lambda col: col.map(lambda v: round(v, 2) if isinstance(v, float) else v)).to_csv()]
+    key = next((col for col in _PROMPT_KEYS if col in df.columns), None)
+    if key is not None:
+        shared = charts.SharedFrames(df)
+        for metric in _PROMPT_METRICS:
+            if metric in df.columns:
+                top = shared.top(metric, 5)[[key, metric]].round(2)
+                lines.append(f"Top 5 {key} by {metric}: " +
+                             "; ".join(f"{k}={v}" for k, v in zip(top[key], top[metric])))
+    text = "\n".join(lines)
+    return text if len(text) <= max_chars else text[:max_chars] + "\n(truncated)"
+
+def build_prompt(question: str, df: pd.DataFrame, report_name: str) -> str:
+    return (f"You are analysing the '{report_name}' API monitoring report. The raw rows are not included; "
+            f"answer using only these precomputed statistics.\n\n{compact_statistics(df)}\n\n"
+            f"Question: {question}\nAnswer concisely:")
+
+def stream_answer(answer, placeholder) -> str:
+    """Writes a string or AnswerStream into a placeholder as it arrives and returns the final text."""
+    if isinstance(answer, str):
+        placeholder.markdown(answer)
+        return answer
+    try:
+        for _ in answer:
+            placeholder.markdown(answer.text + "▌")
+    except Exception as e:
+        st.error(f"Error getting an answer from the LLM: {e}")
+        if not answer.text:
+            placeholder.markdown("The LLM did not return an answer.")
+            return "The LLM did not return an answer."
+    placeholder.markdown(answer.text)
+    return answer.text
 
 def generate_plot_from_question(question: str, df: pd.DataFrame):
     """Generate a plot based on user's natural language question"""
-    q_lower = question.lower()
-    
-    # Boxplot generation
-    if "boxplot" in q_lower:
-        if "latency" in q_lower and 'avg_latency' in df.columns:
-            title = "Boxplot of Latency (ms)"
-            fig = px.box(df, y='avg_latency', title=title)
-            return fig
-        elif "request" in q_lower and 'request_count' in df.columns:
-            title = "Boxplot of Request Count"
-            fig = px.box(df, y='request_count', title=title)
-            return fig
-    
-    # Heatmap generation
-    if "heatmap" in q_lower:
-        if "correlation" in q_lower:
-            numeric_df = df.select_dtypes(include=['number'])
-            if not numeric_df.empty:
-                corr_matrix = numeric_df.corr()
-                title = "Correlation Heatmap"
-                fig = px.imshow(corr_matrix, text_auto=True, aspect="auto", title=title)
-                return fig
-    
-    # Histogram generation
-    if "histogram" in q_lower:
-        if "latency" in q_lower and 'avg_latency' in df.columns:
-            title = "Histogram of Latency (ms)"
-            fig = px.histogram(df, x='avg_latency', title=title)
-            return fig
-        elif "request" in q_lower and 'request_count' in df.columns:
-            title = "Histogram of Request Count"
-            fig = px.histogram(df, x='request_count', title=title)
-            return fig
-    
-    # Scatter plot
-    if "scatter" in q_lower or "relationship" in q_lower:
-        if "latency" in q_lower and "request" in q_lower and 'avg_latency' in df.columns and 'request_count' in df.columns:
-            title = "Latency vs Request Count"
-            fig = px.scatter(df, x='request_count', y='avg_latency', title=title)
-            return fig
-    
-    return None
+    return question_router.answer(question, df, report_name=None, plot=True)
 
-def get_llm_response(question: str, df: pd.DataFrame, report_name: str) -> str:
+def get_llm_response(question: str, df: pd.DataFrame, report_name: str):
     """
     Processes a natural language question and returns an analytical answer.
-    Now includes dynamic plot generation.
+    Now includes dynamic plot generation. Questions the built-in rules cannot answer
+    return an AnswerStream from the LLM service; render it with stream_answer().
     """
     if df.empty:
         return f"The selected '{report_name}' table has no data to analyze."
     
-    # Generate plot if requested
-    plot_fig = generate_plot_from_question(question, df)
+    with span("llm_route", rows=len(df)):
+        # Generate plot if requested
+        plot_fig = generate_plot_from_question(question, df)
+        # Questions the registered intents can answer from the table itself
+        response = None if plot_fig else question_router.answer(question, df, report_name, plot=False)
     if plot_fig:
         # Store plot in session state for display
         st.session_state.llm_plot = plot_fig
         return "I've generated the requested visualization in the main dashboard area."
-    
-    # Standardize question for easier matching
-    q_lower = question.lower()
-    
-    # Dynamic analysis based on available columns
-    response = "I can provide insights based on the available columns in this report. "
-    
-    # General data questions
-    if "total rows" in q_lower or "number of entries" in q_lower:
-        return f"There are **{len(df)}** entries in the **{report_name}**."
-    
-    if "columns available" in q_lower:
-        return f"The available columns in the current **{report_name}** are: {', '.join(df.columns.tolist())}."
-    
-    # Dynamic analysis based on actual columns in the dataframe
-    if "highest average latency" in q_lower:
-        latency_cols = [col for col in df.columns if 'latency' in col.lower()]
-        if latency_cols:
-            group_cols = [col for col in df.columns if 'client' in col.lower() or 'api' in col.lower() or 'uri' in col.lower()]
-            if group_cols:
-                grouped = df.groupby(group_cols[0])[latency_cols[0]].mean().sort_values(ascending=False)
-                if not grouped.empty:
-                    top_item = grouped.index[0]
-                    top_value = grouped.iloc[0]
-                    return f"The {group_cols[0]} with the highest average latency is **'{top_item}'** with **{top_value:.2f} ms**."
-    
-    if "highest error rate" in q_lower:
-        error_cols = [col for col in df.columns if 'error' in col.lower()]
-        if error_cols:
-            group_cols = [col for col in df.columns if 'client' in col.lower() or 'api' in col.lower() or 'uri' in col.lower()]
-            if group_cols:
-                grouped = df.groupby(group_cols[0])[error_cols[0]].mean().sort_values(ascending=False)
-                if not grouped.empty:
-                    top_item = grouped.index[0]
-                    top_value = grouped.iloc[0]
-                    return f"The {group_cols[0]} with the highest error rate is **'{top_item}'** with **{top_value:.2f}%**."
-    
-    if "top" in q_lower and "request" in q_lower:
-        request_cols = [col for col in df.columns if 'request' in col.lower()]
-        if request_cols:
-            group_cols = [col for col in df.columns if 'client' in col.lower() or 'api' in col.lower() or 'uri' in col.lower()]
-            if group_cols:
-                grouped = df.groupby(group_cols[0])[request_cols[0]].sum().sort_values(ascending=False)
-                if not grouped.empty:
-                    top_items = grouped.head(3)
-                    items_str = ", ".join([f"{item} ({value} requests)" for item, value in top_items.items()])
-                    return f"The top {group_cols[0]}s by request count are: {items_str}."
-    
-    # Default response if no specific question is matched
-    return "I can analyze this data for you. Try asking about latency, error rates, request counts, or request visualizations like boxplots or heatmaps."
\ No newline at end of file
+    if response is not None:
+        return response
+
+    # Anything else goes to the LLM, answered as a token stream
+    with span("llm_prompt", rows=len(df)) as s:
+        prompt = build_prompt(question, df, report_name)
+        s.bytes = len(prompt)
+    try:
+        return get_llm_service().ask(question, prompt, report_name, frame_fingerprint(df))
+    except LLMBusyError as e:
+        return str(e)
\ No newline at end of file
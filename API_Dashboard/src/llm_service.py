@@ -0,0 +1,161 @@
+"""
+Non-blocking access to a local Ollama-compatible LLM.
+
+Generations run on an asyncio event loop in a background thread, at most
+LLM_MAX_CONCURRENCY at a time with up to LLM_QUEUE_SIZE questions waiting. Callers
+get an AnswerStream that yields tokens as they arrive, so a Streamlit run can show
+the answer while it is generated. Finished answers are cached per (normalised
+question, table, data fingerprint) for LLM_CACHE_TTL seconds.
+"""
+import asyncio
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from src.config import (LLM_CACHE_TTL, LLM_HOST, LLM_MAX_CONCURRENCY, LLM_MODEL_NAME,
+                        LLM_QUEUE_SIZE, LLM_TIMEOUT)
+from src.tracing import span
+
+_DONE = object()
+
+class LLMBusyError(RuntimeError):
+    """Raised when the question queue is full."""
+
+def normalise_question(question: str) -> str:
+    """Lower-cases a question and collapses whitespace and trailing punctuation."""
+    return re.sub(r'\s+', ' ', question.strip().lower()).rstrip('?.! ')
+
+class AnswerCache:
+    """Answers with a time-to-live, evicting the oldest beyond max_entries."""
+
+    def __init__(self, ttl: float, max_entries: int = 512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, answer: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class AnswerStream:
+    """
+    Iterator over the tokens of one answer. `text` holds everything received so far;
+    iteration raises the generation's error if it failed.
+    """
+
+    def __init__(self, cached: bool = False):
+        self.text = ""
+        self.cached = cached
+        self._tokens = queue.Queue()
+        self._error = None
+
+    @classmethod
+    def finished(cls, answer: str):
+        stream = cls(cached=True)
+        stream._put(answer)
+        stream._finish()
+        return stream
+
+    def _put(self, token: str):
+        self._tokens.put(token)
+
+    def _finish(self, error: Exception = None):
+        self._error = error
+        self._tokens.put(_DONE)
+
+    def __iter__(self):
+        while True:
+            try:
+                token = self._tokens.get(timeout=LLM_TIMEOUT)
+            except queue.Empty:
+                raise TimeoutError("The LLM stopped sending tokens.")
+            if token is _DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            self.text += token
+            yield token
+
+class LLMService:
+    """Queues questions for a background event loop that streams answers from the endpoint."""
+
+    def __init__(self, host: str = LLM_HOST, model: str = LLM_MODEL_NAME,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, queue_size: int = LLM_QUEUE_SIZE,
+                 cache_ttl: float = LLM_CACHE_TTL):
+        self.model = model
+        self.cache = AnswerCache(cache_ttl)
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="llm-service", daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._start(host, max_concurrency, queue_size), self._loop).result()
+
+    async def _start(self, host: str, max_concurrency: int, queue_size: int):
+        # The client and queue belong to the service's loop, so they are created on it. The
+        # ollama package is only imported once the first question reaches the LLM
+        from ollama import AsyncClient
+        self._client = AsyncClient(host=host)
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(max_concurrency)]
+
+    async def _worker(self):
+        while True:
+            prompt, key, stream = await self._queue.get()
+            try:
+                answer = await asyncio.wait_for(self._generate(prompt, stream), LLM_TIMEOUT)
+            except Exception as e:
+                stream._finish(e)
+            else:
+                self.cache.put(key, answer)
+                stream._finish()
+            finally:
+                self._queue.task_done()
+
+    async def _generate(self, prompt: str, stream: AnswerStream) -> str:
+        parts = []
+        with span("llm_generate") as s:
+            async for chunk in await self._client.generate(model=self.model, prompt=prompt, stream=True):
+                token = chunk['response']
+                if token:
+                    parts.append(token)
+                    stream._put(token)
+            answer = "".join(parts)
+            s.bytes = len(answer)
+        return answer
+
+    async def _enqueue(self, item: tuple):
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            raise LLMBusyError("The LLM is busy with other questions; try again shortly.")
+
+    def ask(self, question: str, prompt: str, table: str, fingerprint: str) -> AnswerStream:
+        """
+        Returns the answer to a question about a table's data as a token stream,
+        from the cache when the same question was answered for the same data.
+        """
+        key = (normalise_question(question), table, fingerprint)
+        answer = self.cache.get(key)
+        if answer is not None:
+            return AnswerStream.finished(answer)
+        stream = AnswerStream()
+        asyncio.run_coroutine_threadsafe(self._enqueue((prompt, key, stream)), self._loop).result()
+        return stream
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "cache_hits": self.cache.hits, "cache_misses": self.cache.misses}
@@ -0,0 +1,109 @@
+"""
+Pushes the aggregations in src/analytics.py down to Postgres.
+
+An AggregateQuery describes one GROUP BY / time-bucket aggregation and is executed
+through the `dashboard_aggregate` RPC (sql/dashboard_aggregate.sql), so only the
+aggregated rows travel back to the dashboard.
+"""
+from dataclasses import dataclass
+from typing import Optional
+import pandas as pd
+from src.config import REQUEST_LOG_TABLE
+
+AGGREGATE_RPC = "dashboard_aggregate"
+
+@dataclass(frozen=True)
+class AggregateQuery:
+    """
+    One aggregation: func(metric) grouped by a column and/or a time bucket, over the
+    rows with start <= time_column < end and, when keys are given, group_by in keys.
+    """
+    table: str
+    func: str = "count"
+    metric: Optional[str] = None
+    group_by: Optional[str] = None
+    freq: Optional[str] = None
+    time_column: str = "timestamp"
+    order: str = "value_desc"
+    limit: Optional[int] = None
+    quantile: Optional[float] = None
+    start: Optional[pd.Timestamp] = None
+    end: Optional[pd.Timestamp] = None
+    keys: Optional[tuple] = None
+
+    def params(self) -> dict:
+        """Returns the RPC parameters for this query."""
+        params = {
+            "p_table": self.table,
+            "p_func": self.func,
+            "p_metric": self.metric,
+            "p_group_by": self.group_by,
+            "p_time_column": self.time_column,
+            "p_order": self.order,
+            "p_limit": self.limit,
+        }
+        if self.quantile is not None:
+            params["p_quantile"] = self.quantile
+        if self.start is not None:
+            params["p_start"] = pd.Timestamp(self.start).isoformat()
+        if self.end is not None:
+            params["p_end"] = pd.Timestamp(self.end).isoformat()
+        if self.keys is not None:
+            params["p_keys"] = [str(key) for key in self.keys]
+        if self.freq:
+            # Postgres date_bin() takes any interval, so pandas offsets map to seconds
+            params["p_bucket"] = f"{int(pd.Timedelta(self.freq).total_seconds())} seconds"
+        return params
+
+class RemoteTable:
+    """
+    Stand-in for a DataFrame that lives in Postgres. The analytics functions accept
+    either a DataFrame or a RemoteTable and return the same result shapes.
+    """
+
+    def __init__(self, table_name: str = REQUEST_LOG_TABLE, supabase=None):
+        self.table_name = table_name
+        self._supabase = supabase
+
+    @property
+    def supabase(self):
+        if self._supabase is None:
+            from src.data_loader import init_supabase
+            self._supabase = init_supabase()
+        return self._supabase
+
+    def time_bounds(self, time_column: str = "timestamp") -> tuple:
+        """
+        First and last value of a time column (None for an empty table), read as two
+        one-row ordered queries that an index on the column answers without a scan.
+        """
+        bounds = []
+        for desc in (False, True):
+            query = self.supabase.from_(self.table_name).select(time_column)
+            rows = query.order(time_column, desc=desc, nullsfirst=False).limit(1).execute().data
+            bounds.append(pd.Timestamp(rows[0][time_column]) if rows and rows[0][time_column] else None)
+        return tuple(bounds)
+
+    def run(self, query: AggregateQuery) -> pd.DataFrame:
+        """Executes a query and returns its (key, bucket, value) rows."""
+        rows = self.supabase.rpc(AGGREGATE_RPC, query.params()).execute().data
+        return pd.DataFrame(rows, columns=["key", "bucket", "value"])
+
+    def aggregate(self, func: str = "count", metric: str = None, group_by: str = None, freq: str = None,
+                  order: str = "value_desc", limit: int = None, time_column: str = "timestamp",
+                  quantile: float = None, start=None, end=None, keys=None) -> pd.Series:
+        """
+        Runs one aggregation and returns it as a Series indexed like the pandas equivalent.
+        start/end restrict it to rows with start <= time_column < end, keys to rows whose
+        group_by value is one of them.
+        """
+        query = AggregateQuery(self.table_name, func, metric, group_by, freq, time_column, order, limit, quantile,
+                               start, end, None if keys is None else tuple(keys))
+        result = self.run(query)
+        if freq:
+            index = pd.DatetimeIndex(pd.to_datetime(result["bucket"]), name=time_column)
+        else:
+            index = pd.Index(result["key"], name=group_by)
+        if func == "count":
+            return pd.Series(result["value"].to_numpy(dtype="int64"), index=index, name="count")
+        return pd.Series(result["value"].to_numpy(), index=index, name=metric)
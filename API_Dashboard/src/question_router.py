@@ -0,0 +1,207 @@
+"""
+Compiled intent routing for dashboard questions.
+
+Intents are registered in order with a precompiled pattern and a handler. A
+question is tried against each pattern once; the first matching intent whose
+handler can answer from the current table wins, and anything left over goes to
+the LLM. Handlers read column roles (latency, error, request, grouping and time
+columns) from an index built once per table, and group-by results are memoized
+per table, so repeated questions are answered from memory. Add an intent with:
+
+    @intent('median_latency', r'\\bmedian\\b')
+    def _median(match, df, roles, report_name):
+        ...
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable, Optional
+import pandas as pd
+from src import charts
+from src.figure_cache import cached, get_figure_cache
+from src.sketches import quantile_label
+
+@dataclass(frozen=True)
+class ColumnRoles:
+    """Columns of a report table by role, in table order."""
+    latency: tuple
+    error: tuple
+    request: tuple
+    group: tuple
+    time: tuple
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        numeric = set(df.select_dtypes(include=['number']).columns)
+        columns = [col for col in df.columns if isinstance(col, str)]
+        return cls(
+            latency=tuple(col for col in columns if 'latency' in col.lower() and col in numeric),
+            error=tuple(col for col in columns if 'error' in col.lower() and col in numeric),
+            request=tuple(col for col in columns if 'request' in col.lower() and col in numeric),
+            group=tuple(col for col in columns if col not in numeric
+                        and any(word in col.lower() for word in ('client', 'api', 'uri'))),
+            time=tuple(col for col in columns if pd.api.types.is_datetime64_any_dtype(df[col].dtype)),
+        )
+
+def column_roles(df: pd.DataFrame) -> ColumnRoles:
+    """Returns the role index of a table, built once per table content."""
+    return cached(df, ('column_roles',), lambda: ColumnRoles.from_frame(df))
+
+def grouped(df: pd.DataFrame, by: str, value: str, how: str) -> pd.Series:
+    """`value` aggregated with `how` per `by` key, sorted descending, memoized per table content."""
+    return cached(df, ('groupby', by, value, how), lambda: (
+        df.groupby(by, observed=True)[value].agg(how).sort_values(ascending=False)))
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    pattern: re.Pattern
+    handler: Callable
+    plot: bool = False
+
+INTENTS = []
+
+def intent(name: str, pattern: str, plot: bool = False):
+    """
+    Registers a handler(match, df, roles, report_name) for questions matching the
+    pattern (case-insensitive). Handlers return an answer, a figure for plot
+    intents, or None when the table cannot answer, in which case routing continues.
+    """
+    def register(handler):
+        INTENTS.append(Intent(name, re.compile(pattern, re.IGNORECASE | re.DOTALL), handler, plot))
+        return handler
+    return register
+
+def route(question: str, plot: Optional[bool] = None):
+    """Yields (intent, match) for every registered intent the question matches, in order."""
+    for candidate in INTENTS:
+        if plot is not None and candidate.plot != plot:
+            continue
+        match = candidate.pattern.search(question)
+        if match:
+            yield candidate, match
+
+def answer(question: str, df: pd.DataFrame, report_name: str, plot: Optional[bool] = None):
+    """Returns the first non-None handler result for the question, or None if no intent answers."""
+    roles = column_roles(df)
+    for candidate, match in route(question, plot):
+        result = candidate.handler(match, df, roles, report_name)
+        if result is not None:
+            return result
+    return None
+
+def _chart(df: pd.DataFrame, spec: charts.ChartSpec):
+    if spec.build is None:
+        return None
+    return charts.build_charts(df, [spec], cache=get_figure_cache())[0]
+
+# Plot intents, built from the dashboard's chart specs so they share the figure cache
+
+@intent('latency_boxplot', r'\A(?=.*boxplot)(?=.*latency)', plot=True)
+def _latency_boxplot(match, df, roles, report_name):
+    return _chart(df, charts.latency_boxplot(df))
+
+@intent('request_boxplot', r'\A(?=.*boxplot)(?=.*request)', plot=True)
+def _request_boxplot(match, df, roles, report_name):
+    return _chart(df, charts.request_boxplot(df))
+
+@intent('correlation_heatmap', r'\A(?=.*heatmap)(?=.*correlation)', plot=True)
+def _correlation_heatmap(match, df, roles, report_name):
+    return _chart(df, charts.correlation_heatmap(df))
+
+@intent('latency_histogram', r'\A(?=.*histogram)(?=.*latency)', plot=True)
+def _latency_histogram(match, df, roles, report_name):
+    return _chart(df, charts.latency_histogram(df))
+
+@intent('request_histogram', r'\A(?=.*histogram)(?=.*request)', plot=True)
+def _request_histogram(match, df, roles, report_name):
+    return _chart(df, charts.request_histogram(df))
+
+@intent('latency_vs_requests', r'\A(?=.*(?:scatter|relationship))(?=.*latency)(?=.*request)', plot=True)
+def _latency_vs_requests(match, df, roles, report_name):
+    return _chart(df, charts.latency_vs_requests(df))
+
+# Answer intents
+
+@intent('total_rows', r'total rows|number of entries')
+def _total_rows(match, df, roles, report_name):
+    return f"There are **{len(df)}** entries in the **{report_name}**."
+
+@intent('columns', r'columns available')
+def _columns(match, df, roles, report_name):
+    return f"The available columns in the current **{report_name}** are: {', '.join(df.columns.tolist())}."
+
+@intent('highest_latency', r'highest average latency')
+def _highest_latency(match, df, roles, report_name):
+    if not roles.latency or not roles.group:
+        return None
+    result = grouped(df, roles.group[0], roles.latency[0], 'mean')
+    if result.empty:
+        return None
+    return f"The {roles.group[0]} with the highest average latency is **'{result.index[0]}'** with **{result.iloc[0]:.2f} ms**."
+
+@intent('highest_error_rate', r'highest error rate')
+def _highest_error_rate(match, df, roles, report_name):
+    if not roles.error or not roles.group:
+        return None
+    result = grouped(df, roles.group[0], roles.error[0], 'mean')
+    if result.empty:
+        return None
+    return f"The {roles.group[0]} with the highest error rate is **'{result.index[0]}'** with **{result.iloc[0]:.2f}%**."
+
+# "p99", "p99.9", "99th percentile", "99.9th percentile"
+_PERCENTILE = r'\bp(?P<p>\d{1,2}(?:\.\d+)?)\b|\b(?P<nth>\d{1,2}(?:\.\d+)?)(?:st|nd|rd|th)?\s*percentile'
+_PERCENTILE_RE = re.compile(_PERCENTILE, re.IGNORECASE)
+
+def _percentile_label(match) -> str:
+    """The percentile named by a _PERCENTILE match as a column label ('p99.9'), or 'p50' for the median."""
+    return quantile_label(float(match.group('p') or match.group('nth') or 50) / 100)
+
+@intent('top_n', r'\A(?=.*\btop\b\s*(?P<n>\d+)?)(?=.*(?P<metric>request|latency|error))')
+def _top_n(match, df, roles, report_name):
+    metric = match.group('metric').lower()
+    columns = {'request': roles.request, 'latency': roles.latency, 'error': roles.error}[metric]
+    percentile = _PERCENTILE_RE.search(match.string) if metric == 'latency' else None
+    if percentile and f"{_percentile_label(percentile)}_latency" in roles.latency:
+        # "top 5 clients by p99 latency" ranks by that percentile column, not the first latency column
+        columns = (f"{_percentile_label(percentile)}_latency",)
+    if not columns or not roles.group:
+        return None
+    n = int(match.group('n') or 3)
+    result = grouped(df, roles.group[0], columns[0], 'sum' if metric == 'request' else 'mean').head(n)
+    if result.empty:
+        return None
+    if metric == 'request':
+        items = ", ".join(f"{item} ({value} requests)" for item, value in result.items())
+        return f"The top {roles.group[0]}s by request count are: {items}."
+    items = ", ".join(f"{item} ({value:.2f})" for item, value in result.items())
+    return f"The top {n} {roles.group[0]}s by {columns[0]} are: {items}."
+
+@intent('percentile', _PERCENTILE + r'|\bmedian\b')
+def _percentile(match, df, roles, report_name):
+    if not roles.latency:
+        return None
+    label = _percentile_label(match)
+    column = f"{label}_latency"
+    if column in df.columns and roles.group:
+        result = grouped(df, roles.group[0], column, 'max')
+        if not result.empty:
+            return (f"The {roles.group[0]} with the highest {label} latency is **'{result.index[0]}'** "
+                    f"with **{result.iloc[0]:.2f} ms**.")
+    value = cached(df, ('quantile', roles.latency[0], label), lambda: df[roles.latency[0]].quantile(float(label[1:]) / 100))
+    return f"The {label} of {roles.latency[0]} across the **{report_name}** is **{value:.2f} ms**."
+
+_UNITS = {'minute': 'min', 'hour': 'h', 'day': 'D', 'week': 'W'}
+
+@intent('time_range', r'\b(?:last|past)\s+(?P<n>\d+)?\s*(?P<unit>minute|hour|day|week)s?\b')
+def _time_range(match, df, roles, report_name):
+    if not roles.time:
+        return None
+    column = roles.time[-1]
+    times = df[column]
+    now = pd.Timestamp.now(tz=times.dt.tz)
+    since = now - pd.Timedelta(int(match.group('n') or 1), unit=_UNITS[match.group('unit').lower()])
+    recent = df[times >= since]
+    text = f"**{len(recent)}** entries in the **{report_name}** have {column} in the {match.group(0).lower()}"
+    if roles.request and not recent.empty:
+        text += f", with **{int(recent[roles.request[0]].sum())}** requests in total"
+    return text + "."
@@ -0,0 +1,150 @@
+"""
+Server-side figure reduction for large tables.
+
+Histograms and box plots are binned/summarised in NumPy so only the bin counts or
+box statistics are sent to the browser. Scatter plots switch to WebGL and, above
+SCATTER_POINT_BUDGET points, to a 2D density heatmap; line charts are reduced
+with LTTB. show_chart() records payload size and render time per chart in the
+session's chart_stats(). plotly is imported on the first figure built.
+"""
+from __future__ import annotations
+import time
+import weakref
+import numpy as np
+import pandas as pd
+import streamlit as st
+from src.config import SCATTER_POINT_BUDGET, LINE_POINT_BUDGET, HISTOGRAM_BINS, MAX_COLOR_TRACES
+from src.lazy import lazy_import
+from src.tracing import span
+
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+
+# id(fig) -> (weakref to fig, payload bytes); cached figures are serialized for sizing only once
+_payload_sizes = {}
+
+def _finite(values) -> np.ndarray:
+    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    return values[np.isfinite(values)]
+
+def histogram_figure(values, title: str, x_label: str, bins: int = HISTOGRAM_BINS) -> go.Figure:
+    """Histogram pre-binned with np.histogram; the payload is one bar per bin."""
+    values = _finite(values)
+    counts, edges = np.histogram(values, bins=bins) if len(values) else (np.array([]), np.array([0.0]))
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                           marker_line_width=0, name=x_label))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title='count', bargap=0)
+    return fig
+
+def box_figure(values, title: str, y_label: str, max_outliers: int = 200) -> go.Figure:
+    """Box plot from precomputed quartiles and fences, with a capped set of outliers."""
+    values = _finite(values)
+    fig = go.Figure()
+    if len(values):
+        q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        lower = values[values >= q1 - 1.5 * iqr].min()
+        upper = values[values <= q3 + 1.5 * iqr].max()
+        fig.add_trace(go.Box(q1=[q1], median=[median], q3=[q3], lowerfence=[lower], upperfence=[upper],
+                             mean=[values.mean()], name=y_label, boxpoints=False))
+        outliers = values[(values < lower) | (values > upper)]
+        if len(outliers):
+            # Keep the most extreme outliers rather than shipping all of them
+            extreme = outliers[np.argsort(np.abs(outliers - median))[-max_outliers:]]
+            fig.add_trace(go.Scatter(x=[y_label] * len(extreme), y=extreme, mode='markers',
+                                     marker=dict(size=4, opacity=0.5), name='outliers'))
+    fig.update_layout(title=title, yaxis_title=y_label, showlegend=False)
+    return fig
+
+def _limit_colors(df: pd.DataFrame, color: str, size: str = None) -> pd.DataFrame:
+    """Keeps the MAX_COLOR_TRACES largest color groups and folds the rest into 'Other'."""
+    weights = df[size] if size else pd.Series(1, index=df.index)
+    top = weights.groupby(df[color], observed=True).sum().nlargest(MAX_COLOR_TRACES).index
+    labels = df[color].astype(object).where(df[color].isin(top), 'Other')
+    return df.assign(**{color: labels})
+
+def scatter_figure(df: pd.DataFrame, x: str, y: str, title: str, color: str = None, size: str = None,
+                   hover_name: str = None, point_budget: int = SCATTER_POINT_BUDGET) -> go.Figure:
+    """
+    WebGL scatter with at most MAX_COLOR_TRACES color traces. Above point_budget the
+    points are replaced by a 2D density heatmap.
+    """
+    plot_df = df[[c for c in dict.fromkeys([x, y, color, size, hover_name]) if c]].dropna(subset=[x, y])
+    if len(plot_df) <= point_budget:
+        if color and plot_df[color].nunique() > MAX_COLOR_TRACES:
+            plot_df = _limit_colors(plot_df, color, size)
+        return px.scatter(plot_df, x=x, y=y, color=color, size=size, hover_name=hover_name,
+                          title=title, render_mode='webgl')
+
+    bins = int(np.sqrt(point_budget))
+    xs, ys = plot_df[x].to_numpy(dtype=float), plot_df[y].to_numpy(dtype=float)
+    counts, x_edges, y_edges = np.histogram2d(xs, ys, bins=bins)
+    z = np.where(counts > 0, counts, np.nan).T
+    fig = go.Figure(go.Heatmap(z=z, x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+                               colorscale='Viridis', colorbar=dict(title='rows'),
+                               hovertemplate=f'{x}=%{{x}}<br>{y}=%{{y}}<br>rows=%{{z}}<extra></extra>'))
+    fig.update_layout(title=f"{title} (density of {len(plot_df):,} points)", xaxis_title=x, yaxis_title=y)
+    return fig
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int):
+    """Largest-Triangle-Three-Buckets downsampling of a time series to n_out points."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+    xf = x.astype('int64').astype(float) if np.issubdtype(x.dtype, np.datetime64) else x.astype(float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket is the third triangle vertex
+        avg_x, avg_y = xf[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((xf[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (xf[previous] - xf[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        keep[i + 1] = previous
+    return x[keep], y[keep]
+
+def line_figure(x, y, title: str, x_label: str, y_label: str, point_budget: int = LINE_POINT_BUDGET) -> go.Figure:
+    """WebGL line chart, LTTB-downsampled to point_budget points."""
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    x, y = lttb(x, y, point_budget)
+    fig = go.Figure(go.Scattergl(x=x, y=y, mode='lines', name=y_label))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+    return fig
+
+def lines_figure(frame: pd.DataFrame, title: str, y_label: str, point_budget: int = LINE_POINT_BUDGET) -> go.Figure:
+    """WebGL line chart with one trace per column, each LTTB-downsampled to point_budget points."""
+    fig = go.Figure()
+    for column in frame.columns:
+        values = frame[column].dropna()
+        x, y = lttb(values.index.to_numpy(), values.to_numpy(dtype=float), point_budget)
+        fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', name=str(column)))
+    fig.update_layout(title=title, xaxis_title=frame.index.name, yaxis_title=y_label)
+    return fig
+
+def chart_stats() -> dict:
+    """This session's chart title -> {'payload_bytes', 'render_ms', 'traces'} for the most recent render."""
+    return st.session_state.setdefault('chart_stats', {})
+
+def show_chart(fig: go.Figure, container=st, **kwargs):
+    """
+    Renders a figure and records its serialized payload size and render time.
+    kwargs go to plotly_chart (e.g. key and on_select for clickable charts).
+    """
+    started = time.perf_counter()
+    entry = _payload_sizes.get(id(fig))
+    if entry is not None and entry[0]() is fig:
+        payload_bytes = entry[1]
+    else:
+        payload_bytes = len(fig.to_json())
+        key = id(fig)
+        _payload_sizes[key] = (weakref.ref(fig, lambda _: _payload_sizes.pop(key, None)), payload_bytes)
+    with span("render_chart", bytes=payload_bytes):
+        container.plotly_chart(fig, use_container_width=True, **kwargs)
+    title = fig.layout.title.text or "untitled"
+    chart_stats()[title] = {'payload_bytes': payload_bytes,
+                            'render_ms': (time.perf_counter() - started) * 1000,
+                            'traces': len(fig.data)}
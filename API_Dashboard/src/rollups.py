@@ -0,0 +1,337 @@
+"""
+Incremental rollups of raw request logs into the three dashboard reports.
+
+Requests are folded into mergeable partial aggregates (count, sums, min, max and a
+latency quantile sketch) per fixed time window and dimension key. A new batch only
+re-merges the windows it touches, and reports for any time range are built by
+merging partials, never by averaging averages. The command line also feeds the
+requests to the anomaly engine in src/anomaly.py, whose scores make up the written
+predictive_maintenance_report. Build the report tables from a JSONL log with:
+
+    python -m src.rollups logs/2024-05-01.jsonl --resolution 1h
+
+The partials are kept in <out>/rollups and the reports are written to <out>/reports,
+apart from the synced copies of the Supabase tables in <out> itself.
+"""
+import argparse
+import bisect
+import os
+import numpy as np
+import pandas as pd
+from src.config import LOCAL_STORE_DIR, LATENCY_TARGET_MS, ROLLUP_ROW_GROUP_ROWS
+from src.sketches import sketch_counts, merge_sketches, sketch_quantiles, DEFAULT_QUANTILES
+
+RESOLUTIONS = {'1m': '1min', '5m': '5min', '1h': '1h', '1d': '1D'}
+
+# How each partial column combines when windows or batches are merged
+MERGE_RULES = {
+    'count': 'sum',
+    'latency_count': 'sum',
+    'latency_sum': 'sum',
+    'latency_min': 'min',
+    'latency_max': 'max',
+    'error_count': 'sum',
+    'first_seen': 'min',
+    'last_seen': 'max',
+}
+
+def _partials(requests: pd.DataFrame, freq: str, dimensions: list) -> pd.DataFrame:
+    """Aggregates raw requests into partials indexed by (window_start, *dimensions)."""
+    frame = pd.DataFrame({
+        'window_start': requests['timestamp'].dt.floor(freq),
+        'timestamp': requests['timestamp'],
+        'latency_ms': requests['latency_ms'],
+        'is_error': requests['status_code_cleaned'] >= 400,
+        **{dim: requests[dim] for dim in dimensions},
+    })
+    return frame.groupby(['window_start', *dimensions], observed=True, sort=False).agg(
+        count=('timestamp', 'size'),
+        latency_count=('latency_ms', 'count'),
+        latency_sum=('latency_ms', 'sum'),
+        latency_min=('latency_ms', 'min'),
+        latency_max=('latency_ms', 'max'),
+        error_count=('is_error', 'sum'),
+        first_seen=('timestamp', 'min'),
+        last_seen=('timestamp', 'max'),
+    )
+
+def merge_partials(partials: pd.DataFrame, by: list) -> pd.DataFrame:
+    """Merges partial rows that share the `by` index levels."""
+    return partials.groupby(level=by, observed=True, sort=False).agg(MERGE_RULES)
+
+def _select_windows(frame: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """Returns the rows of a window-indexed frame with start <= window_start < end."""
+    windows = frame.index.get_level_values('window_start')
+    mask = np.ones(len(frame), dtype=bool)
+    if start is not None:
+        mask &= windows >= pd.Timestamp(start)
+    if end is not None:
+        mask &= windows < pd.Timestamp(end)
+    return frame[mask]
+
+class RollupEngine:
+    """
+    Keeps partial aggregates and long-form latency sketches per resolution and folds
+    new request batches into them.
+
+    Each resolution holds one (partials, sketches) pair per window, so a batch costs
+    time proportional to its own size and the windows it touches, not to the history.
+    The frames over all windows are concatenated on the first read after an update.
+
+    Partials and sketches are kept per all `dimensions` together. Each of
+    `sketch_dimensions` (e.g. api_name) also gets latency sketches of its own, so
+    percentiles per that dimension are merged from sketches too.
+    """
+
+    def __init__(self, dimensions: list, resolutions: list = None, sketch_dimensions: list = ()):
+        self.dimensions = list(dimensions)
+        self.resolutions = list(resolutions or RESOLUTIONS)
+        self.sketch_dimensions = list(sketch_dimensions)
+        # Index levels (after window_start) of every kept sketch frame; the first one is the main frame
+        self._sketch_keys = [tuple(self.dimensions), *((dim,) for dim in self.sketch_dimensions)]
+        self._windows = {res: {} for res in self.resolutions}  # window_start -> (partials, {key: sketches})
+        self._combined = {}  # resolution -> (partials, {key: sketches}) over all windows
+
+    @property
+    def partials(self) -> dict:
+        """Partials over all windows per resolution, sorted by index (None before the first batch)."""
+        return {res: self._combine(res)[0] for res in self.resolutions}
+
+    @property
+    def sketches(self) -> dict:
+        """Long-form sketch counts per all dimensions, over all windows per resolution (None before the first batch)."""
+        return {res: self._combine(res)[1][self._sketch_keys[0]] for res in self.resolutions}
+
+    def _combine(self, res: str) -> tuple:
+        if res not in self._combined:
+            self._combined[res] = self._concat(res, sorted(self._windows[res]))
+        return self._combined[res]
+
+    def _concat(self, res: str, windows: list) -> tuple:
+        if not windows:
+            return None, dict.fromkeys(self._sketch_keys)
+        entries = [self._windows[res][window] for window in windows]
+        return (pd.concat([partials for partials, _ in entries]),
+                {key: pd.concat([sketches[key] for _, sketches in entries]) for key in self._sketch_keys})
+
+    def _store(self, res: str, partials: pd.DataFrame, sketches: dict):
+        """Replaces the entries of the windows in `partials` with its rows, split per window."""
+        split = {key: dict(list(counts.sort_index().groupby(level='window_start', sort=False)))
+                 for key, counts in sketches.items()}
+        for window, rows in partials.sort_index().groupby(level='window_start', sort=False):
+            self._windows[res][window] = (rows, {key: split[key].get(window, sketches[key].iloc[:0])
+                                                 for key in self._sketch_keys})
+        self._combined.pop(res, None)
+
+    def update(self, requests: pd.DataFrame) -> dict:
+        """
+        Folds a batch of normalised requests into every resolution.
+        Returns the window starts touched per resolution.
+        """
+        requests = requests.dropna(subset=['timestamp'])
+        keys = ['window_start', *self.dimensions]
+        touched = {}
+        for res in self.resolutions:
+            freq = RESOLUTIONS[res]
+            window_start = requests['timestamp'].dt.floor(freq)
+            batch = _partials(requests, freq, self.dimensions)
+            batch_sketches = {key: sketch_counts(requests[list(key)].assign(window_start=window_start)[['window_start', *key]],
+                                                 requests['latency_ms'])
+                              for key in self._sketch_keys}
+            windows = batch.index.unique(level='window_start')
+            known = [window for window in windows if window in self._windows[res]]
+            if known:
+                # Only the windows that already hold rows are re-merged with the batch
+                entries = [self._windows[res][window] for window in known]
+                batch = merge_partials(pd.concat([*(partials for partials, _ in entries), batch]), keys)
+                batch_sketches = {key: merge_sketches(pd.concat([*(sketches[key] for _, sketches in entries), counts]),
+                                                      ['window_start', *key])
+                                  for key, counts in batch_sketches.items()}
+            self._store(res, batch, batch_sketches)
+            touched[res] = windows
+        return touched
+
+    def drop_before(self, cutoff):
+        """Forgets every window that starts before `cutoff`."""
+        cutoff = pd.Timestamp(cutoff)
+        for res in self.resolutions:
+            old = [window for window in self._windows[res] if window < cutoff]
+            for window in old:
+                del self._windows[res][window]
+            if old:
+                self._combined.pop(res, None)
+
+    def _range(self, res: str, start=None, end=None) -> list:
+        """Window starts of a resolution with start <= window_start < end, in order."""
+        windows = sorted(self._windows[res])
+        lo = 0 if start is None else bisect.bisect_left(windows, pd.Timestamp(start))
+        hi = len(windows) if end is None else bisect.bisect_left(windows, pd.Timestamp(end))
+        return windows[lo:hi]
+
+    def window_partials(self, resolution: str, start=None, end=None) -> pd.DataFrame:
+        """Returns the partial rows of a resolution with start <= window_start < end."""
+        if start is None and end is None:
+            partials = self._combine(resolution)[0]
+        else:
+            partials = self._concat(resolution, self._range(resolution, start, end))[0]
+        return pd.DataFrame(columns=list(MERGE_RULES)) if partials is None else partials
+
+    def _sketch_key(self, by: list) -> tuple:
+        """The kept sketch frame that can be merged into quantiles per `by`."""
+        if set(by) <= set(self.dimensions):
+            return self._sketch_keys[0]
+        if tuple(by) in self._sketch_keys:
+            return tuple(by)
+        kept = ', '.join(['+'.join(self.dimensions), *self.sketch_dimensions])
+        raise ValueError(f"Latency sketches are kept per {kept}, not per {'+'.join(by)}; "
+                         f"compute these percentiles from raw requests or a RemoteTable")
+
+    def window_sketches(self, resolution: str, start=None, end=None, by: list = None) -> pd.Series:
+        """
+        Returns the long-form sketch counts of a resolution with start <= window_start < end,
+        from the sketches per all dimensions or, with `by`, the ones that cover those columns.
+        """
+        key = self._sketch_key(by) if by else self._sketch_keys[0]
+        if start is None and end is None:
+            sketches = self._combine(resolution)[1][key]
+        else:
+            sketches = self._concat(resolution, self._range(resolution, start, end))[1][key]
+        return pd.Series(dtype='int64', name='count') if sketches is None else sketches
+
+    def percentiles(self, by: list, quantiles=DEFAULT_QUANTILES, resolution: str = '1h', start=None, end=None) -> pd.DataFrame:
+        """Latency quantiles per `by` key over a time range, merged from per-window sketches."""
+        return sketch_quantiles(self.window_sketches(resolution, start, end, by), list(by), quantiles)
+
+    def save(self, directory: str):
+        """Persists the partials and sketches of every resolution as Parquet files."""
+        os.makedirs(directory, exist_ok=True)
+        for res in self.resolutions:
+            partials, sketches = self._combine(res)
+            if partials is not None:
+                # Partials are sorted by window, so small row groups let windowed reads skip most of the file
+                partials.to_parquet(os.path.join(directory, f"rollup_{res}.parquet"),
+                                    row_group_size=ROLLUP_ROW_GROUP_ROWS)
+                for key in self._sketch_keys:
+                    sketches[key].to_frame().to_parquet(self._sketch_path(directory, res, key),
+                                                        row_group_size=ROLLUP_ROW_GROUP_ROWS)
+
+    def _sketch_path(self, directory: str, res: str, key: tuple) -> str:
+        # The sketches per all dimensions keep their original name; the others are named after their dimension
+        suffix = '' if key == self._sketch_keys[0] else f"_{key[0]}"
+        return os.path.join(directory, f"sketch_{res}{suffix}.parquet")
+
+    @classmethod
+    def load(cls, directory: str, dimensions: list, resolutions: list = None, sketch_dimensions: list = ()):
+        """Restores an engine saved with save(); missing resolutions start empty."""
+        engine = cls(dimensions, resolutions, sketch_dimensions)
+        for res in engine.resolutions:
+            path = os.path.join(directory, f"rollup_{res}.parquet")
+            if os.path.exists(path):
+                engine._store(res, pd.read_parquet(path),
+                              {key: pd.read_parquet(engine._sketch_path(directory, res, key))['count']
+                               for key in engine._sketch_keys})
+        return engine
+
+def _finalise(merged: pd.DataFrame) -> pd.DataFrame:
+    """Derives request_count, avg_latency and error_rate_pct from merged partials."""
+    return pd.DataFrame({
+        'request_count': merged['count'],
+        'avg_latency': merged['latency_sum'] / merged['latency_count'].where(merged['latency_count'] > 0),
+        'min_latency': merged['latency_min'],
+        'max_latency': merged['latency_max'],
+        'error_rate_pct': 100 * merged['error_count'] / merged['count'],
+    }, index=merged.index)
+
+def _latency_percentiles(sketches: pd.Series, by: list) -> pd.DataFrame:
+    """Per-key latency percentile columns (p50_latency, p90_latency, ...) from sketches."""
+    percentiles = sketch_quantiles(sketches, by, DEFAULT_QUANTILES)
+    return percentiles.rename(columns=lambda label: f"{label}_latency")
+
+def consumer_behavior_report(partials: pd.DataFrame, sketches: pd.Series) -> pd.DataFrame:
+    """Per-client report from partials with client_id and uri_path dimensions."""
+    merged = merge_partials(partials, ['client_id'])
+    report = _finalise(merged).join(_latency_percentiles(sketches, ['client_id']))
+    report['api_diversity'] = partials.index.to_frame(index=False).groupby('client_id', observed=True)['uri_path'].nunique()
+    report['first_seen'] = merged['first_seen']
+    report['last_seen'] = merged['last_seen']
+    return report.reset_index()
+
+def resource_optimization_report(partials: pd.DataFrame, sketches: pd.Series) -> pd.DataFrame:
+    """Per-endpoint load and efficiency report."""
+    report = _finalise(merge_partials(partials, ['uri_path'])).join(_latency_percentiles(sketches, ['uri_path']))
+    # Utilization is the endpoint's load tercile; efficiency rewards low errors and latency under target
+    load_rank = report['request_count'].rank(pct=True, method='average')
+    report['utilization'] = pd.cut(load_rank, [0, 1 / 3, 2 / 3, 1], labels=['Low', 'Medium', 'High']).astype(str)
+    latency_factor = (LATENCY_TARGET_MS / report['avg_latency']).clip(upper=1).fillna(1)
+    report['efficiency_score'] = (100 - report['error_rate_pct']) * latency_factor
+    return report.reset_index()
+
+def maintenance_priority(scores: pd.Series) -> pd.Series:
+    """Buckets prediction scores into the Low/Medium/High maintenance priorities."""
+    return pd.cut(scores, [-np.inf, 0.4, 0.7, np.inf], labels=['Low', 'Medium', 'High']).astype(str)
+
+def predictive_maintenance_report(partials: pd.DataFrame, sketches: pd.Series) -> pd.DataFrame:
+    """Per-endpoint error-rate history and maintenance priority."""
+    per_window = _finalise(merge_partials(partials, ['window_start', 'uri_path'])).reset_index()
+    overall = _finalise(merge_partials(partials, ['uri_path']))
+    report = pd.DataFrame({
+        'request_count': overall['request_count'],
+        'avg_error_rate': overall['error_rate_pct'],
+        'max_error_rate': per_window.groupby('uri_path', observed=True)['error_rate_pct'].max(),
+        'avg_latency': overall['avg_latency'],
+    })
+    # Score blends the worst window error rate with how far the latest window's latency exceeds the average
+    latest = per_window.sort_values('window_start').groupby('uri_path', observed=True).last()
+    latency_trend = (latest['avg_latency'] / report['avg_latency'] - 1).clip(0, 1).fillna(0)
+    report['prediction_score'] = 0.5 * report['max_error_rate'] / 100 + 0.5 * latency_trend
+    report['maintenance_priority'] = maintenance_priority(report['prediction_score'])
+    return report.reset_index()
+
+REPORT_BUILDERS = {
+    'consumer_behavior': consumer_behavior_report,
+    'resource_optimization': resource_optimization_report,
+    'predictive_maintenance_report': predictive_maintenance_report,
+}
+
+def build_reports(engine: RollupEngine, resolution: str = '1h', start=None, end=None) -> dict:
+    """Builds all three report tables from the engine's partials over a time range."""
+    partials = engine.window_partials(resolution, start, end)
+    sketches = engine.window_sketches(resolution, start, end)
+    return {table: builder(partials, sketches) for table, builder in REPORT_BUILDERS.items()}
+
+def main(argv=None):
+    from src.anomaly import AnomalyEngine
+    from src.upload_to_supabase import read_jsonl_chunks, parse_requests
+
+    parser = argparse.ArgumentParser(description="Roll raw JSONL request logs up into the report tables.")
+    parser.add_argument('paths', nargs='+', help="JSONL request log files")
+    parser.add_argument('--resolution', choices=list(RESOLUTIONS), default='1h',
+                        help="Window size used for per-window report metrics")
+    parser.add_argument('--out', default=LOCAL_STORE_DIR, help="Directory for rollups and report Parquet files")
+    args = parser.parse_args(argv)
+
+    # Reports go to their own subdirectory: the top level holds the tables synced by src/sync.py
+    rollup_dir = os.path.join(args.out, 'rollups')
+    report_dir = os.path.join(args.out, 'reports')
+    engine = RollupEngine.load(rollup_dir, ['client_id', 'uri_path'], sketch_dimensions=['api_name', 'app_name'])
+    anomalies = AnomalyEngine.load(rollup_dir)
+    for path in args.paths:
+        for records, _, _ in read_jsonl_chunks(path):
+            if not records:
+                continue
+            requests = parse_requests(records)
+            engine.update(requests)
+            anomalies.update(requests)
+    engine.save(rollup_dir)
+    anomalies.save(rollup_dir)
+
+    reports = build_reports(engine, args.resolution)
+    # Maintenance scores come from the streaming anomaly baselines rather than this run's range
+    reports['predictive_maintenance_report'] = anomalies.report()
+    os.makedirs(report_dir, exist_ok=True)
+    for table, report in reports.items():
+        report.to_parquet(os.path.join(report_dir, f"{table}.parquet"), index=False)
+        print(f"{table}: {len(report)} rows")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Mergeable latency quantile sketches (DDSketch-style).
+
+Latencies are counted in logarithmic buckets whose width guarantees a relative
+error of at most RELATIVE_ACCURACY for any quantile. A sketch is just a sparse
+histogram of bucket -> count, so merging sketches is a sum of counts. Sketches
+for many keys and windows are kept in long form (a count Series indexed by
+(..., bucket)) so merges and quantile lookups stay vectorised.
+"""
+import numpy as np
+import pandas as pd
+
+RELATIVE_ACCURACY = 0.01
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = np.log(_GAMMA)
+# Latencies below this (in ms) share the lowest bucket
+MIN_VALUE = 1e-3
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+def bucket_index(values) -> np.ndarray:
+    """Maps values to their logarithmic bucket indexes."""
+    values = np.maximum(np.asarray(values, dtype=float), MIN_VALUE)
+    return np.ceil(np.log(values) / _LOG_GAMMA).astype(np.int32)
+
+def bucket_value(index) -> np.ndarray:
+    """Returns the representative value of each bucket (within RELATIVE_ACCURACY of any member)."""
+    return 2 * _GAMMA ** np.asarray(index, dtype=float) / (_GAMMA + 1)
+
+def quantile_label(q: float) -> str:
+    """Formats a quantile as a column label, e.g. 0.999 -> 'p99.9'."""
+    return f"p{q * 100:g}"
+
+def sketch_counts(keys: pd.DataFrame, latencies: pd.Series) -> pd.Series:
+    """Builds long-form sketches: request counts indexed by (*keys.columns, bucket)."""
+    valid = latencies.notna().to_numpy()
+    frame = keys[valid].assign(bucket=bucket_index(latencies[valid]))
+    return frame.groupby(list(frame.columns), observed=True, sort=False).size().rename('count')
+
+def merge_sketches(counts: pd.Series, by: list) -> pd.Series:
+    """Merges long-form sketches that share the `by` index levels."""
+    return counts.groupby(level=[*by, 'bucket'], observed=True, sort=False).sum()
+
+def sketch_quantiles(counts: pd.Series, by: list, quantiles=DEFAULT_QUANTILES) -> pd.DataFrame:
+    """Returns one column per quantile for every key of merged long-form sketches."""
+    frame = merge_sketches(counts, by).reset_index().sort_values([*by, 'bucket'])
+    grouped = frame.groupby(by, observed=True, sort=False)['count']
+    cumulative = grouped.cumsum().to_numpy()
+    total = grouped.transform('sum').to_numpy()
+    result = {}
+    for q in quantiles:
+        # Like DDSketch: the first bucket whose cumulative count passes rank q * (n - 1)
+        reached = frame[cumulative > q * (total - 1)]
+        first = reached.groupby(by, observed=True, sort=False)['bucket'].first()
+        result[quantile_label(q)] = pd.Series(bucket_value(first.to_numpy()), index=first.index)
+    return pd.DataFrame(result)
+
+class DDSketch:
+    """A single mergeable sketch for streaming use."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+
+    def add(self, values):
+        """Adds one value or an array of values."""
+        indexes, counts = np.unique(bucket_index(np.atleast_1d(values)), return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += int(counts.sum())
+
+    def merge(self, other: "DDSketch"):
+        """Folds another sketch into this one."""
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """Returns the approximate q-quantile, or NaN for an empty sketch."""
+        if not self.count:
+            return float('nan')
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return float(bucket_value(index))
+        return float(bucket_value(max(self.buckets)))
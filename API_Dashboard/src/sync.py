@@ -0,0 +1,116 @@
+"""
+Incremental sync of the Supabase report tables into a local Parquet store.
+
+Each sync fetches only rows whose cursor column (SYNC_CURSORS) is at or past the
+table's stored high-water mark and upserts them by the table key (TABLE_KEYS).
+Run it standalone, e.g. from cron:
+
+    python -m src.sync                      # all tables
+    python -m src.sync --table consumer_behavior --full
+"""
+import argparse
+import json
+import os
+import time
+import pandas as pd
+from supabase import create_client, Client
+from src.config import SUPABASE_URL, SUPABASE_KEY, PAGE_SIZE, TABLE_NAMES, TABLE_KEYS, SYNC_CURSORS, LOCAL_STORE_DIR
+from src.data_loader import apply_types, decode_csv, compact_types, local_table_path, stream_table
+
+def _state_path(table_name: str) -> str:
+    return os.path.join(LOCAL_STORE_DIR, f"{table_name}.state.json")
+
+def load_state(table_name: str) -> dict:
+    """Returns the sync state (high-water mark, last sync time) for a table."""
+    try:
+        with open(_state_path(table_name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _save_state(table_name: str, state: dict):
+    tmp_path = _state_path(table_name) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, _state_path(table_name))
+
+def _fetch_delta(supabase: Client, table_name: str, cursor: str, key: str, high_water_mark):
+    """Yields decoded pages of rows with cursor >= high_water_mark, ordered by (cursor, key)."""
+    start = 0
+    while True:
+        query = supabase.from_(table_name).select("*").order(cursor).order(key)
+        if high_water_mark is not None:
+            query = query.gte(cursor, high_water_mark)
+        page = decode_csv(query.range(start, start + PAGE_SIZE - 1).csv().execute().data, table_name)
+        if page.empty:
+            return
+        yield page
+        if len(page) < PAGE_SIZE:
+            return
+        start += PAGE_SIZE
+
+def _to_json(value):
+    """Converts a cursor value from a typed frame back into a PostgREST filter value."""
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value.item() if hasattr(value, "item") else value
+
+def sync_table(supabase: Client, table_display_name: str, full: bool = False) -> int:
+    """
+    Brings the local copy of a table up to date and returns the number of rows fetched.
+    full=True ignores the stored high-water mark and rebuilds the copy.
+    """
+    os.makedirs(LOCAL_STORE_DIR, exist_ok=True)
+    table_name = TABLE_NAMES[table_display_name]
+    cursor = SYNC_CURSORS[table_name]
+    key = TABLE_KEYS[table_name]
+    path = local_table_path(table_name)
+    state = {} if full else load_state(table_name)
+    high_water_mark = state.get("high_water_mark") if os.path.exists(path) else None
+
+    if high_water_mark is None:
+        # First sync: stream the whole table with the concurrent loader
+        chunks = list(stream_table(table_display_name, supabase=supabase))
+    else:
+        chunks = [apply_types(page, table_display_name)
+                  for page in _fetch_delta(supabase, table_name, cursor, key, high_water_mark)]
+    fetched = sum(len(chunk) for chunk in chunks)
+
+    if chunks:
+        delta = pd.concat(chunks, ignore_index=True)
+        if high_water_mark is not None:
+            # Upsert: changed rows replace their previous version
+            merged = pd.concat([pd.read_parquet(path), delta], ignore_index=True)
+            merged = merged.drop_duplicates(subset=key, keep="last").reset_index(drop=True)
+        else:
+            merged = delta
+        merged = compact_types(merged, table_name)
+        tmp_path = path + ".tmp"
+        merged.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        state["high_water_mark"] = _to_json(merged[cursor].max())
+
+    state["synced_at"] = time.time()
+    _save_state(table_name, state)
+    return fetched
+
+def sync_all(supabase: Client, full: bool = False) -> dict:
+    """Syncs every table in TABLE_NAMES, returning rows fetched per table."""
+    return {name: sync_table(supabase, name, full=full) for name in TABLE_NAMES}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync Supabase report tables into the local Parquet store.")
+    parser.add_argument("--table", action="append", choices=list(TABLE_NAMES.values()),
+                        help="Table to sync (repeatable). Defaults to all tables.")
+    parser.add_argument("--full", action="store_true", help="Ignore the high-water mark and re-download everything.")
+    args = parser.parse_args(argv)
+
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    display_names = {table: name for name, table in TABLE_NAMES.items()}
+    for table_name in args.table or TABLE_NAMES.values():
+        started = time.perf_counter()
+        fetched = sync_table(supabase, display_names[table_name], full=args.full)
+        print(f"{table_name}: {fetched} rows fetched in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Time-series queries over request logs for the dashboard's time-series mode.
+
+Series are read from pre-aggregated sources only: the rollup Parquet files written
+by src/rollups.py (only the row groups inside the requested window are read), or,
+when there are no local rollups, the dashboard_aggregate RPC restricted to the
+window. The resolution is picked so a window never yields more than
+TIME_SERIES_MAX_POINTS buckets, so 30 days are shown hourly and zooming into a day
+or less switches to 1-minute buckets.
+"""
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.config import CACHE_DEFAULT_TTL, LOCAL_STORE_DIR, TIME_SERIES_MAX_POINTS
+from src.query_builder import AggregateQuery, RemoteTable
+from src.rollups import RESOLUTIONS, merge_partials
+from src.sketches import quantile_label, sketch_quantiles
+
+ROLLUP_DIR = os.path.join(LOCAL_STORE_DIR, 'rollups')
+
+# Metric label -> (metric, quantile); latency percentile metrics carry their quantile
+TIME_SERIES_METRICS = {
+    'Requests/sec': ('requests_per_sec', None),
+    'Error rate (%)': ('error_rate_pct', None),
+    'Average latency (ms)': ('avg_latency', None),
+    'p50 latency (ms)': ('latency_quantile', 0.5),
+    'p90 latency (ms)': ('latency_quantile', 0.9),
+    'p99 latency (ms)': ('latency_quantile', 0.99),
+}
+
+def to_utc(timestamp) -> pd.Timestamp:
+    """Rollup windows are stored in UTC; naive timestamps are taken to be UTC."""
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+def resolution_step(resolution: str) -> pd.Timedelta:
+    return pd.Timedelta(RESOLUTIONS[resolution])
+
+def pick_resolution(start, end, max_points: int = TIME_SERIES_MAX_POINTS, available=None) -> str:
+    """The finest available resolution that splits [start, end) into at most max_points buckets."""
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    candidates = sorted(available or RESOLUTIONS, key=resolution_step)
+    for resolution in candidates:
+        if span / resolution_step(resolution) <= max_points:
+            return resolution
+    return candidates[-1]
+
+class RollupSeries:
+    """Series merged from the rollup Parquet files in a directory."""
+
+    def __init__(self, directory: str = ROLLUP_DIR):
+        self.directory = directory
+
+    def _path(self, kind: str, resolution: str) -> str:
+        return os.path.join(self.directory, f"{kind}_{resolution}.parquet")
+
+    def resolutions(self) -> list:
+        return [res for res in RESOLUTIONS if os.path.exists(self._path('rollup', res))]
+
+    def version(self) -> tuple:
+        """Modification times of the rollup files, to key cached series on."""
+        return tuple(os.path.getmtime(self._path('rollup', res)) for res in self.resolutions())
+
+    def extent(self):
+        """First and last window start covered, read from the coarsest resolution."""
+        resolution = max(self.resolutions(), key=resolution_step)
+        windows = pd.read_parquet(self._path('rollup', resolution), columns=['count']).index.get_level_values('window_start')
+        return windows.min(), windows.max() + resolution_step(resolution)
+
+    def _read(self, kind: str, resolution: str, start, end, columns=None):
+        filters = [('window_start', '>=', to_utc(start)), ('window_start', '<', to_utc(end))]
+        return pd.read_parquet(self._path(kind, resolution), columns=columns, filters=filters)
+
+    def top_keys(self, by: str, start, end, n: int) -> list:
+        resolution = max(self.resolutions(), key=resolution_step)
+        counts = self._read('rollup', resolution, start, end, ['count'])['count']
+        return counts.groupby(level=by, observed=True).sum().nlargest(n).index.tolist()
+
+    def series(self, metric: str, quantile: float, resolution: str, start, end, by: str = None, keys=None) -> pd.DataFrame:
+        """One column per key of `by` (or a single column), indexed by window start."""
+        levels = ['window_start', by] if by else ['window_start']
+        if metric == 'latency_quantile':
+            sketches = self._read('sketch', resolution, start, end)['count']
+            if keys is not None:
+                sketches = sketches[sketches.index.get_level_values(by).isin(keys)]
+            values = sketch_quantiles(sketches, levels, [quantile])[quantile_label(quantile)]
+        else:
+            partials = self._read('rollup', resolution, start, end)
+            if keys is not None:
+                partials = partials[partials.index.get_level_values(by).isin(keys)]
+            merged = merge_partials(partials, levels)
+            if metric == 'requests_per_sec':
+                values = merged['count'] / resolution_step(resolution).total_seconds()
+            elif metric == 'error_rate_pct':
+                values = 100 * merged['error_count'] / merged['count']
+            else:
+                values = merged['latency_sum'] / merged['latency_count'].where(merged['latency_count'] > 0)
+        return _wide(values, by, metric)
+
+class RemoteSeries:
+    """Series aggregated in Postgres over the raw request log, one date_bin bucket per point."""
+
+    def __init__(self, table: RemoteTable = None):
+        self.table = table or RemoteTable()
+
+    def resolutions(self) -> list:
+        return list(RESOLUTIONS)
+
+    def version(self) -> tuple:
+        # Remote data changes continuously; cached series expire with the table cache TTL
+        return (self.table.table_name, int(time.time() // CACHE_DEFAULT_TTL))
+
+    def extent(self):
+        first, last = self.table.time_bounds()
+        if first is None:
+            raise ValueError(f"{self.table.table_name} has no requests")
+        return first.floor('1min'), last.floor('1min') + pd.Timedelta('1min')
+
+    def top_keys(self, by: str, start, end, n: int) -> list:
+        return self.table.aggregate('count', group_by=by, limit=n, start=start, end=end).index.tolist()
+
+    def series(self, metric: str, quantile: float, resolution: str, start, end, by: str = None, keys=None) -> pd.DataFrame:
+        func, column = {
+            'requests_per_sec': ('count', None),
+            'error_rate_pct': ('error_rate', 'status_code_cleaned'),
+            'avg_latency': ('avg', 'latency_ms'),
+            'latency_quantile': ('percentile_cont', 'latency_ms'),
+        }[metric]
+        # Only the selected keys are aggregated, so the rows returned are bounded by buckets x keys
+        rows = self.table.run(AggregateQuery(self.table.table_name, func, column, by, RESOLUTIONS[resolution],
+                                             order='key_asc', quantile=quantile, start=start, end=end,
+                                             keys=None if keys is None else tuple(keys)))
+        buckets = pd.DatetimeIndex(pd.to_datetime(rows['bucket']), name='window_start')
+        index = pd.MultiIndex.from_arrays([buckets, rows['key']], names=['window_start', by]) if by else buckets
+        values = pd.Series(rows['value'].to_numpy(dtype=float), index=index)
+        if metric == 'requests_per_sec':
+            values = values / resolution_step(resolution).total_seconds()
+        return _wide(values, by, metric)
+
+def _wide(values: pd.Series, by: str, name: str) -> pd.DataFrame:
+    return values.unstack(by).sort_index() if by else values.sort_index().to_frame(name)
+
+def default_source():
+    """Local rollups when they exist, otherwise aggregation pushdown on the request log."""
+    rollups = RollupSeries()
+    return rollups if rollups.resolutions() else RemoteSeries()
+
+def time_series(source, label: str, start, end, by: str = None, keys=None, resolution: str = None):
+    """
+    Returns (frame, resolution) for a TIME_SERIES_METRICS label over [start, end),
+    picking the resolution automatically unless one is given.
+    """
+    metric, quantile = TIME_SERIES_METRICS[label]
+    resolution = resolution or pick_resolution(start, end, available=source.resolutions())
+    frame = source.series(metric, quantile, resolution, start, end, by, keys)
+    return frame.replace([np.inf, -np.inf], np.nan), resolution
@@ -0,0 +1,240 @@
+"""
+Per-stage timing of the dashboard pipeline.
+
+Code marks a stage with `with span("decode") as s:` (or `@traced("decode")`) and
+may set `s.rows` and `s.bytes` inside the block. Every finished span is folded into
+a process-wide histogram per stage name: call count, errors, a latency histogram
+with fixed buckets, rows and bytes processed, and the change in resident memory
+across the span. Resident memory is per process, so spans running at the same time
+on other threads contribute to each other's deltas.
+
+The histograms are shown in the dashboard's Performance panel and exported in the
+Prometheus text format, to TRACING_METRICS_FILE (for a node-exporter textfile
+collector) and on http://TRACING_METRICS_HOST:TRACING_METRICS_PORT/metrics. Memory
+deltas can be negative, so they are exported as a gauge. With TRACING_ENABLED
+off, span() returns one shared no-op object and nothing is measured or recorded.
+"""
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from src.config import TRACING_ENABLED, TRACING_METRICS_FILE, TRACING_METRICS_HOST, TRACING_METRICS_PORT
+
+# Upper bounds (seconds) of the latency histogram buckets; a final +Inf bucket is implied
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = 'dashboard_stage'
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def _rss_bytes() -> int:
+    """Resident set size of this process, or 0 where /proc is not available."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+class _Stage:
+    """Aggregated measurements of one stage name."""
+
+    __slots__ = ('count', 'errors', 'seconds', 'buckets', 'rows', 'bytes', 'memory_delta', 'max_memory_delta', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.rows = 0
+        self.bytes = 0
+        self.memory_delta = 0
+        self.max_memory_delta = 0
+        self.last = 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimates a latency quantile by interpolating within its bucket, like histogram_quantile()."""
+        rank = q * self.count
+        cumulative = np.cumsum(self.buckets)
+        index = int(np.searchsorted(cumulative, rank))
+        if index >= len(LATENCY_BUCKETS):
+            return LATENCY_BUCKETS[-1]
+        lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+        below = cumulative[index - 1] if index else 0
+        inside = self.buckets[index]
+        return lower + (LATENCY_BUCKETS[index] - lower) * ((rank - below) / inside if inside else 0.0)
+
+_stages = {}
+_stages_lock = threading.Lock()
+_enabled = TRACING_ENABLED
+
+def _record(name: str, seconds: float, rows, nbytes, memory_delta: int, failed: bool):
+    with _stages_lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = _Stage()
+        stage.count += 1
+        stage.errors += failed
+        stage.seconds += seconds
+        stage.buckets[_bucket(seconds)] += 1
+        stage.rows += rows or 0
+        stage.bytes += nbytes or 0
+        stage.memory_delta += memory_delta
+        stage.max_memory_delta = max(stage.max_memory_delta, memory_delta)
+        stage.last = seconds
+
+def _bucket(seconds: float) -> int:
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            return index
+    return len(LATENCY_BUCKETS)
+
+class Span:
+    """One timed run of a stage; set `rows` and `bytes` while it is open."""
+
+    __slots__ = ('name', 'rows', 'bytes', '_started', '_rss')
+
+    def __init__(self, name: str, rows: int = None, bytes: int = None):
+        self.name = name
+        self.rows = rows
+        self.bytes = bytes
+
+    def __enter__(self):
+        self._rss = _rss_bytes()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._started
+        _record(self.name, seconds, self.rows, self.bytes, _rss_bytes() - self._rss, exc_type is not None)
+        return False
+
+class _NoSpan:
+    """Stands in for every span while tracing is off; attribute writes are discarded."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+_NO_SPAN = _NoSpan()
+
+def span(name: str, rows: int = None, bytes: int = None):
+    """Returns a context manager that times one run of the named stage."""
+    return Span(name, rows, bytes) if _enabled else _NO_SPAN
+
+def traced(name: str):
+    """Decorator form of span(); rows are taken from a returned DataFrame's length."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name) as s:
+                result = fn(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    s.rows = len(result)
+                return result
+        return wrapper
+    return decorate
+
+def set_enabled(enabled: bool):
+    """Switches tracing on or off for the whole process."""
+    global _enabled
+    _enabled = enabled
+
+def is_enabled() -> bool:
+    return _enabled
+
+def reset():
+    """Drops everything recorded so far."""
+    with _stages_lock:
+        _stages.clear()
+
+def snapshot() -> pd.DataFrame:
+    """One row per stage with call counts, latency percentiles, totals and memory deltas."""
+    with _stages_lock:
+        rows = [{'stage': name, 'calls': s.count, 'errors': s.errors, 'total_s': s.seconds,
+                 'mean_ms': s.seconds / s.count * 1000, 'p50_ms': s.quantile(0.5) * 1000,
+                 'p95_ms': s.quantile(0.95) * 1000, 'last_ms': s.last * 1000, 'rows': s.rows,
+                 'mb': s.bytes / 1024 ** 2, 'memory_delta_mb': s.memory_delta / 1024 ** 2,
+                 'max_memory_delta_mb': s.max_memory_delta / 1024 ** 2}
+                for name, s in _stages.items()]
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).set_index('stage').sort_values('total_s', ascending=False)
+
+def prometheus_text() -> str:
+    """The stage histograms in the Prometheus text exposition format."""
+    with _stages_lock:
+        stages = [(name, s.count, s.errors, s.seconds, list(s.buckets), s.rows, s.bytes, s.memory_delta)
+                  for name, s in sorted(_stages.items())]
+    lines = [f"# HELP {METRIC_PREFIX}_seconds Time spent in each dashboard pipeline stage.",
+             f"# TYPE {METRIC_PREFIX}_seconds histogram"]
+    for name, count, _, seconds, buckets, _, _, _ in stages:
+        cumulative = 0
+        for bound, observed in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+            cumulative += observed
+            lines.append(f'{METRIC_PREFIX}_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'{METRIC_PREFIX}_seconds_sum{{stage="{name}"}} {seconds:.6f}')
+        lines.append(f'{METRIC_PREFIX}_seconds_count{{stage="{name}"}} {count}')
+    # Resident memory can shrink during a stage, so its summed delta is a gauge rather than a counter
+    metrics = [('errors_total', "Stage runs that raised an exception.", 2, 'counter'),
+               ('rows_total', "Rows processed by each stage.", 5, 'counter'),
+               ('bytes_total', "Bytes transferred or decoded by each stage.", 6, 'counter'),
+               ('memory_delta_bytes', "Sum of resident memory changes across stage runs.", 7, 'gauge')]
+    for metric, help_text, field, kind in metrics:
+        lines += [f"# HELP {METRIC_PREFIX}_{metric} {help_text}", f"# TYPE {METRIC_PREFIX}_{metric} {kind}"]
+        lines += [f'{METRIC_PREFIX}_{metric}{{stage="{stage[0]}"}} {stage[field]}' for stage in stages]
+    return "\n".join(lines) + "\n"
+
+def write_metrics(path: str):
+    """Writes prometheus_text() to a file, replacing it atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(temporary, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def serve_metrics(port: int, host: str = TRACING_METRICS_HOST) -> ThreadingHTTPServer:
+    """Starts the /metrics endpoint in a background thread, once per process."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
+
+def export():
+    """Publishes the metrics where configured: the metrics file and the /metrics endpoint."""
+    if not _enabled:
+        return
+    if TRACING_METRICS_PORT:
+        serve_metrics(TRACING_METRICS_PORT)
+    if TRACING_METRICS_FILE:
+        write_metrics(TRACING_METRICS_FILE)
@@ -1,4 +1,205 @@
-# Supabase Configuration
+"""
+Streaming ingestion of JSONL request logs into the Supabase request log table.
+
+The file is read in bounded-size chunks, each chunk is normalised with pandas and
+inserted as one batch. Batches are inserted concurrently with retries, and at most
+`workers * 2` batches are held in memory (reading pauses until an insert finishes).
+The byte offset after the last fully inserted batch is checkpointed, together with
+the byte ranges of later batches that were inserted out of order, so an interrupted
+backfill can resume without inserting any batch twice:
+
+    python -m src.upload_to_supabase logs/2024-05-01.jsonl --resume
+"""
+from __future__ import annotations
+import argparse
+import json
 import os
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
\ No newline at end of file
+import random
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+import pandas as pd
+from src.config import SUPABASE_URL, SUPABASE_KEY, REQUEST_LOG_TABLE, INGEST_BATCH_ROWS, INGEST_WORKERS
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+REQUEST_LOG_COLUMNS = ['timestamp', 'api_name', 'app_name', 'api_version', 'uri_path',
+                       'client_id', 'status_code_cleaned', 'latency_ms']
+
+def read_jsonl_chunks(path: str, chunk_rows: int = INGEST_BATCH_ROWS, start_offset: int = 0, skip=()):
+    """
+    Yields (records, end_offset, skipped) for consecutive chunks of a JSONL file starting
+    at a byte offset. Blank lines are ignored; malformed lines and lines that are not
+    JSON objects are dropped and counted in `skipped`. Lines starting inside one of the
+    [start, end) byte ranges in `skip` are passed over; a last chunk without records
+    moves end_offset past them.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start_offset)
+        position = yielded = start_offset
+        records, skipped = [], 0
+        for line in iter(f.readline, b''):
+            line_start, position = position, position + len(line)
+            line = line.strip()
+            if line and not any(start <= line_start < end for start, end in skip):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                if isinstance(record, dict):
+                    records.append(record)
+                else:
+                    skipped += 1
+            if len(records) >= chunk_rows:
+                yield records, position, skipped
+                records, skipped, yielded = [], 0, position
+        if position > yielded:
+            yield records, position, skipped
+
+def parse_requests(records: list) -> pd.DataFrame:
+    """Parses raw log records into the request log columns, with timestamps as UTC datetimes."""
+    df = pd.DataFrame.from_records(records)
+    for column in REQUEST_LOG_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+
+    # Status codes arrive as 200, "200" or "200 OK"; keep the numeric code
+    status = df['status_code_cleaned'].fillna(df['status_code']) if 'status_code' in df.columns else df['status_code_cleaned']
+    df['status_code_cleaned'] = pd.to_numeric(status.astype(str).str.extract(r'(\d{3})')[0], errors='coerce').astype('Int64')
+
+    client_id = df['client_id'].astype('string').str.strip()
+    df['client_id'] = client_id.mask(client_id.isna() | (client_id == ''), '(empty)')
+
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce', utc=True, format='mixed')
+    df['latency_ms'] = pd.to_numeric(df['latency_ms'], errors='coerce')
+    return df[REQUEST_LOG_COLUMNS].dropna(subset=['timestamp'])
+
+def normalise_requests(records: list) -> pd.DataFrame:
+    """Normalises raw log records into the request log table schema."""
+    df = parse_requests(records)
+    df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return df
+
+def _to_rows(df: pd.DataFrame) -> list:
+    """Converts a frame into JSON-serialisable insert rows (NaN/NA become null)."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def insert_batch(supabase: Client, rows: list, retries: int = 5, backoff: float = 0.5) -> int:
+    """Inserts one batch, retrying with exponential backoff and jitter. Returns rows inserted."""
+    for attempt in range(retries + 1):
+        try:
+            supabase.table(REQUEST_LOG_TABLE).insert(rows).execute()
+            return len(rows)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt * (0.5 + random.random()))
+
+def load_checkpoint(checkpoint_path: str, path: str) -> tuple:
+    """
+    Returns (offset, landed) to resume `path` from: the byte offset before which every
+    batch was inserted, and the [start, end) byte ranges of later batches that were
+    inserted too. (0, []) when there is no checkpoint for the file.
+    """
+    try:
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return 0, []
+    if checkpoint.get('path') != os.path.abspath(path):
+        return 0, []
+    return checkpoint['offset'], checkpoint['landed']
+
+def _save_checkpoint(checkpoint_path: str, path: str, offset: int, landed: list):
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'path': os.path.abspath(path), 'offset': offset, 'landed': landed}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+def ingest_file(supabase: Client, path: str, batch_rows: int = INGEST_BATCH_ROWS, workers: int = INGEST_WORKERS,
+                checkpoint_path: str = None, start_offset: int = 0, on_progress=None, skip=()) -> dict:
+    """
+    Streams a JSONL file into the request log table and returns ingestion stats.
+    on_progress(rows_inserted, rows_per_sec, offset) is called as batches complete.
+    `skip` holds byte ranges inserted by an earlier run (see load_checkpoint).
+    """
+    started = time.perf_counter()
+    inserted = skipped = 0
+    committed_offset = start_offset
+    pending = deque()  # (future, start_offset, end_offset) in file order
+
+    def landed() -> list:
+        # Batches past the committed offset that are already in the table
+        ranges = [list(r) for r in skip if r[0] >= committed_offset]
+        return ranges + [[start, end] for future, start, end in pending
+                         if future.done() and future.exception() is None]
+
+    def commit_done(block: bool):
+        # Advance the checkpoint only past batches whose predecessors have all landed
+        nonlocal inserted, committed_offset
+        while pending and (block or pending[0][0].done()):
+            future, _, end_offset = pending.popleft()
+            inserted += future.result()
+            committed_offset = end_offset
+            if checkpoint_path:
+                _save_checkpoint(checkpoint_path, path, committed_offset, landed())
+            if on_progress:
+                on_progress(inserted, inserted / max(time.perf_counter() - started, 1e-9), committed_offset)
+            block = False
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            batch_start = start_offset
+            for records, end_offset, dropped in read_jsonl_chunks(path, batch_rows, start_offset, skip):
+                skipped += dropped
+                if records:
+                    future = executor.submit(insert_batch, supabase, _to_rows(normalise_requests(records)))
+                else:
+                    future = Future()
+                    future.set_result(0)
+                pending.append((future, batch_start, end_offset))
+                batch_start = end_offset
+                commit_done(block=False)
+                # Backpressure: never hold more than 2 batches per worker in memory
+                while len(pending) >= workers * 2:
+                    commit_done(block=True)
+            while pending:
+                commit_done(block=True)
+    finally:
+        if checkpoint_path and pending:
+            # A batch failed: record the later batches that landed anyway, so a resume skips them
+            _save_checkpoint(checkpoint_path, path, committed_offset, landed())
+
+    elapsed = time.perf_counter() - started
+    return {'rows': inserted, 'skipped': skipped, 'seconds': elapsed,
+            'rows_per_sec': inserted / max(elapsed, 1e-9), 'offset': committed_offset}
+
+def main(argv=None):
+    # The parsing helpers are also used by the live tail, which does not need the Supabase client
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="Ingest JSONL request logs into Supabase.")
+    parser.add_argument('path', help="JSONL file with one request per line")
+    parser.add_argument('--batch-rows', type=int, default=INGEST_BATCH_ROWS)
+    parser.add_argument('--workers', type=int, default=INGEST_WORKERS)
+    parser.add_argument('--checkpoint', default=None,
+                        help="Checkpoint file (default: <path>.checkpoint.json)")
+    parser.add_argument('--resume', action='store_true', help="Resume from the checkpointed byte offset")
+    args = parser.parse_args(argv)
+
+    checkpoint_path = args.checkpoint or args.path + '.checkpoint.json'
+    start_offset, landed = load_checkpoint(checkpoint_path, args.path) if args.resume else (0, [])
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    def report(rows, rows_per_sec, offset):
+        print(f"{rows:,} rows inserted ({rows_per_sec:,.0f} rows/s), offset {offset:,}", flush=True)
+
+    stats = ingest_file(supabase, args.path, args.batch_rows, args.workers, checkpoint_path, start_offset, report,
+                        landed)
+    print(f"Done: {stats['rows']:,} rows in {stats['seconds']:.1f}s ({stats['rows_per_sec']:,.0f} rows/s), "
+          f"{stats['skipped']:,} unreadable lines skipped")
+
+if __name__ == '__main__':
+    main()
@@ -1,187 +1,167 @@
+import time
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+from src import charts, filters, live, timeseries, tracing
+from src.config import (FILTER_DIMENSIONS, FILTER_MAX_OPTIONS, LIVE_REFRESH_SECONDS, LIVE_SOURCE,
+                        TIME_SERIES_DEFAULT_DAYS, TIME_SERIES_MAX_KEYS, TIME_SERIES_MAX_POINTS)
+from src.figure_cache import cached, get_figure_cache
+from src.rendering import lines_figure, show_chart
+
+def _lazy_section(label: str, key: str, default: bool = False) -> bool:
+    """
+    Shows an on/off toggle for a dashboard section. Charts in a section are only
+    built (or fetched from the figure cache) once it is switched on, so sections
+    start switched off unless `default` is set.
+    """
+    return st.toggle(label, value=default, key=key)
+
+def _filter_key(display_name: str, dimension: str) -> str:
+    return f"filter:{display_name}:{dimension}"
+
+def _drill_down(chart_key: str, filter_key: str):
+    """Chart click callback: narrows the chart's filter dimension to the clicked bars."""
+    points = st.session_state[chart_key].selection.points
+    values = sorted({str(point['x']) for point in points if 'x' in point})
+    if values:
+        st.session_state[filter_key] = values
+
+def _clear_filters(display_name: str, dimensions: list):
+    for dimension in dimensions:
+        st.session_state[_filter_key(display_name, dimension)] = []
+    st.session_state.pop(_filter_key(display_name, 'time'), None)
+
+def filter_sidebar(df: pd.DataFrame, display_name: str, container=st.sidebar):
+    """
+    Filters on client, endpoint, API version, status class and time range for the
+    dimensions this table has, backed by its filter index (src/filters.py).
+    Returns the filtered frame and a description of the active filters ('' for none).
+    """
+    index = filters.table_index(df)
+    dimensions = [dimension for dimension in FILTER_DIMENSIONS if index.has(dimension)]
+    selected, start, end = {}, None, None
+    with container:
+        st.header("Filters")
+        for dimension in dimensions:
+            key = _filter_key(display_name, dimension)
+            options = index.options(dimension, FILTER_MAX_OPTIONS)
+            # Values picked by a drill-down click may be outside the most frequent ones
+            options += [value for value in st.session_state.get(key, []) if value not in set(options)]
+            selected[dimension] = st.multiselect(FILTER_DIMENSIONS[dimension], options, key=key)
+        low, high = index.time_bounds()
+        if low is not None:
+            picked = st.date_input(f"Time range ({index.time_column})", value=(low.date(), high.date()),
+                                   min_value=low.date(), max_value=high.date(), key=_filter_key(display_name, 'time'))
+            if len(picked) == 2:
+                start, end = pd.Timestamp(picked[0], tz='UTC'), pd.Timestamp(picked[1], tz='UTC') + pd.Timedelta(days=1)
+                if start <= low and end > high:
+                    start = end = None
+        description = filters.describe_filters(selected, start, end)
+        if description:
+            st.button("Clear filters", on_click=_clear_filters, args=(display_name, dimensions))
+    filtered = filters.apply_filters(df, selected, start, end)
+    if description:
+        container.caption(f"{len(filtered):,} of {len(df):,} rows")
+    return filtered, description
+
+def _render(spec: charts.ChartSpec, fig, display_name: str = None):
+    """
+    Renders one built chart, or its message when there is nothing to plot. With a
+    display_name, clicking a bar of a drill-down chart filters the report to it.
+    """
+    if spec.subheader:
+        st.subheader(spec.subheader)
+    if fig is not None and display_name and spec.drill_down in FILTER_DIMENSIONS:
+        chart_key = f"chart:{display_name}:{spec.key}"
+        show_chart(fig, key=chart_key, on_select=lambda: _drill_down(chart_key, _filter_key(display_name, spec.drill_down)),
+                   selection_mode="points")
+    elif fig is not None:
+        show_chart(fig)
+    elif spec.message:
+        st.info(spec.message)
+
+def _plot(df: pd.DataFrame, specs: list):
+    """Builds the specs (concurrently, through the figure cache) and renders them in order."""
+    for spec, fig in zip(specs, charts.build_charts(df, specs, cache=get_figure_cache())):
+        _render(spec, fig)
 
 def plot_client_request_counts(df: pd.DataFrame):
     """Plots top clients by request count from consumer_behavior_report."""
-    if 'client_id' in df.columns and 'request_count' in df.columns:
-        st.subheader("Top Clients by Request Count")
-        plot_df = df[df['client_id'] != 'No Client ID'].sort_values('request_count', ascending=False).head(10)
-        if not plot_df.empty:
-            fig = px.bar(plot_df, x='client_id', y='request_count', 
-                         title='Top 10 Clients by Total Request Count')
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No client-specific data to plot request counts.")
-    else:
-        st.info("Client request counts cannot be plotted. Missing 'client_id' or 'request_count' column.")
+    _plot(df, [charts.client_request_counts(df)])
 
 def plot_consumer_avg_latency(df: pd.DataFrame):
     """Plots average latency for consumers, excluding (empty) client_id if present."""
-    if 'client_id' in df.columns and 'avg_latency' in df.columns:
-        st.subheader("Client Average Latency Distribution")
-        plot_df = df[df['client_id'] != 'No Client ID'].sort_values('avg_latency', ascending=False).head(15)
-        if not plot_df.empty:
-            fig = px.bar(plot_df, x='client_id', y='avg_latency', 
-                         title='Top 15 Clients by Average Latency (ms)')
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No client-specific data to plot average latency.")
-    else:
-        st.info("Average latency by client cannot be plotted. Missing 'client_id' or 'avg_latency' column.")
+    _plot(df, [charts.consumer_avg_latency(df)])
 
 def plot_error_rate_distribution(df: pd.DataFrame):
     """Plots distribution of error rates, useful for both consumer and predictive reports."""
-    if 'error_rate_pct' in df.columns:
-        st.subheader("Client Error Rate Distribution")
-        plot_df = df[df['client_id'] != 'No Client ID'].sort_values('error_rate_pct', ascending=False).head(15)
-        if not plot_df.empty:
-            fig = px.bar(plot_df, x='client_id', y='error_rate_pct', 
-                         title='Top 15 Clients by Error Rate (%)')
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No client-specific data to plot error rates.")
-    elif 'avg_error_rate' in df.columns and 'uri_path' in df.columns:
-        st.subheader("API Average Error Rate Distribution")
-        plot_df = df.sort_values('avg_error_rate', ascending=False).head(15)
-        if not plot_df.empty:
-            fig = px.bar(plot_df, x='uri_path', y='avg_error_rate', 
-                         title='Top 15 URIs by Average Error Rate (%)')
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No API-specific data to plot average error rates.")
-    else:
-        st.info("Error rate distribution cannot be plotted. Missing relevant error rate column.")
+    _plot(df, [charts.error_rate_distribution(df)])
 
 def plot_api_latency_and_requests(df: pd.DataFrame):
     """Plots API latency and request counts from resource_optimization_report."""
-    if 'uri_path' in df.columns and 'avg_latency' in df.columns and 'request_count' in df.columns:
-        st.subheader("API Latency vs. Request Count")
-        fig = px.scatter(df, x='avg_latency', y='request_count', color='uri_path', 
-                         size='request_count', hover_name='uri_path',
-                         title='API Average Latency vs. Request Count')
-        st.plotly_chart(fig, use_container_width=True)
-
-        st.subheader("Top APIs by Average Latency")
-        top_latency_apis = df.sort_values('avg_latency', ascending=False).head(15)
-        fig_lat = px.bar(top_latency_apis, x='uri_path', y='avg_latency', 
-                         title='Top 15 APIs by Average Latency (ms)')
-        st.plotly_chart(fig_lat, use_container_width=True)
-
-        st.subheader("Top APIs by Request Count")
-        top_request_apis = df.sort_values('request_count', ascending=False).head(15)
-        fig_req = px.bar(top_request_apis, x='uri_path', y='request_count', 
-                         title='Top 15 APIs by Request Count')
-        st.plotly_chart(fig_req, use_container_width=True)
-    else:
-        st.info("API latency/request plots cannot be generated. Missing 'uri_path', 'avg_latency', or 'request_count'.")
+    _plot(df, charts.api_latency_and_requests(df))
 
 def plot_resource_utilization(df: pd.DataFrame):
     """Plots resource utilization from resource_optimization_report."""
-    if 'utilization' in df.columns and 'uri_path' in df.columns:
-        st.subheader("API Utilization Distribution")
-        utilization_counts = df['utilization'].value_counts().reset_index()
-        utilization_counts.columns = ['Utilization Level', 'Count']
-        fig = px.pie(utilization_counts, names='Utilization Level', values='Count', 
-                     title='Distribution of API Utilization Levels')
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Resource utilization cannot be plotted. Missing 'utilization' or 'uri_path'.")
+    _plot(df, [charts.resource_utilization(df)])
 
 def plot_maintenance_priority(df: pd.DataFrame):
     """Plots maintenance priority from predictive_maintenance_report."""
-    if 'maintenance_priority' in df.columns and 'uri_path' in df.columns:
-        st.subheader("Maintenance Priority Distribution")
-        priority_counts = df['maintenance_priority'].value_counts().reset_index()
-        priority_counts.columns = ['Priority Level', 'Count']
-        fig = px.pie(priority_counts, names='Priority Level', values='Count', 
-                     title='Distribution of API Maintenance Priorities')
-        st.plotly_chart(fig, use_container_width=True)
-
-        st.subheader("APIs by Maintenance Priority")
-        high_priority_apis = df[df['maintenance_priority'].isin(['High', 'Medium'])].sort_values('maintenance_priority').head(20)
-        if not high_priority_apis.empty:
-            fig_bar = px.bar(high_priority_apis, x='uri_path', y='avg_error_rate' if 'avg_error_rate' in high_priority_apis.columns else None,
-                             color='maintenance_priority', title='APIs with High/Medium Maintenance Priority',
-                             hover_data=['avg_error_rate', 'max_error_rate'])
-            st.plotly_chart(fig_bar, use_container_width=True)
-        else:
-            st.info("No high/medium priority APIs to display.")
-    else:
-        st.info("Maintenance priority cannot be plotted. Missing 'maintenance_priority' or 'uri_path'.")
+    _plot(df, charts.maintenance_priority(df))
+
+def plot_latency_percentiles(df: pd.DataFrame, key_col: str):
+    """Plots p50/p90/p99/p99.9 latency for the keys with the worst p99 latency."""
+    _plot(df, charts.latency_percentiles(df, key_col))
 
-def display_dataframe_summary(df: pd.DataFrame, title: str):
-    """Displays a summary of the dataframe and its first few rows."""
+def display_dataframe_summary(df: pd.DataFrame, title: str, overview: dict = None):
+    """
+    Displays a summary of the dataframe and its first few rows. `overview` is the
+    prebuilt result of charts.overview; it is built here when not given.
+    """
     if not df.empty:
-        st.subheader(f"Data Overview: {title} (Sampled)")
+        if overview is None:
+            overview = charts.build_charts(df, [charts.overview(df)], cache=get_figure_cache())[0]
+        st.subheader(f"Data Overview: {title}")
         st.write(f"Number of rows: {len(df)}")
         st.write(f"Number of columns: {len(df.columns)}")
+        report = overview['memory']
+        st.write(f"Memory usage: {report['bytes'].sum() / 1024 ** 2:.1f} MB")
+        with st.expander("Memory by column"):
+            st.dataframe(report)
         st.dataframe(df.head())
         st.subheader("Descriptive Statistics")
-        st.write(df.describe(include='all'))
+        st.write(overview['summary'])
     else:
         st.info("No data available to display summary.")
 
 def plot_correlation_heatmap(df: pd.DataFrame):
     """Plots a correlation heatmap for numeric columns."""
-    st.subheader("Correlation Heatmap")
-    numeric_df = df.select_dtypes(include=['number'])
-    if not numeric_df.empty:
-        corr_matrix = numeric_df.corr()
-        fig = px.imshow(corr_matrix, text_auto=True, aspect="auto", title="Correlation Heatmap")
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("No numeric columns available for correlation heatmap.")
+    _plot(df, [charts.correlation_heatmap(df)])
 
 def plot_latency_boxplot(df: pd.DataFrame):
     """Plots a boxplot of latency values."""
-    st.subheader("Latency Boxplot")
-    if 'avg_latency' in df.columns:
-        fig = px.box(df, y='avg_latency', title="Boxplot of Latency (ms)")
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("No latency data available for boxplot.")
+    _plot(df, [charts.latency_boxplot(df)])
 
 def plot_request_boxplot(df: pd.DataFrame):
     """Plots a boxplot of request counts."""
-    st.subheader("Request Count Boxplot")
-    if 'request_count' in df.columns:
-        fig = px.box(df, y='request_count', title="Boxplot of Request Count")
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("No request count data available for boxplot.")
+    _plot(df, [charts.request_boxplot(df)])
 
 def plot_latency_histogram(df: pd.DataFrame):
     """Plots a histogram of latency values."""
-    st.subheader("Latency Histogram")
-    if 'avg_latency' in df.columns:
-        fig = px.histogram(df, x='avg_latency', title="Histogram of Latency (ms)")
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("No latency data available for histogram.")
+    _plot(df, [charts.latency_histogram(df)])
 
 def plot_request_histogram(df: pd.DataFrame):
     """Plots a histogram of request counts."""
-    st.subheader("Request Count Histogram")
-    if 'request_count' in df.columns:
-        fig = px.histogram(df, x='request_count', title="Histogram of Request Count")
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("No request count data available for histogram.")
+    _plot(df, [charts.request_histogram(df)])
 
 def plot_latency_vs_requests(df: pd.DataFrame):
     """Plots a scatter plot of latency vs request count."""
-    st.subheader("Latency vs Request Count")
-    if 'avg_latency' in df.columns and 'request_count' in df.columns:
-        fig = px.scatter(df, x='request_count', y='avg_latency', title="Latency vs Request Count")
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Both latency and request count data are required for this plot.")
+    _plot(df, [charts.latency_vs_requests(df)])
 
 def plot_all_relevant_charts(df: pd.DataFrame, display_name: str):
     """
     Analyzes the dataframe and plots relevant charts based on available columns,
-    adapting to the selected report.
+    adapting to the selected report. All enabled charts are built concurrently
+    first and rendered in order once they are ready.
     """
     if df.empty:
         st.warning(f"No data available for {display_name}.")
@@ -190,42 +170,137 @@ def plot_all_relevant_charts(df: pd.DataFrame, display_name: str):
     st.header(f"Dashboard for: {display_name}")
     st.markdown("---")
 
-    # Always show basic data summary
-    display_dataframe_summary(df, display_name)
+    # Section toggles are read first so only switched-on charts are built. Only the first
+    # section is on for a fresh page; the others are built once they are opened
+    show_overview = _lazy_section("Data overview", f"{display_name}:overview", default=True)
+    sections = [section for section in charts.report_sections(df, display_name)
+                if _lazy_section(section.label, f"{display_name}:{section.key}")]
+    specs = ([charts.overview(df)] if show_overview else []) + [spec for section in sections for spec in section.charts]
+    built = iter(charts.build_charts(df, specs, cache=get_figure_cache()))
+
+    # Basic data summary
+    if show_overview:
+        display_dataframe_summary(df, display_name, next(built))
     st.markdown("---")
 
-    # Logic to plot charts based on the selected report type
-    if "Consumer Behavior" in display_name:
-        plot_client_request_counts(df)
-        plot_consumer_avg_latency(df)
-        plot_error_rate_distribution(df)
-        
-        if 'api_diversity' in df.columns and 'client_id' in df.columns:
-            st.subheader("Client API Diversity")
-            plot_df = df[df['client_id'] != 'No Client ID'].sort_values('api_diversity', ascending=False).head(15)
-            if not plot_df.empty:
-                fig = px.bar(plot_df, x='client_id', y='api_diversity', 
-                             title='Top 15 Clients by API Diversity')
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.info("No client-specific data to plot API diversity.")
-
-    elif "Resource Optimization" in display_name:
-        plot_api_latency_and_requests(df)
-        plot_resource_utilization(df)
-        if 'efficiency_score' in df.columns and 'uri_path' in df.columns:
-            st.subheader("API Efficiency Score")
-            plot_df = df.sort_values('efficiency_score', ascending=False).head(15)
-            fig = px.bar(plot_df, x='uri_path', y='efficiency_score', 
-                         title='Top 15 APIs by Efficiency Score')
-            st.plotly_chart(fig, use_container_width=True)
-
-    elif "Predictive Maintenance" in display_name:
-        plot_error_rate_distribution(df)
-        plot_maintenance_priority(df)
-        if 'prediction_score' in df.columns and 'uri_path' in df.columns:
-            st.subheader("API Anomaly Prediction Scores")
-            plot_df = df.sort_values('prediction_score', ascending=False).head(15)
-            fig = px.bar(plot_df, x='uri_path', y='prediction_score', 
-                         title='Top 15 APIs by Anomaly Prediction Score')
-            st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    for section in sections:
+        for spec in section.charts:
+            _render(spec, next(built), display_name)
+
+def plot_time_series(source=None):
+    """
+    Time-series mode: a metric per API over a selectable window. Moving the window
+    reads only that window, at the finest pre-aggregated resolution that keeps each
+    series within TIME_SERIES_MAX_POINTS buckets.
+    """
+    source = source or timeseries.default_source()
+    cache = get_figure_cache()
+    version = source.version()
+    try:
+        first, last = cache.get_or_build(('ts_extent', version), source.extent)
+    except Exception as e:
+        st.error(f"Error reading time-series data: {e}")
+        return
+    st.header("Time Series")
+
+    # The slider works in naive UTC datetimes
+    first, last = timeseries.to_utc(first).tz_localize(None), timeseries.to_utc(last).tz_localize(None)
+    default_start = max(first, last - pd.Timedelta(days=TIME_SERIES_DEFAULT_DAYS))
+    label = st.selectbox("Metric", list(timeseries.TIME_SERIES_METRICS))
+    start, end = st.slider("Visible window (UTC)", min_value=first.to_pydatetime(), max_value=last.to_pydatetime(),
+                           value=(default_start.to_pydatetime(), last.to_pydatetime()),
+                           step=pd.Timedelta(minutes=1).to_pytimedelta(), format="YYYY-MM-DD HH:mm")
+    if end <= start:
+        st.info("Select a window longer than one minute.")
+        return
+
+    # API choices come from the whole range so they stay put while the window moves
+    options = cache.get_or_build(('ts_top_keys', version), lambda: source.top_keys('uri_path', first, last, 50))
+    keys = st.multiselect("APIs (uri_path)", options, default=options[:5], max_selections=TIME_SERIES_MAX_KEYS)
+    auto = timeseries.pick_resolution(start, end, available=source.resolutions())
+    resolution = st.selectbox("Resolution", ["auto"] + [res for res in source.resolutions()
+                                                        if (end - start) / timeseries.resolution_step(res) <= TIME_SERIES_MAX_POINTS])
+    resolution = auto if resolution == "auto" else resolution
+
+    try:
+        frame, resolution = cache.get_or_build(
+            ('ts_series', version, label, start, end, tuple(keys), resolution),
+            lambda: timeseries.time_series(source, label, start, end, by='uri_path' if keys else None,
+                                           keys=keys or None, resolution=resolution))
+    except Exception as e:
+        st.error(f"Error computing the time series: {e}")
+        return
+    if frame.empty:
+        st.info("No requests in the selected window.")
+        return
+    show_chart(lines_figure(frame, title=f"{label} per {resolution} window", y_label=label))
+    st.caption(f"{resolution} resolution, {len(frame):,} buckets per series")
+
+@st.cache_resource
+def get_live_aggregator() -> live.LiveAggregator:
+    """Starts the live source and aggregator once per dashboard process."""
+    aggregator, _ = live.start_live(LIVE_SOURCE)
+    return aggregator
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def plot_live(display_name: str):
+    """
+    Live tail mode. Reruns on its own every LIVE_REFRESH_SECONDS without rerunning
+    the page; charts whose report rows did not change come from the figure cache.
+    """
+    try:
+        aggregator = get_live_aggregator()
+    except Exception as e:
+        st.error(f"Error starting the live source ({LIVE_SOURCE}): {e}")
+        return
+    stats = aggregator.stats()
+    now = time.monotonic()
+    last_time, last_received = st.session_state.get('live_stats', (now, stats['received']))
+    st.session_state.live_stats = (now, stats['received'])
+    rate = (stats['received'] - last_received) / (now - last_time) if now > last_time else 0.0
+
+    st.header(f"Live: {display_name}")
+    columns = st.columns(4)
+    columns[0].metric("Rows received", f"{stats['received']:,}")
+    columns[1].metric("Rows/sec", f"{rate:,.0f}")
+    columns[2].metric("Waiting to fold", f"{stats['pending']:,}")
+    columns[3].metric("Last fold (ms)", f"{stats['last_flush_ms']:.0f}")
+    if stats['dropped']:
+        st.warning(f"Dropped {stats['dropped']:,} rows in batches that could not be folded. "
+                   f"Last error: {stats['last_error']}")
+
+    rates = aggregator.request_rate()
+    if rates.empty:
+        st.info("Waiting for new request-log rows...")
+        return
+    show_chart(cached(rates, ('live_rate',), lambda: lines_figure(
+        rates[['requests_per_sec']], title="Requests/sec per minute", y_label="requests/sec")))
+
+    df = aggregator.reports().get(display_name)
+    if df is None or df.empty:
+        return
+    specs = [spec for section in charts.report_sections(df, display_name) for spec in section.charts]
+    for spec, fig in zip(specs, charts.build_charts(df, specs, cache=get_figure_cache())):
+        _render(spec, fig)
+
+def plot_performance():
+    """
+    Collapsible panel with the per-stage timings recorded by src/tracing.py, which
+    also exports them to the configured metrics file and /metrics endpoint.
+    """
+    tracing.export()
+    with st.expander("Performance"):
+        if not tracing.is_enabled():
+            st.info("Tracing is off. Set TRACING_ENABLED=1 to record per-stage timings.")
+            return
+        stages = tracing.snapshot()
+        if stages.empty:
+            st.info("No stages have run yet.")
+            return
+        st.dataframe(stages.style.format(precision=1, thousands=","))
+        columns = st.columns(2)
+        columns[0].download_button("Download metrics (Prometheus)", tracing.prometheus_text(),
+                                   file_name="dashboard_metrics.prom", mime="text/plain")
+        if columns[1].button("Reset timings"):
+            tracing.reset()
+            st.rerun()
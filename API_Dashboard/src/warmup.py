@@ -0,0 +1,42 @@
+"""
+Background warm-up of a fresh dashboard process.
+
+A new replica has nothing cached: the first page waits for plotly and the Supabase
+client to import and for the first table to load. start_warm_up() does that work
+on a background thread once per process, while the first run renders the
+sidebar. The table lands in the shared table cache, and a fetch_data call that
+arrives mid-load waits for the same load instead of starting a second one.
+"""
+import threading
+import streamlit as st
+from src.config import DATA_SOURCE, SUPABASE_KEY, SUPABASE_URL, TABLE_NAMES, WARMUP_ENABLED, WARMUP_TABLE
+from src.data_loader import get_table_cache, init_supabase, load_table
+from src.lazy import preload
+from src.tracing import span
+
+def warm_up(table_display_name: str):
+    """Imports the plotting backend, connects to Supabase and loads one table into the table cache."""
+    with span("warmup"):
+        preload('plotly.express', 'plotly.graph_objects')
+        if DATA_SOURCE != "local" and SUPABASE_URL and SUPABASE_KEY:
+            init_supabase()
+        get_table_cache().get_or_load(TABLE_NAMES[table_display_name], ("*",),
+                                      lambda: load_table(table_display_name))
+
+@st.cache_resource
+def start_warm_up(table_display_name: str = None):
+    """Starts warm_up() on a daemon thread, once per process; returns the thread, or None when disabled."""
+    if not WARMUP_ENABLED:
+        return None
+    table_display_name = table_display_name or WARMUP_TABLE or next(iter(TABLE_NAMES))
+
+    def run():
+        try:
+            warm_up(table_display_name)
+        except Exception:
+            # Best effort: the first real fetch_data retries the load and reports the error
+            pass
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
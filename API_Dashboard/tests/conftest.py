@@ -0,0 +1,27 @@
+"""Shared fixtures: the local stand-ins from benchmarks/ served on free ports."""
+import threading
+import pytest
+from benchmarks.fake_postgrest import serve
+from benchmarks.synthetic import report_tables
+
+@pytest.fixture
+def postgrest():
+    """Starts a fake PostgREST server. Call it with {table name: frame}; it returns a Supabase client."""
+    servers = []
+
+    def start(tables: dict):
+        from supabase import create_client
+        server = serve(tables, 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return create_client(f"http://127.0.0.1:{server.server_address[1]}", "test")
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture(scope="session")
+def tables():
+    """The three synthetic report tables by table name, 3,000 rows each."""
+    return report_tables(3000)
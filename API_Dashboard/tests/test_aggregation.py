@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import request_logs
+from src.aggregation import ALL_METRICS, aggregate, fast_summary
+
+@pytest.fixture(scope="module", params=['object', 'category'])
+def requests(request):
+    df = request_logs(20_000, clients=500, endpoints=60)
+    df.loc[df.sample(frac=0.01, random_state=0).index, 'latency_ms'] = np.nan
+    if request.param == 'category':
+        for column in ('api_name', 'app_name', 'api_version', 'uri_path', 'client_id'):
+            df[column] = df[column].astype('category')
+    return df
+
+def test_counts_match_value_counts(requests):
+    result = aggregate(requests, ALL_METRICS, n=10)
+    for metric, column in [('status_code_distribution', 'status_code_cleaned'), ('version_usage', 'api_version')]:
+        assert getattr(result, metric).to_dict() == requests[column].value_counts().to_dict()
+    # Ties may be ordered differently, so compare the top-n counts and that every key's count is right
+    expected = requests['client_id'].value_counts()
+    top = result.top_clients
+    assert len(top) == 10 and top.tolist() == expected.head(10).tolist()
+    assert (top == expected.reindex(top.index)).all()
+
+def test_means_match_groupby(requests):
+    result = aggregate(requests, ['avg_latency_per_api', 'avg_latency_per_app'])
+    for metric, column in [('avg_latency_per_api', 'api_name'), ('avg_latency_per_app', 'app_name')]:
+        expected = requests.groupby(column, observed=True)['latency_ms'].mean()
+        got = getattr(result, metric)
+        assert got.is_monotonic_decreasing
+        assert np.allclose(got.sort_index(), expected.sort_index())
+    assert result.computed == ('avg_latency_per_api', 'avg_latency_per_app')
+    assert result.top_clients is None
+
+def test_summary_matches_describe(requests):
+    summary = fast_summary(requests)
+    expected = requests.describe(include='all')
+    numeric = ['latency_ms', 'status_code_cleaned']
+    rows = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+    assert np.allclose(summary.loc[rows, numeric].astype(float), expected.loc[rows, numeric].astype(float))
+    for column in ('client_id', 'uri_path', 'api_version'):
+        assert summary.loc['count', column] == expected.loc['count', column]
+        assert summary.loc['unique', column] == expected.loc['unique', column]
+        assert summary.loc['freq', column] == expected.loc['freq', column]
+
+def test_missing_columns_are_skipped():
+    result = aggregate(pd.DataFrame({'client_id': ['a', 'b', 'a']}), ALL_METRICS)
+    assert result.top_clients.to_dict() == {'a': 2, 'b': 1}
+    assert result.avg_latency_per_api is None and 'version_usage' not in result.computed
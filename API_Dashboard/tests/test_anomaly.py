@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.bench_anomaly import synthetic_window
+from src.anomaly import AnomalyEngine
+
+ENDPOINTS = 200
+SPIKES = np.arange(0, 10)
+BURSTS = np.arange(10, 20)
+
+def _replay(engine: AnomalyEngine, windows: int, anomalies: bool) -> list:
+    rng = np.random.default_rng(0)
+    base_latency = rng.lognormal(4.5, 0.8, ENDPOINTS)
+    base_rate = rng.uniform(50, 400, ENDPOINTS)
+    frames = []
+    for window in range(windows):
+        last = anomalies and window == windows - 1
+        frames.append(synthetic_window(window, base_latency, base_rate, rng,
+                                       spikes=SPIKES if last else None, bursts=BURSTS if last else None))
+        engine.update_partials(frames[-1])
+    engine.close()
+    return frames
+
+@pytest.fixture(scope="module")
+def scored():
+    engine = AnomalyEngine('5m')
+    frames = _replay(engine, 200, anomalies=True)
+    return engine, pd.concat(frames), engine.report().set_index('uri_path')
+
+def test_injected_anomalies_are_flagged(scored):
+    _, _, report = scored
+    anomalous = report.index.isin([f"/api/v1/resource/{i}" for i in np.concatenate([SPIKES, BURSTS])])
+    assert (report.loc[anomalous, 'maintenance_priority'] != 'Low').mean() >= 0.9
+    assert (report.loc[~anomalous, 'maintenance_priority'] == 'Low').mean() >= 0.97
+
+def test_report_totals_are_weighted_by_requests(scored):
+    _, partials, report = scored
+    totals = partials.groupby(level='uri_path').sum(numeric_only=True)
+    assert (report['request_count'] == totals['count'].reindex(report.index)).all()
+    expected = 100 * totals['error_count'] / totals['count']
+    assert np.allclose(report['avg_error_rate'], expected.reindex(report.index))
+    assert np.allclose(report['avg_latency'], (totals['latency_sum'] / totals['latency_count']).reindex(report.index))
+
+def test_report_does_not_change_the_engine():
+    engine = AnomalyEngine('5m')
+    rng = np.random.default_rng(1)
+    window = synthetic_window(0, rng.lognormal(4, 0.5, 30), rng.uniform(20, 50, 30), rng)
+    engine.update_partials(window)  # the only window stays open
+    report = engine.report()
+    assert len(report) == 30 and report['request_count'].sum() == window['count'].sum()
+    assert engine.keys.empty and all(len(values) == 0 for values in engine.state.values())
+
+def test_save_and_load_round_trip(scored, tmp_path):
+    engine, _, report = scored
+    engine.save(tmp_path)
+    loaded = AnomalyEngine.load(tmp_path, '5m')
+    pd.testing.assert_frame_equal(loaded.report().set_index('uri_path'), report)
+
+def test_reload_keeps_closed_windows_closed(tmp_path):
+    engine = AnomalyEngine('5m', min_requests=10)
+    rng = np.random.default_rng(2)
+    latency, rate = rng.lognormal(4, 0.5, 30), rng.uniform(20, 50, 30)
+    windows = [synthetic_window(window, latency, rate, rng) for window in range(5)]
+    # The last closed window is too small to be scored, so no endpoint records it
+    windows[3] = windows[3].assign(count=1, latency_count=1, error_count=0)
+    for window in windows:
+        engine.update_partials(window)
+    engine.save(tmp_path)
+    loaded = AnomalyEngine.load(tmp_path, '5m', min_requests=10)
+    assert loaded.closed_until == engine.closed_until == windows[3].index.get_level_values('window_start')[0]
+
+    # Replaying the closed windows counts them as late instead of folding them in again
+    before = loaded.report().set_index('uri_path')
+    for window in windows[:4]:
+        assert loaded.update_partials(window) == 0
+    assert loaded.late_rows == sum(int(window['count'].sum()) for window in windows[:4])
+    pd.testing.assert_frame_equal(loaded.report().set_index('uri_path'), before)
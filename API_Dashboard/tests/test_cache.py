@@ -0,0 +1,62 @@
+import threading
+import time
+import pandas as pd
+from src import cache
+from src.cache import TableCache
+
+def _frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({'value': range(rows)})
+
+def test_second_get_is_a_hit():
+    tables = TableCache(10 ** 9, 60)
+    loads = []
+    first = tables.get_or_load('t', (), lambda: loads.append(1) or _frame(10))
+    assert tables.get_or_load('t', (), lambda: loads.append(1) or _frame(10)) is first
+    assert len(loads) == 1
+    assert tables.stats()['hits'] == 1 and tables.stats()['misses'] == 1
+
+def test_concurrent_misses_load_once():
+    tables = TableCache(10 ** 9, 60)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return _frame(10)
+
+    threads = [threading.Thread(target=tables.get_or_load, args=('t', (), loader)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+
+def test_evicts_least_recently_used_over_budget():
+    one = int(_frame(1000).memory_usage(deep=True).sum())
+    tables = TableCache(int(one * 2.5), 60)
+    for name in ('a', 'b'):
+        tables.get_or_load(name, (), lambda: _frame(1000))
+    tables.get_or_load('a', (), lambda: _frame(1000))  # 'a' is now the most recently used
+    tables.get_or_load('c', (), lambda: _frame(1000))
+    assert tables.stats()['evictions'] == 1
+    assert tables.stats()['bytes'] <= tables.max_bytes
+    loads = []
+    tables.get_or_load('b', (), lambda: loads.append(1) or _frame(1000))
+    assert loads == [1]
+
+def test_entries_expire_after_their_table_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    tables = TableCache(10 ** 9, 60, {'fast': 5})
+    tables.get_or_load('fast', (), lambda: _frame(10))
+    tables.get_or_load('slow', (), lambda: _frame(10))
+    now[0] += 10
+    loads = []
+    tables.get_or_load('fast', (), lambda: loads.append('fast') or _frame(10))
+    tables.get_or_load('slow', (), lambda: loads.append('slow') or _frame(10))
+    assert loads == ['fast']
+
+def test_empty_frames_are_not_cached():
+    tables = TableCache(10 ** 9, 60)
+    tables.get_or_load('t', (), pd.DataFrame)
+    assert tables.stats()['entries'] == 0
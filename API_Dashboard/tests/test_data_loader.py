@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+from src import data_loader
+from src.config import TABLE_NAMES
+
+NAME = 'Resource Optimization'
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    # Several pages and key ranges per table, and the Supabase source regardless of the environment
+    monkeypatch.setattr(data_loader, 'PAGE_SIZE', 250)
+    monkeypatch.setattr(data_loader, 'FETCH_WORKERS', 4)
+    monkeypatch.setattr(data_loader, 'DATA_SOURCE', 'supabase')
+
+def _same_rows(df: pd.DataFrame, expected: pd.DataFrame):
+    assert len(df) == len(expected)
+    assert sorted(df['id'].astype(int)) == sorted(expected['id'])
+
+def test_keyset_streaming_loads_every_row(postgrest, tables):
+    supabase = postgrest(tables)
+    progress = []
+    df = data_loader.load_table(NAME, on_progress=lambda loaded, total: progress.append((loaded, total)),
+                                supabase=supabase)
+    _same_rows(df, tables[TABLE_NAMES[NAME]])
+    assert progress[-1] == (len(df), len(df))
+
+def test_missing_key_column_falls_back_to_offset_pages(postgrest, tables):
+    table = TABLE_NAMES[NAME]
+    supabase = postgrest({**tables, table: tables[table].drop(columns=['id'])})
+    df = data_loader.load_table(NAME, supabase=supabase)
+    assert len(df) == len(tables[table])
+
+def test_failing_key_bounds_fall_back_to_offset_pages(postgrest, tables, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("key cannot be ordered")
+    monkeypatch.setattr(data_loader, '_key_bounds', fail)
+    df = data_loader.load_table(NAME, supabase=postgrest(tables))
+    _same_rows(df, tables[TABLE_NAMES[NAME]])
+
+def test_empty_table(postgrest, tables):
+    table = TABLE_NAMES[NAME]
+    supabase = postgrest({**tables, table: tables[table].iloc[:0]})
+    assert data_loader.load_table(NAME, supabase=supabase).empty
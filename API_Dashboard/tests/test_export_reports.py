@@ -0,0 +1,70 @@
+import json
+import os
+import pytest
+from src import charts, data_loader, export_reports
+from src.config import TABLE_NAMES
+from src.export_reports import _file_name
+
+@pytest.fixture
+def store(tables, tmp_path, monkeypatch):
+    """A local Parquet store holding the synthetic report tables, read with DATA_SOURCE=local."""
+    directory = tmp_path / 'store'
+    directory.mkdir()
+    for table_name, frame in tables.items():
+        frame.head(500).to_parquet(directory / f"{table_name}.parquet", index=False)
+    monkeypatch.setattr(data_loader, 'LOCAL_STORE_DIR', str(directory))
+    monkeypatch.setattr(export_reports, 'DATA_SOURCE', 'local')
+    return directory
+
+@pytest.fixture
+def jobs(tables, tmp_path):
+    clients = tables['consumer_behavior']['client_id'].head(500).unique()[:5].tolist()
+    entries = [{'name': 'all consumers', 'table': 'Consumer Behavior'},
+               {'name': 'five consumers', 'table': 'consumer_behavior', 'filters': {'client_id': clients}},
+               {'name': 'endpoints', 'table': 'Resource Optimization'},
+               {'name': 'maintenance', 'table': 'Predictive Maintenance'}]
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps(entries))
+    return path
+
+def _sections(store, display_name: str) -> list:
+    frame = data_loader.read_local(display_name)
+    return [section.label for section in charts.report_sections(frame, display_name)]
+
+def test_exports_every_job_in_worker_processes(store, jobs, tmp_path, capsys):
+    out = tmp_path / 'exports'
+    code = export_reports.main(['--jobs', str(jobs), '--format', 'html', 'json', '--out', str(out), '--workers', '2'])
+    assert code == 0, capsys.readouterr().err
+
+    entries = json.loads(jobs.read_text())
+    assert sorted(os.listdir(out)) == sorted(f"{_file_name(entry['name'])}.{ext}"
+                                             for entry in entries for ext in ('html', 'json'))
+    for job in export_reports.read_jobs(str(jobs)):
+        labels = _sections(store, job.table)
+        page = (out / f"{_file_name(job.name)}.html").read_text()
+        assert page.startswith("<!DOCTYPE html>") and f"<h1>{job.table}: {job.name}</h1>" in page
+        assert "<h2>Descriptive Statistics</h2>" in page
+        for label in labels:
+            assert f"<h2>{label}</h2>" in page
+        # plotly.js is referenced once per page, with the first figure
+        assert page.count('cdn.plot.ly') == 1
+
+        document = json.loads((out / f"{_file_name(job.name)}.json").read_text())
+        assert (document['name'], document['table'], document['filters']) == (job.name, job.table, job.filters)
+        assert [section['label'] for section in document['sections']] == labels
+        assert document['summary'] and document['memory_bytes'] > 0
+        figures = [chart['figure'] for section in document['sections'] for chart in section['charts']]
+        assert any(figure is not None and figure['data'] for figure in figures)
+
+    consumers = json.loads((out / 'all_consumers.json').read_text())
+    filtered = json.loads((out / 'five_consumers.json').read_text())
+    assert consumers['rows'] == 500 and filtered['rows'] == 5
+
+def test_missing_tables_are_skipped_and_fail_the_run(store, tmp_path, capsys):
+    os.remove(store / f"{TABLE_NAMES['Predictive Maintenance']}.parquet")
+    out = tmp_path / 'exports'
+    code = export_reports.main(['--tables', 'Consumer Behavior', 'Predictive Maintenance',
+                                '--format', 'json', '--out', str(out), '--workers', '2'])
+    assert code == 1
+    assert "no data in Predictive Maintenance" in capsys.readouterr().err
+    assert os.listdir(out) == [f"{TABLE_NAMES['Consumer Behavior']}.json"]
@@ -0,0 +1,71 @@
+import gc
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+from src import figure_cache
+from src.figure_cache import FigureCache, frame_fingerprint, register_fingerprint
+
+def _frame(offset: int = 0) -> pd.DataFrame:
+    return pd.DataFrame({'uri_path': ['/a', '/b', '/c'], 'avg_latency': [10.0 + offset, 20.0, 30.0]})
+
+def test_fingerprint_follows_content():
+    assert frame_fingerprint(_frame()) == frame_fingerprint(_frame())
+    assert frame_fingerprint(_frame()) != frame_fingerprint(_frame(1))
+    assert frame_fingerprint(_frame()) != frame_fingerprint(_frame().rename(columns={'avg_latency': 'p50_latency'}))
+    assert frame_fingerprint(_frame()) != frame_fingerprint(_frame().astype({'avg_latency': 'float32'}))
+    assert frame_fingerprint(_frame()) != frame_fingerprint(_frame().set_axis([1, 2, 3]))
+
+def test_unhashable_cells_are_fingerprinted():
+    df = pd.DataFrame({'tags': [['a'], ['b']]})
+    assert frame_fingerprint(df) != frame_fingerprint(pd.DataFrame({'tags': [['a'], ['c']]}))
+
+def test_fingerprint_is_computed_once_per_frame(monkeypatch):
+    df = _frame()
+    first = frame_fingerprint(df)
+    monkeypatch.setattr(figure_cache.pd.util, 'hash_pandas_object', lambda *args, **kwargs: pytest.fail("rehashed"))
+    assert frame_fingerprint(df) == first
+    other = _frame()
+    register_fingerprint(other, 'table+filters')
+    assert frame_fingerprint(other) == 'table+filters'
+
+def test_fingerprints_are_dropped_with_their_frame():
+    df = _frame()
+    frame_fingerprint(df)
+    key = id(df)
+    del df
+    gc.collect()
+    assert key not in figure_cache._fingerprints
+
+def test_cache_builds_each_key_once():
+    cache = FigureCache(4)
+    builds = []
+    assert cache.get_or_build(('f', 'bar'), lambda: builds.append(1) or 'figure') == 'figure'
+    assert cache.get_or_build(('f', 'bar'), lambda: builds.append(1) or 'other') == 'figure'
+    assert builds == [1]
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+def test_cache_evicts_least_recently_used():
+    cache = FigureCache(2)
+    cache.get_or_build('a', lambda: 'a')
+    cache.get_or_build('b', lambda: 'b')
+    cache.get_or_build('a', lambda: 'a')  # 'a' is now the most recently used
+    cache.get_or_build('c', lambda: 'c')
+    assert cache.get_or_build('b', lambda: 'rebuilt') == 'rebuilt'
+    assert cache.get_or_build('a', lambda: 'rebuilt') == 'rebuilt'  # evicted by 'b' coming back
+    assert cache.stats()['entries'] == 2
+
+def _report_page():
+    from benchmarks.synthetic import report_tables
+    from src.visualization import plot_all_relevant_charts
+    plot_all_relevant_charts(report_tables(500)['resource_optimization'], 'Resource Optimization')
+
+def test_only_the_first_section_is_built_on_a_fresh_page():
+    page = AppTest.from_function(_report_page, default_timeout=60).run()
+    assert not page.exception
+    toggles = page.toggle
+    assert toggles[0].value and not any(toggle.value for toggle in toggles[1:])
+    charts = len(page.get('plotly_chart'))
+    toggles[1].set_value(True)
+    page.run()
+    assert not page.exception
+    assert len(page.get('plotly_chart')) > charts
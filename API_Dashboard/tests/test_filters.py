@@ -0,0 +1,84 @@
+import gc
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import request_logs
+from src import filters
+from src.filters import apply_filters, describe_filters, table_index
+
+SELECTIONS = [
+    ({'client_id': ['client-0']}, None, None),
+    ({'client_id': ['client-3', 'client-9', 'no-such-client'], 'api_version': ['v2']}, None, None),
+    ({'uri_path': ['/api/v1/resource/3'], 'status_class': ['5xx']}, '2024-05-01 06:00', '2024-05-01 12:00'),
+    ({}, '2024-05-01 23:00', None),
+    ({'status_class': ['4xx'], 'api_version': ['v1', 'v3']}, None, '2024-05-01 01:00'),
+    ({'client_id': ['no-such-client']}, None, None),
+]
+
+@pytest.fixture(scope="module", params=['object', 'category'])
+def requests(request):
+    df = request_logs(50_000, clients=400, endpoints=50)
+    if request.param == 'category':
+        for column in ('client_id', 'uri_path', 'api_version'):
+            df[column] = df[column].astype('category')
+    return df
+
+def _mask(df: pd.DataFrame, selected: dict, start, end) -> np.ndarray:
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in selected.items():
+        if column == 'status_class':
+            mask &= np.isin(df['status_code_cleaned'].to_numpy() // 100, [int(v[0]) for v in values])
+        else:
+            mask &= df[column].isin(values).to_numpy()
+    if start is not None:
+        mask &= (df['timestamp'] >= pd.Timestamp(start, tz='UTC')).to_numpy()
+    if end is not None:
+        mask &= (df['timestamp'] < pd.Timestamp(end, tz='UTC')).to_numpy()
+    return np.flatnonzero(mask)
+
+@pytest.mark.parametrize('selected, start, end', SELECTIONS)
+def test_select_matches_a_mask(requests, selected, start, end):
+    positions = table_index(requests).select(selected, start, end)
+    assert np.array_equal(positions, _mask(requests, selected, start, end))
+
+@pytest.mark.parametrize('selected, start, end', SELECTIONS)
+def test_filtered_frames_are_memoised(requests, selected, start, end):
+    df = apply_filters(requests, selected, start, end)
+    expected = requests.iloc[_mask(requests, selected, start, end)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(df, expected)
+    assert apply_filters(requests, selected, start, end) is df
+
+def test_no_filters_return_the_table(requests):
+    assert apply_filters(requests, {'client_id': []}) is requests
+
+def test_options_are_most_frequent_first(requests):
+    index = table_index(requests)
+    counts = requests['client_id'].value_counts()
+    assert index.options('client_id', 5) == counts.index[:5].tolist()
+    assert set(index.options('status_class')) == {'2xx', '4xx', '5xx'}
+
+def test_unknown_filter_column():
+    with pytest.raises(ValueError, match='team'):
+        apply_filters(request_logs(100), {'team': ['payments']})
+
+def test_memo_is_bounded_by_bytes(requests, monkeypatch):
+    monkeypatch.setattr(filters, 'FILTER_CACHE_BYTES', 1)
+    df = requests.copy()
+    index = table_index(df)
+    index.filtered({'client_id': ['client-0']})
+    latest = index.filtered({'client_id': ['client-1']})
+    assert len(index._frames) == 1 and index.filtered({'client_id': ['client-1']}) is latest
+
+def test_index_is_dropped_with_its_table():
+    df = request_logs(1_000)
+    apply_filters(df, {'client_id': ['client-0']})
+    key = id(df)
+    assert filters.find_index(df) is not None
+    del df
+    gc.collect()
+    assert key not in filters._indexes
+
+def test_describe_filters():
+    assert describe_filters({}) == ""
+    assert describe_filters({'client_id': ['a', 'b'], 'uri_path': []}, pd.Timestamp('2024-05-01')) == \
+        "client_id in a, b; from 2024-05-01"
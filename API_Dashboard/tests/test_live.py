@@ -0,0 +1,60 @@
+import json
+import socket
+import time
+import pandas as pd
+import pytest
+from src.live import LiveAggregator, SocketSource
+
+def _records(count: int, uri: str = '/api/v1/orders') -> list:
+    now = pd.Timestamp.now(tz='UTC')
+    return [{'timestamp': (now - pd.Timedelta(seconds=i)).isoformat(), 'uri_path': uri, 'client_id': f'client-{i % 7}',
+             'api_name': 'orders', 'app_name': 'shop', 'api_version': 'v1',
+             'status_code': 500 if i % 10 == 0 else 200, 'latency_ms': 10 + i % 50} for i in range(count)]
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+@pytest.fixture
+def aggregator():
+    aggregator = LiveAggregator()
+    yield aggregator
+    aggregator.stop()
+
+def test_socket_rows_are_folded_into_the_reports(aggregator):
+    source = SocketSource(port=0, batch_rows=100)
+    source.start(aggregator.push)
+    try:
+        lines = [json.dumps(record) for record in _records(250)] + ['not json', '[1, 2]', '42']
+        with socket.create_connection(source._server.server_address) as connection:
+            connection.sendall(("\n".join(lines) + "\n").encode())
+        _wait_for(lambda: aggregator.stats()['received'] == 250)
+    finally:
+        source.stop()
+    assert aggregator.flush() == 250
+    reports = aggregator.reports()
+    resource = reports['Resource Optimization']
+    assert resource['request_count'].sum() == 250
+    assert resource['error_rate_pct'].iloc[0] == pytest.approx(10.0)
+    assert reports['Consumer Behavior']['client_id'].nunique() == 7
+
+def test_bad_batch_is_dropped_and_the_flusher_keeps_running(aggregator):
+    aggregator.start_flusher(interval=0.02)
+    aggregator.push([1, "x"])
+    _wait_for(lambda: aggregator.stats()['dropped'] == 2)
+    assert aggregator.stats()['last_error']
+    aggregator.push(_records(20))
+    _wait_for(lambda: aggregator.stats()['version'] == 1)
+    assert aggregator.reports()['Resource Optimization']['request_count'].sum() == 20
+
+def test_reports_are_rebuilt_only_after_new_rows(aggregator):
+    aggregator.push(_records(30))
+    aggregator.flush()
+    first = aggregator.reports()
+    assert aggregator.reports() is first
+    aggregator.push(_records(5, uri='/api/v1/users'))
+    aggregator.flush()
+    assert aggregator.reports() is not first
+    assert aggregator.request_rate()['requests_per_sec'].sum() == pytest.approx(35 / 60)
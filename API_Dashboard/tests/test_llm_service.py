@@ -0,0 +1,45 @@
+import threading
+import pytest
+from benchmarks import mock_ollama
+from src.llm_service import LLMBusyError, LLMService
+
+@pytest.fixture
+def ollama():
+    """The mock Ollama server's URL."""
+    server = mock_ollama.serve(0, token_delay=0.005)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_streams_the_answer_and_caches_it(ollama):
+    service = LLMService(host=ollama, model="mock")
+    stream = service.ask("Which endpoints are slowest?", "prompt", "resource_optimization", "abc")
+    tokens = list(stream)
+    assert len(tokens) > 1 and "".join(tokens) == mock_ollama.ANSWER
+    assert not stream.cached
+
+    # Same question up to case and spacing, same data: answered from the cache
+    again = service.ask("  which endpoints are SLOWEST? ", "prompt", "resource_optimization", "abc")
+    assert again.cached and "".join(again) == mock_ollama.ANSWER
+    # New data fingerprint: asked again
+    assert not service.ask("Which endpoints are slowest?", "prompt", "resource_optimization", "def").cached
+    assert service.stats()['cache_hits'] == 1
+
+def test_full_queue_rejects_questions(ollama):
+    service = LLMService(host=ollama, model="mock", max_concurrency=1, queue_size=1)
+    streams, busy = [], 0
+    for i in range(5):
+        try:
+            streams.append(service.ask(f"question {i}", "prompt", "t", "fp"))
+        except LLMBusyError:
+            busy += 1
+    assert busy >= 3
+    for stream in streams:
+        assert "".join(stream) == mock_ollama.ANSWER
+
+def test_generation_errors_reach_the_reader():
+    # Nothing listens on this port
+    service = LLMService(host="http://127.0.0.1:9", model="mock")
+    with pytest.raises(Exception):
+        list(service.ask("question", "prompt", "t", "fp"))
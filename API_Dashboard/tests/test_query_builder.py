@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+from benchmarks.synthetic import request_logs
+from src import analytics
+from src.config import REQUEST_LOG_TABLE
+from src.query_builder import AggregateQuery, RemoteTable
+
+@pytest.fixture(scope="module")
+def requests():
+    return request_logs(5000, clients=200, endpoints=30)
+
+@pytest.fixture
+def remote(postgrest, requests):
+    return RemoteTable(REQUEST_LOG_TABLE, supabase=postgrest({REQUEST_LOG_TABLE: requests}))
+
+def _same(remote: pd.Series, local: pd.Series):
+    # Keys come back from the RPC as text; ties may be ordered differently
+    local = local.set_axis(local.index.astype(str))
+    pd.testing.assert_series_equal(remote.sort_index(), local.sort_index(), check_names=False,
+                                   check_dtype=False, check_index_type=False)
+
+@pytest.mark.parametrize('metric', ['avg_latency_per_api', 'avg_latency_per_app', 'status_code_distribution',
+                                    'version_usage'])
+def test_grouped_aggregates_match_pandas(remote, requests, metric):
+    _same(getattr(analytics, metric)(remote), getattr(analytics, metric)(requests))
+
+@pytest.mark.parametrize('metric, column', [('top_clients', 'client_id'), ('top_endpoints', 'uri_path')])
+def test_top_n_match_pandas(remote, requests, metric, column):
+    result, expected = getattr(analytics, metric)(remote, n=5), getattr(analytics, metric)(requests, n=5)
+    assert result.tolist() == expected.tolist()
+    assert (requests[column].value_counts()[result.index].to_numpy() == result.to_numpy()).all()
+
+def test_requests_over_time_match_pandas(remote, requests):
+    result = analytics.requests_over_time(remote, '1h')
+    expected = analytics.requests_over_time(requests, '1h')
+    pd.testing.assert_series_equal(result, expected, check_names=False, check_dtype=False, check_freq=False)
+
+def test_summary_matches_pandas(remote, requests):
+    result = analytics.get_summary(remote)['latency_ms']
+    expected = requests['latency_ms'].describe()
+    for stat in ('count', 'mean', 'std', 'min', 'max'):
+        assert result[stat] == pytest.approx(expected[stat])
+
+@pytest.mark.parametrize('by', ['api_name', 'app_name', 'client_id'])
+def test_percentiles_match_pandas(remote, requests, by):
+    result = analytics.latency_percentiles(remote, by)
+    expected = analytics.latency_percentiles(requests, by)
+    pd.testing.assert_frame_equal(result.sort_index(), expected.sort_index(), check_names=False,
+                                  check_index_type=False)
+
+def test_time_range_restricts_rows(remote, requests):
+    start, end = pd.Timestamp('2024-05-01 06:00', tz='UTC'), pd.Timestamp('2024-05-01 12:00', tz='UTC')
+    result = remote.aggregate('count', group_by='api_version', start=start, end=end)
+    window = requests[(requests['timestamp'] >= start) & (requests['timestamp'] < end)]
+    _same(result, window['api_version'].value_counts())
+
+def test_params_match_the_rpc_signature():
+    params = AggregateQuery('t', 'percentile_cont', 'latency_ms', freq='5min', quantile=0.99,
+                            start='2024-05-01').params()
+    assert params['p_bucket'] == '300 seconds'
+    assert params['p_quantile'] == 0.99
+    assert params['p_start'] == '2024-05-01T00:00:00'
+    assert AggregateQuery('t').params().keys().isdisjoint({'p_quantile', 'p_start', 'p_end', 'p_bucket'})
@@ -0,0 +1,48 @@
+import pytest
+from src.config import TABLE_NAMES
+from src.question_router import answer, route
+
+REPORT = 'Consumer Behavior'
+
+@pytest.fixture(scope="module")
+def consumers(tables):
+    return tables[TABLE_NAMES[REPORT]]
+
+def _intents(question: str, plot=None) -> list:
+    return [intent.name for intent, _ in route(question, plot)]
+
+def test_routes_to_registered_intents():
+    assert _intents("How many total rows are there?", plot=False) == ['total_rows']
+    assert _intents("show a boxplot of latency", plot=True) == ['latency_boxplot']
+    assert _intents("which client has the highest average latency", plot=False) == ['highest_latency']
+    assert _intents("why did traffic change?") == []
+
+def test_answers_from_the_table(consumers):
+    assert answer("total rows", consumers, REPORT, plot=False) == f"There are **{len(consumers)}** entries in the **{REPORT}**."
+    expected = consumers.groupby('client_id')['avg_latency'].mean().idxmax()
+    assert f"'{expected}'" in answer("highest average latency?", consumers, REPORT, plot=False)
+
+@pytest.mark.parametrize('question, column', [
+    ("What is the p99.9 latency?", 'p99.9_latency'),
+    ("What is the 99.9th percentile latency?", 'p99.9_latency'),
+    ("99th percentile latency", 'p99_latency'),
+    ("median latency", 'p50_latency'),
+])
+def test_percentiles_use_the_named_column(consumers, question, column):
+    top = consumers.groupby('client_id')[column].max()
+    text = answer(question, consumers, REPORT, plot=False)
+    assert f"'{top.idxmax()}'" in text and f"{top.max():.2f}" in text
+
+def test_top_n_ranks_by_the_named_percentile(consumers):
+    expected = consumers.groupby('client_id')['p99_latency'].mean().nlargest(5)
+    text = answer("top 5 clients by p99 latency", consumers, REPORT, plot=False)
+    assert "by p99_latency" in text
+    assert all(client in text for client in expected.index)
+    assert "by avg_latency" in answer("top 5 clients by latency", consumers, REPORT, plot=False)
+
+def test_plot_intents_build_figures(consumers):
+    fig = answer("plot a histogram of latency", consumers, REPORT, plot=True)
+    assert fig is not None and len(fig.data) > 0
+
+def test_unanswerable_questions_fall_through(consumers):
+    assert answer("what should we build next quarter?", consumers, REPORT, plot=False) is None
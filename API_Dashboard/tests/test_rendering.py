@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from src.rendering import box_figure, histogram_figure, lttb, scatter_figure
+
+def test_lttb_keeps_endpoints_and_one_point_per_bucket():
+    x = np.arange(10_000)
+    y = np.random.default_rng(0).normal(size=10_000).cumsum()
+    xs, ys = lttb(x, y, 500)
+    assert len(xs) == 500
+    assert xs[0] == 0 and xs[-1] == 9_999
+    assert (np.diff(xs) > 0).all()
+    assert np.array_equal(ys, y[xs])
+    edges = np.linspace(1, 9_999, 499).astype(int)
+    assert (np.searchsorted(edges, xs[1:-1], 'right') == np.arange(1, 499)).all()
+
+def test_lttb_keeps_spikes():
+    y = np.zeros(5_000)
+    y[1234], y[4321] = 100.0, -50.0
+    xs, _ = lttb(np.arange(5_000), y, 100)
+    assert 1234 in xs and 4321 in xs
+
+def test_lttb_leaves_short_series_and_datetimes_alone():
+    x = pd.date_range('2024-05-01', periods=50, freq='min').to_numpy()
+    y = np.arange(50, dtype=float)
+    xs, ys = lttb(x, y, 100)
+    assert xs is x and ys is y
+    xs, _ = lttb(x, y, 10)
+    assert xs.dtype == x.dtype and len(xs) == 10
+
+def test_histogram_counts_every_finite_value():
+    values = pd.Series([1.0, 2.0, np.nan, np.inf, 3.0, 3.5] * 1000)
+    fig = histogram_figure(values, "latency", "ms", bins=10)
+    assert len(fig.data[0].y) == 10 and sum(fig.data[0].y) == 4000
+
+def test_box_figure_statistics_and_outlier_cap():
+    values = np.concatenate([np.random.default_rng(1).normal(100, 10, 10_000), np.linspace(1_000, 2_000, 500)])
+    fig = box_figure(values, "latency", "ms", max_outliers=50)
+    box = fig.data[0]
+    assert np.isclose(box.median[0], np.median(values))
+    assert np.isclose(box.q1[0], np.quantile(values, 0.25))
+    assert len(fig.data[1].y) == 50 and max(fig.data[1].y) == 2_000
+
+def test_scatter_switches_to_density_above_budget():
+    df = pd.DataFrame({'x': np.arange(1_000.0), 'y': np.arange(1_000.0)})
+    assert scatter_figure(df, 'x', 'y', "points", point_budget=2_000).data[0].type == 'scattergl'
+    density = scatter_figure(df, 'x', 'y', "points", point_budget=100)
+    assert density.data[0].type == 'heatmap'
+    assert np.nansum(np.array(density.data[0].z, dtype=float)) == 1_000
@@ -0,0 +1,105 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import request_logs
+from src import rollups
+from src.rollups import RollupEngine, build_reports, merge_partials
+
+DIMENSIONS = ['client_id', 'uri_path']
+
+@pytest.fixture(scope="module")
+def requests():
+    return request_logs(20000, clients=300, endpoints=40)
+
+def test_batches_merge_to_the_same_partials(requests):
+    whole = RollupEngine(DIMENSIONS, ['5m', '1h'])
+    whole.update(requests)
+    batched = RollupEngine(DIMENSIONS, ['5m', '1h'])
+    # Shuffled batches touch overlapping windows, so existing partials are re-merged
+    shuffled = requests.sample(frac=1, random_state=1)
+    for start in range(0, len(shuffled), 5000):
+        batched.update(shuffled.iloc[start:start + 5000])
+    for res in ('5m', '1h'):
+        pd.testing.assert_frame_equal(batched.partials[res], whole.partials[res], check_like=True)
+        pd.testing.assert_series_equal(batched.sketches[res], whole.sketches[res])
+
+def test_batches_only_re_merge_the_windows_they_touch(requests, monkeypatch):
+    engine = RollupEngine(DIMENSIONS, ['1h'])
+    ordered = requests.sort_values('timestamp')
+    engine.update(ordered.iloc[:10000])
+    later = ordered.iloc[10000:11000]
+    windows = later['timestamp'].dt.floor('1h')
+    touched = len(engine.window_partials('1h', windows.min(), windows.max() + pd.Timedelta('1h')))
+    assert 0 < touched < len(engine.partials['1h'])
+
+    merged_rows = []
+    merge = rollups.merge_partials
+    monkeypatch.setattr(rollups, 'merge_partials', lambda partials, by: merged_rows.append(len(partials)) or merge(partials, by))
+    engine.update(later)
+    # The history outside the shared window is not part of the merge
+    assert merged_rows and sum(merged_rows) <= touched + len(later)
+
+def test_drop_before_forgets_old_windows(requests):
+    engine = RollupEngine(DIMENSIONS, ['5m', '1h'])
+    engine.update(requests)
+    cutoff = pd.Timestamp('2024-05-01 12:00', tz='UTC')
+    engine.drop_before(cutoff)
+    for res in ('5m', '1h'):
+        windows = engine.partials[res].index.get_level_values('window_start')
+        assert windows.min() == cutoff
+        assert engine.sketches[res].index.get_level_values('window_start').min() == cutoff
+    kept = requests[requests['timestamp'] >= cutoff]
+    assert engine.partials['1h']['count'].sum() == len(kept)
+
+def test_coarser_windows_merge_to_the_same_totals(requests):
+    engine = RollupEngine(DIMENSIONS, ['5m', '1h'])
+    engine.update(requests)
+    fine = merge_partials(engine.partials['5m'], ['uri_path']).sort_index()
+    coarse = merge_partials(engine.partials['1h'], ['uri_path']).sort_index()
+    pd.testing.assert_frame_equal(fine, coarse)
+
+def test_reports_match_pandas(requests):
+    engine = RollupEngine(DIMENSIONS, ['1h'])
+    engine.update(requests)
+    reports = build_reports(engine)
+    frame = requests.assign(is_error=requests['status_code_cleaned'] >= 400)
+    by_uri = frame.groupby('uri_path', observed=True)
+
+    resource = reports['resource_optimization'].set_index('uri_path')
+    assert (resource['request_count'] == by_uri.size().reindex(resource.index)).all()
+    assert np.allclose(resource['avg_latency'], by_uri['latency_ms'].mean().reindex(resource.index))
+
+    # Error rates are weighted by requests, not averaged over windows
+    maintenance = reports['predictive_maintenance_report'].set_index('uri_path')
+    assert np.allclose(maintenance['avg_error_rate'], 100 * by_uri['is_error'].mean().reindex(maintenance.index))
+
+    consumer = reports['consumer_behavior'].set_index('client_id')
+    by_client = frame.groupby('client_id', observed=True)
+    assert np.allclose(consumer['error_rate_pct'], 100 * by_client['is_error'].mean().reindex(consumer.index))
+    assert (consumer['api_diversity'] == by_client['uri_path'].nunique().reindex(consumer.index)).all()
+
+def test_time_range_selects_whole_windows(requests):
+    engine = RollupEngine(DIMENSIONS, ['1h'])
+    engine.update(requests)
+    start = requests['timestamp'].min().floor('1h') + pd.Timedelta('2h')
+    end = start + pd.Timedelta('3h')
+    partials = engine.window_partials('1h', start, end)
+    expected = ((requests['timestamp'] >= start) & (requests['timestamp'] < end)).sum()
+    assert partials['count'].sum() == expected
+
+def test_save_and_load_round_trip(requests, tmp_path):
+    engine = RollupEngine(DIMENSIONS, ['1h'])
+    engine.update(requests)
+    engine.save(tmp_path)
+    loaded = RollupEngine.load(tmp_path, DIMENSIONS, ['1h'])
+    pd.testing.assert_frame_equal(loaded.partials['1h'], engine.partials['1h'])
+
+def test_command_line_keeps_reports_apart_from_synced_tables(requests, tmp_path):
+    log = tmp_path / 'requests.jsonl'
+    requests.head(2000).assign(timestamp=lambda df: df['timestamp'].astype(str)).to_json(log, orient='records', lines=True)
+    synced = tmp_path / 'consumer_behavior.parquet'
+    pd.DataFrame({'id': [1]}).to_parquet(synced)
+    rollups.main([str(log), '--out', str(tmp_path)])
+    assert pd.read_parquet(synced).equals(pd.DataFrame({'id': [1]}))
+    assert sorted(os.listdir(tmp_path / 'reports')) == sorted(f"{table}.parquet" for table in rollups.REPORT_BUILDERS)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import request_logs
+from src import analytics
+from src.rollups import RollupEngine
+from src.sketches import (DEFAULT_QUANTILES, RELATIVE_ACCURACY, DDSketch, merge_sketches, quantile_label,
+                          sketch_counts, sketch_quantiles)
+
+def _exact(values: np.ndarray, q: float) -> float:
+    # The sketch returns the value at rank floor(q * (n - 1)), without interpolation
+    return np.quantile(values, q, method='lower')
+
+@pytest.mark.parametrize('q', DEFAULT_QUANTILES)
+def test_quantiles_within_relative_accuracy(q):
+    values = np.random.default_rng(0).lognormal(4, 1.5, 100_000)
+    sketch = DDSketch()
+    sketch.add(values)
+    assert sketch.quantile(q) == pytest.approx(_exact(values, q), rel=RELATIVE_ACCURACY)
+
+def test_merged_sketch_equals_sketch_of_all_values():
+    values = np.random.default_rng(1).lognormal(3, 1, 30_000)
+    whole, left, right = DDSketch(), DDSketch(), DDSketch()
+    whole.add(values)
+    left.add(values[:10_000])
+    right.add(values[10_000:])
+    left.merge(right)
+    assert left.buckets == whole.buckets and left.count == whole.count
+
+def test_long_form_sketches_per_key():
+    requests = request_logs(20_000, clients=50, endpoints=10)
+    keys = requests[['uri_path']].reset_index(drop=True)
+    counts = sketch_counts(keys, requests['latency_ms'].reset_index(drop=True))
+    # Merging per-half sketches gives the same per-key quantiles
+    halves = pd.concat([sketch_counts(keys.iloc[:10_000], requests['latency_ms'].iloc[:10_000]),
+                        sketch_counts(keys.iloc[10_000:], requests['latency_ms'].iloc[10_000:])])
+    merged = merge_sketches(halves, ['uri_path'])
+    quantiles = sketch_quantiles(counts, ['uri_path'])
+    pd.testing.assert_frame_equal(sketch_quantiles(merged, ['uri_path']).sort_index(), quantiles.sort_index())
+    for uri, latencies in requests.groupby('uri_path', observed=True)['latency_ms']:
+        for q in DEFAULT_QUANTILES:
+            assert quantiles.loc[uri, quantile_label(q)] == pytest.approx(_exact(latencies.to_numpy(), q),
+                                                                         rel=RELATIVE_ACCURACY)
+
+def test_quantile_labels():
+    assert [quantile_label(q) for q in DEFAULT_QUANTILES] == ['p50', 'p90', 'p99', 'p99.9']
+
+@pytest.mark.parametrize('function, column', [('latency_percentiles_per_api', 'api_name'),
+                                              ('latency_percentiles_per_app', 'app_name'),
+                                              ('latency_percentiles_per_client', 'client_id')])
+def test_engine_percentiles_per_api_app_and_client(tmp_path, function, column):
+    requests = request_logs(20_000)
+    engine = RollupEngine(['client_id', 'uri_path'], ['1h'], ['api_name', 'app_name'])
+    for start in range(0, len(requests), 5_000):
+        engine.update(requests.iloc[start:start + 5_000])
+    engine.save(tmp_path)
+    loaded = RollupEngine.load(tmp_path, ['client_id', 'uri_path'], ['1h'], ['api_name', 'app_name'])
+    for source in (engine, loaded):
+        result = getattr(analytics, function)(source)
+        assert list(result.columns) == ['p50', 'p90', 'p99', 'p99.9']
+        assert set(result.index) == set(requests[column])
+        for key, latencies in requests.groupby(column)['latency_ms']:
+            for q in DEFAULT_QUANTILES:
+                assert result.loc[key, quantile_label(q)] == pytest.approx(_exact(latencies.to_numpy(), q),
+                                                                           rel=RELATIVE_ACCURACY)
+
+def test_engine_percentiles_need_kept_sketches():
+    engine = RollupEngine(['client_id', 'uri_path'], ['1h'], ['api_name'])
+    engine.update(request_logs(5_000))
+    with pytest.raises(ValueError, match='app_name'):
+        analytics.latency_percentiles_per_app(engine)
+    with pytest.raises(ValueError, match='api_name'):
+        engine.percentiles(['api_name', 'client_id'])
@@ -0,0 +1,97 @@
+import sys
+import threading
+import pytest
+from benchmarks.bench_startup import DEFERRED, import_run
+from src import data_loader, warmup
+from src.cache import TableCache
+from src.config import TABLE_NAMES
+from src.lazy import LazyModule, lazy_import, preload
+
+@pytest.fixture
+def module(tmp_path, monkeypatch):
+    """A throwaway module that logs every time its body runs; returns (name, log path)."""
+    name = 'lazy_target'
+    log = tmp_path / 'imports.log'
+    (tmp_path / f"{name}.py").write_text(
+        f"import time\nopen({str(log)!r}, 'a').write('x')\ntime.sleep(0.05)\nvalue = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield name, log
+    sys.modules.pop(name, None)
+
+def test_lazy_module_imports_on_first_attribute(module):
+    name, log = module
+    lazy = lazy_import(name)
+    assert isinstance(lazy, LazyModule) and name not in sys.modules and not log.exists()
+    assert lazy.value == 42
+    assert name in sys.modules and log.read_text() == 'x'
+    # Later lookups are served from the copied namespace
+    assert lazy.value == 42 and lazy.__dict__['value'] == 42
+
+def test_lazy_import_returns_an_imported_module(module):
+    name, _ = module
+    preload(name)
+    assert lazy_import(name) is sys.modules[name]
+
+def test_concurrent_first_use_imports_once(module):
+    name, log = module
+    lazy = lazy_import(name)
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(lazy.value)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert values == [42] * 8 and log.read_text() == 'x'
+
+def test_dashboard_imports_leave_backends_unloaded():
+    # A fresh interpreter runs the import block of app/dashboard.py
+    result, _ = import_run()
+    assert {'plotly.express', 'supabase', 'ollama'} <= set(DEFERRED)
+    assert result['eager'] == []
+
+@pytest.fixture
+def start_warm_up(monkeypatch):
+    """start_warm_up() with its once-per-process cache cleared before and after the test."""
+    warmup.start_warm_up.clear()
+    monkeypatch.setattr(warmup, 'WARMUP_ENABLED', True)
+    yield warmup.start_warm_up
+    warmup.start_warm_up.clear()
+
+def test_warm_up_runs_once_per_process(start_warm_up, monkeypatch):
+    started = []
+    monkeypatch.setattr(warmup, 'warm_up', started.append)
+    thread = start_warm_up("Resource Optimization")
+    assert start_warm_up("Resource Optimization") is thread
+    thread.join(5)
+    assert started == ["Resource Optimization"] and thread.daemon
+
+def test_warm_up_is_off_when_disabled(start_warm_up, monkeypatch):
+    monkeypatch.setattr(warmup, 'WARMUP_ENABLED', False)
+    assert start_warm_up() is None
+
+def test_warm_up_errors_stay_on_its_thread(start_warm_up, monkeypatch):
+    raised = []
+    monkeypatch.setattr(threading, 'excepthook', raised.append)
+
+    def fail(table_display_name):
+        raise ConnectionError("Supabase is down")
+
+    monkeypatch.setattr(warmup, 'warm_up', fail)
+    start_warm_up().join(5)
+    assert raised == []
+
+def test_warm_up_loads_the_table_into_the_shared_cache(tables, tmp_path, monkeypatch):
+    for table_name, frame in tables.items():
+        frame.to_parquet(tmp_path / f"{table_name}.parquet", index=False)
+    monkeypatch.setattr(data_loader, 'LOCAL_STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(data_loader, 'DATA_SOURCE', 'local')
+    monkeypatch.setattr(warmup, 'DATA_SOURCE', 'local')
+    cache = TableCache(10 ** 9, 60)
+    monkeypatch.setattr(warmup, 'get_table_cache', lambda: cache)
+    monkeypatch.setattr(data_loader, 'get_table_cache', lambda: cache)
+
+    warmup.warm_up("Consumer Behavior")
+    assert 'plotly.express' in sys.modules
+    loaded = data_loader.fetch_data("Consumer Behavior")
+    assert len(loaded) == len(tables[TABLE_NAMES["Consumer Behavior"]])
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
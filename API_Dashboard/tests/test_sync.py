@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from src import data_loader, sync
+from src.config import TABLE_NAMES
+
+NAME = 'Consumer Behavior'
+TABLE = TABLE_NAMES[NAME]
+
+@pytest.fixture(autouse=True)
+def local_store(tmp_path, monkeypatch):
+    # A fresh store per test, and pages small enough that every sync spans several of them
+    for module in (data_loader, sync):
+        monkeypatch.setattr(module, 'LOCAL_STORE_DIR', str(tmp_path))
+        monkeypatch.setattr(module, 'PAGE_SIZE', 4)
+    monkeypatch.setattr(data_loader, 'FETCH_WORKERS', 2)
+
+@pytest.fixture
+def base(tables):
+    return tables[TABLE].iloc[:40].copy()
+
+def _new_rows(base: pd.DataFrame, count: int, last_seen: pd.Timestamp) -> pd.DataFrame:
+    rows = base.iloc[:count].copy()
+    rows['id'] = base['id'].max() + 1 + pd.RangeIndex(count)
+    rows['client_id'] = [f"new-client-{i}" for i in range(count)]
+    rows['last_seen'] = last_seen
+    return rows
+
+def test_first_sync_copies_the_table(postgrest, base):
+    assert sync.sync_table(postgrest({TABLE: base}), NAME) == len(base)
+    local = data_loader.read_local(NAME)
+    assert sorted(local['id']) == sorted(base['id'])
+    assert pd.Timestamp(sync.load_state(TABLE)['high_water_mark']) == base['last_seen'].max()
+
+def test_delta_pages_past_the_high_water_mark_and_upserts(postgrest, base):
+    sync.sync_table(postgrest({TABLE: base}), NAME)
+    mark = base['last_seen'].max()
+    boundary_id = base.loc[base['last_seen'] == mark, 'id'].iloc[0]
+
+    # The row at the mark changes without moving its cursor; ten new rows share one later
+    # timestamp, more than a page, so paging has to order by (cursor, key) to see them all
+    upstream = base.copy()
+    upstream.loc[upstream['id'] == boundary_id, 'request_count'] = 123456
+    upstream = pd.concat([upstream, _new_rows(base, 10, mark + pd.Timedelta(hours=1))], ignore_index=True)
+
+    fetched = sync.sync_table(postgrest({TABLE: upstream}), NAME)
+    assert fetched == (upstream['last_seen'] >= mark).sum()
+    local = data_loader.read_local(NAME)
+    assert local['id'].is_unique and sorted(local['id']) == sorted(upstream['id'])
+    assert local.loc[local['id'] == boundary_id, 'request_count'].item() == 123456
+    assert pd.Timestamp(sync.load_state(TABLE)['high_water_mark']) == mark + pd.Timedelta(hours=1)
+
+def test_unchanged_table_refetches_only_the_boundary_rows(postgrest, base):
+    supabase = postgrest({TABLE: base})
+    sync.sync_table(supabase, NAME)
+    by_id = lambda df: df.sort_values('id').reset_index(drop=True)
+    before = by_id(data_loader.read_local(NAME))
+    assert sync.sync_table(supabase, NAME) == (base['last_seen'] == base['last_seen'].max()).sum()
+    pd.testing.assert_frame_equal(by_id(data_loader.read_local(NAME)), before)
+
+def test_full_sync_rebuilds_the_copy(postgrest, base):
+    sync.sync_table(postgrest({TABLE: base}), NAME)
+    upstream = base.iloc[5:]
+    assert sync.sync_table(postgrest({TABLE: upstream}), NAME, full=True) == len(upstream)
+    assert sorted(data_loader.read_local(NAME)['id']) == sorted(upstream['id'])
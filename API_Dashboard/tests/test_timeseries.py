@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import request_logs
+from src.config import REQUEST_LOG_TABLE
+from src.query_builder import RemoteTable
+from src.rollups import RollupEngine
+from src.timeseries import RemoteSeries, RollupSeries, pick_resolution, time_series
+
+START, END = pd.Timestamp('2024-05-01 03:00', tz='UTC'), pd.Timestamp('2024-05-01 15:00', tz='UTC')
+
+@pytest.fixture(scope="module")
+def requests():
+    return request_logs(20_000, clients=100, endpoints=30)
+
+@pytest.fixture
+def remote(postgrest, requests):
+    return RemoteSeries(RemoteTable(REQUEST_LOG_TABLE, supabase=postgrest({REQUEST_LOG_TABLE: requests})))
+
+@pytest.fixture(scope="module")
+def rollups(requests, tmp_path_factory):
+    directory = tmp_path_factory.mktemp('rollups')
+    engine = RollupEngine(['client_id', 'uri_path'], ['5m', '1h'])
+    engine.update(requests)
+    engine.save(directory)
+    return RollupSeries(str(directory))
+
+def test_remote_extent_reads_the_time_bounds(remote, requests, monkeypatch):
+    monkeypatch.setattr(RemoteTable, 'run', lambda *args: pytest.fail("extent must not aggregate the table"))
+    first, last = remote.extent()
+    assert first == requests['timestamp'].min().floor('1min')
+    assert last == requests['timestamp'].max().floor('1min') + pd.Timedelta('1min')
+
+def test_remote_extent_of_an_empty_table(postgrest, requests):
+    empty = RemoteSeries(RemoteTable(REQUEST_LOG_TABLE, supabase=postgrest({REQUEST_LOG_TABLE: requests.iloc[:0]})))
+    with pytest.raises(ValueError, match='no requests'):
+        empty.extent()
+
+def test_remote_series_only_aggregate_the_selected_keys(remote, requests, monkeypatch):
+    keys = requests['uri_path'].value_counts().index[:3].tolist()
+    returned = []
+    run = RemoteTable.run
+    monkeypatch.setattr(RemoteTable, 'run', lambda table, query: returned.append(run(table, query)) or returned[-1])
+    frame, resolution = time_series(remote, 'Requests/sec', START, END, by='uri_path', keys=keys, resolution='1h')
+    assert sorted(frame.columns) == sorted(keys)
+    assert set(returned[0]['key']) == set(keys) and len(returned[0]) <= 12 * len(keys)
+
+    window = requests[(requests['timestamp'] >= START) & (requests['timestamp'] < END) & requests['uri_path'].isin(keys)]
+    expected = window.groupby([window['timestamp'].dt.floor('1h'), 'uri_path']).size().unstack() / 3600
+    pd.testing.assert_frame_equal(frame, expected, check_names=False, check_freq=False, check_dtype=False)
+
+@pytest.mark.parametrize('label', ['Requests/sec', 'Error rate (%)', 'Average latency (ms)'])
+def test_remote_series_match_the_rollups(remote, rollups, requests, label):
+    keys = requests['uri_path'].value_counts().index[:4].tolist()
+    expected, _ = time_series(rollups, label, START, END, by='uri_path', keys=keys, resolution='5m')
+    result, _ = time_series(remote, label, START, END, by='uri_path', keys=keys, resolution='5m')
+    pd.testing.assert_frame_equal(result.sort_index(axis=1), expected.sort_index(axis=1), check_names=False,
+                                  check_freq=False, check_dtype=False, check_column_type=False)
+
+def test_remote_percentiles_match_pandas(remote, requests):
+    result, _ = time_series(remote, 'p90 latency (ms)', START, END, resolution='1h')
+    window = requests[(requests['timestamp'] >= START) & (requests['timestamp'] < END)]
+    expected = window.groupby(window['timestamp'].dt.floor('1h'))['latency_ms'].quantile(0.9)
+    assert np.allclose(result.iloc[:, 0].to_numpy(), expected.to_numpy())
+
+def test_remote_top_keys(remote, requests):
+    window = requests[(requests['timestamp'] >= START) & (requests['timestamp'] < END)]
+    assert remote.top_keys('uri_path', START, END, 3) == window['uri_path'].value_counts().index[:3].tolist()
+
+def test_resolution_keeps_windows_within_the_point_budget():
+    assert pick_resolution(START, START + pd.Timedelta(days=30), max_points=1500) == '1h'
+    assert pick_resolution(START, START + pd.Timedelta(hours=12), max_points=1500) == '1m'
+    assert pick_resolution(START, START + pd.Timedelta(days=3000), max_points=10) == '1d'
@@ -0,0 +1,131 @@
+import re
+import urllib.error
+import urllib.request
+import pandas as pd
+import pytest
+from src import tracing
+from src.tracing import LATENCY_BUCKETS, METRIC_PREFIX, span
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    """Tracing on, with no stages left over from other tests."""
+    monkeypatch.setattr(tracing, '_enabled', True)
+    monkeypatch.setattr(tracing, '_stages', {})
+    yield
+
+def _observe(name: str, *seconds):
+    for value in seconds:
+        tracing._record(name, value, None, None, 0, False)
+
+def test_observations_land_in_their_buckets():
+    # Bucket bounds are inclusive, values above the last bound go to +Inf
+    _observe('decode', 0.0005, 0.001, 0.003, 0.2, 0.2, 120.0)
+    buckets = tracing._stages['decode'].buckets
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    assert buckets[0] == 2
+    assert buckets[LATENCY_BUCKETS.index(0.005)] == 1
+    assert buckets[LATENCY_BUCKETS.index(0.25)] == 2
+    assert buckets[-1] == 1
+    assert sum(buckets) == tracing._stages['decode'].count == 6
+
+def test_quantile_interpolates_within_the_bucket():
+    _observe('decode', *[0.0005] * 5, *[0.008] * 5)
+    stage = tracing._stages['decode']
+    # Rank 2.5 of 5 in [0, 1ms]; rank 7.5 is halfway through the (5ms, 10ms] bucket
+    assert stage.quantile(0.25) == pytest.approx(0.0005)
+    assert stage.quantile(0.75) == pytest.approx(0.0075)
+    assert stage.quantile(1.0) == pytest.approx(0.01)
+
+def test_quantile_in_the_overflow_bucket_is_the_last_bound():
+    _observe('fetch', 0.5, 90.0, 120.0)
+    assert tracing._stages['fetch'].quantile(0.99) == LATENCY_BUCKETS[-1]
+
+def test_span_records_rows_bytes_and_errors():
+    with span('decode', bytes=100) as s:
+        s.rows = 7
+    with pytest.raises(ValueError):
+        with span('decode', rows=3):
+            raise ValueError("bad page")
+    stage = tracing._stages['decode']
+    assert (stage.count, stage.errors, stage.rows, stage.bytes) == (2, 1, 10, 100)
+    assert stage.seconds >= 0 and sum(stage.buckets) == 2
+
+def test_traced_counts_returned_frame_rows():
+    @tracing.traced('build')
+    def build():
+        return pd.DataFrame({'a': range(4)})
+
+    build()
+    assert tracing._stages['build'].rows == 4
+
+def test_disabled_span_is_a_shared_no_op(monkeypatch):
+    monkeypatch.setattr(tracing, '_enabled', False)
+    first, second = span('decode'), span('fetch', rows=3)
+    assert first is second is tracing._NO_SPAN
+    with first as s:
+        s.rows = 10
+    assert not hasattr(s, 'rows')
+    assert tracing._stages == {} and tracing.snapshot().empty
+
+def _parse(text: str) -> dict:
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        name, value = line.rsplit(' ', 1)
+        samples[name] = float(value)
+    return samples
+
+def test_prometheus_text_has_cumulative_buckets():
+    _observe('decode', 0.0005, 0.003, 0.2, 120.0)
+    tracing._record('decode', 0.002, 50, 1024, -4096, True)
+    text = tracing.prometheus_text()
+    samples = _parse(text)
+    histogram = f'{METRIC_PREFIX}_seconds'
+    assert f'# TYPE {histogram} histogram' in text
+
+    bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+    counts = [samples[f'{histogram}_bucket{{stage="decode",le="{bound}"}}'] for bound in bounds]
+    assert counts == sorted(counts)
+    assert counts[0] == 1 and counts[LATENCY_BUCKETS.index(0.005)] == 3
+    assert counts[-1] == samples[f'{histogram}_count{{stage="decode"}}'] == 5
+    assert samples[f'{histogram}_sum{{stage="decode"}}'] == pytest.approx(0.0005 + 0.003 + 0.2 + 120.0 + 0.002)
+
+    assert samples[f'{METRIC_PREFIX}_errors_total{{stage="decode"}}'] == 1
+    assert samples[f'{METRIC_PREFIX}_rows_total{{stage="decode"}}'] == 50
+    assert samples[f'{METRIC_PREFIX}_bytes_total{{stage="decode"}}'] == 1024
+    assert samples[f'{METRIC_PREFIX}_memory_delta_bytes{{stage="decode"}}'] == -4096
+    assert f'# TYPE {METRIC_PREFIX}_memory_delta_bytes gauge' in text
+
+def test_prometheus_text_lines_are_well_formed():
+    _observe('decode', 0.01)
+    _observe('fetch_data', 1.5)
+    sample = re.compile(r'^[a-z_]+\{stage="[a-z_]+"(,le="[^"]+")?\} -?[0-9.e+-]+$')
+    for line in tracing.prometheus_text().splitlines():
+        assert line.startswith('# HELP ') or line.startswith('# TYPE ') or sample.match(line), line
+
+def test_serve_metrics_exposes_the_histograms(monkeypatch):
+    monkeypatch.setattr(tracing, '_server', None)
+    _observe('decode', 0.01)
+    server = tracing.serve_metrics(0, host='127.0.0.1')
+    try:
+        # One server per process
+        assert tracing.serve_metrics(0, host='127.0.0.1') is server
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+            body = response.read().decode()
+        assert body == tracing.prometheus_text()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_write_metrics_replaces_the_file(tmp_path):
+    _observe('decode', 0.01)
+    path = tmp_path / 'metrics' / 'dashboard.prom'
+    tracing.write_metrics(str(path))
+    assert path.read_text() == tracing.prometheus_text()
+    assert list(path.parent.iterdir()) == [path]
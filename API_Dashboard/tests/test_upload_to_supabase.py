@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from functools import partial
+from types import SimpleNamespace
+import pytest
+from src import upload_to_supabase
+from src.upload_to_supabase import ingest_file, load_checkpoint, read_jsonl_chunks
+
+class Killed(BaseException):
+    """Ends a run the way a crash would: not retried and not caught by the pipeline."""
+
+class Inserts:
+    """Stand-in for the table(...).insert(rows).execute() calls of a Supabase client."""
+
+    def __init__(self, fail=None):
+        self.rows = []
+        self.calls = 0
+        self._fail = fail  # fail(call number, rows) may raise
+        self._lock = threading.Lock()
+
+    def table(self, name: str):
+        return self
+
+    def insert(self, rows: list):
+        return SimpleNamespace(execute=lambda: self._execute(rows))
+
+    def _execute(self, rows: list):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if self._fail:
+            self._fail(call, rows)
+        with self._lock:
+            self.rows.extend(rows)
+
+    def clients(self) -> list:
+        return sorted(row['client_id'] for row in self.rows)
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(upload_to_supabase, 'insert_batch', partial(upload_to_supabase.insert_batch, backoff=0))
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / 'requests.jsonl'
+    lines = [json.dumps({'timestamp': f'2024-05-01T00:{i // 60:02d}:{i % 60:02d}Z', 'api_name': 'orders',
+                         'uri_path': '/api/v1/orders', 'client_id': f'client-{i:03d}', 'status_code': 200,
+                         'latency_ms': i}) for i in range(100)]
+    # Lines that are valid JSON but not request objects, and one that is not JSON at all
+    lines[10:10] = ['123', '"x"', '[1, 2]', 'null', '{broken', '']
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+EXPECTED = [f'client-{i:03d}' for i in range(100)]
+
+def test_non_object_lines_are_skipped_and_counted(log_file):
+    chunks = list(read_jsonl_chunks(log_file, chunk_rows=30))
+    assert sum(len(records) for records, _, _ in chunks) == 100
+    assert sum(skipped for _, _, skipped in chunks) == 5
+    assert all(isinstance(record, dict) for records, _, _ in chunks for record in records)
+
+def test_ingests_every_row_once(log_file):
+    client = Inserts()
+    stats = ingest_file(client, log_file, batch_rows=7, workers=3)
+    assert client.clients() == EXPECTED
+    assert stats['rows'] == 100 and stats['skipped'] == 5
+
+def test_failed_inserts_are_retried(log_file):
+    def flaky(call, rows):
+        if call % 3 == 1:
+            raise ConnectionError("connection reset")
+    client = Inserts(flaky)
+    assert ingest_file(client, log_file, batch_rows=10, workers=2)['rows'] == 100
+    assert client.clients() == EXPECTED
+
+def test_backpressure_bounds_batches_in_flight(log_file, monkeypatch):
+    in_flight, peak = set(), []
+    read = read_jsonl_chunks
+
+    def tracked(*args):
+        for records, end_offset, skipped in read(*args):
+            in_flight.add(end_offset)
+            peak.append(len(in_flight))
+            yield records, end_offset, skipped
+
+    def slow(call, rows):
+        time.sleep(0.01)
+
+    def progress(rows, rows_per_sec, offset):
+        in_flight.difference_update({end for end in in_flight if end <= offset})
+
+    monkeypatch.setattr(upload_to_supabase, 'read_jsonl_chunks', tracked)
+    ingest_file(Inserts(slow), log_file, batch_rows=5, workers=2, on_progress=progress)
+    assert max(peak) <= 2 * 2 + 1
+
+def test_resume_after_a_crash_inserts_nothing_twice(log_file, tmp_path):
+    checkpoint = str(tmp_path / 'checkpoint.json')
+
+    def crash(call, rows):
+        # The fifth batch dies after the ones submitted behind it have landed
+        if rows[0]['client_id'] == 'client-040':
+            time.sleep(0.2)
+            raise Killed()
+
+    first = Inserts(crash)
+    with pytest.raises(Killed):
+        ingest_file(first, log_file, batch_rows=10, workers=3, checkpoint_path=checkpoint)
+    offset, landed = load_checkpoint(checkpoint, log_file)
+    assert 0 < offset < len(open(log_file, 'rb').read())
+    assert landed, "batches after the failed one were inserted and must be recorded"
+
+    second = Inserts()
+    stats = ingest_file(second, log_file, batch_rows=10, workers=3, checkpoint_path=checkpoint,
+                        start_offset=offset, skip=landed)
+    assert sorted(first.clients() + second.clients()) == EXPECTED
+    assert load_checkpoint(checkpoint, log_file) == (stats['offset'], [])
+
+def test_checkpoint_belongs_to_its_file(log_file, tmp_path):
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    ingest_file(Inserts(), log_file, batch_rows=50, workers=1, checkpoint_path=checkpoint)
+    assert load_checkpoint(checkpoint, str(tmp_path / 'other.jsonl')) == (0, [])
+    assert load_checkpoint(str(tmp_path / 'missing.json'), log_file) == (0, [])